@@ -5,7 +5,10 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_login import LoginManager
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 import os
+import sqlite3
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +19,15 @@ jwt = JWTManager()
 migrate = Migrate()
 login_manager = LoginManager()
 
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite không tự bật khóa ngoại: cần cho ON DELETE CASCADE (relationship passive_deletes=True)
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
 def create_app():
     app = Flask(__name__, 
                 template_folder='templates',
@@ -32,12 +44,44 @@ def create_app():
     
     # ImgBB API Configuration
     app.config['IMGBB_API_KEY'] = os.getenv('IMGBB_API_KEY')
+    # Endpoint override, e.g. http://127.0.0.1:8765/1/upload for the local fake (fake_imgbb.py)
+    app.config['IMGBB_UPLOAD_URL'] = os.getenv('IMGBB_UPLOAD_URL', 'https://api.imgbb.com/1/upload')
+    app.config['IMGBB_UPLOAD_WORKERS'] = int(os.getenv('IMGBB_UPLOAD_WORKERS', 4))  # parallel uploads per request
+    app.config['IMGBB_UPLOAD_RETRIES'] = int(os.getenv('IMGBB_UPLOAD_RETRIES', 3))
+    app.config['IMGBB_UPLOAD_TIMEOUT'] = int(os.getenv('IMGBB_UPLOAD_TIMEOUT', 30))  # seconds
+    # 'multipart' streams the file from disk; 'base64' is the old form post (whole file in memory)
+    app.config['IMGBB_UPLOAD_MODE'] = os.getenv('IMGBB_UPLOAD_MODE', 'multipart')
+    app.config['UPLOAD_JOB_WORKERS'] = int(os.getenv('UPLOAD_JOB_WORKERS', 2))  # background chapter uploads per worker
 
     # Feature flags (tạm thời vô hiệu hóa thăng cấp, danh hiệu, huy hiệu)
     app.config['PROGRESSION_ENABLED'] = True  # Điểm, level, leaderboard, activities
     app.config['RANK_TITLES_ENABLED'] = True  # Danh hiệu cấp bậc
     app.config['BADGES_ENABLED'] = True       # Huy hiệu người dùng
     
+    # Anonymous full-page cache (per worker, see app/utils/response_cache.py)
+    app.config['RESPONSE_CACHE_ENABLED'] = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 120))  # seconds
+    
+    # View counting: 'immediate' (UPDATE mỗi lượt xem) hoặc 'buffered' (gộp theo worker, ghi định kỳ)
+    app.config['VIEW_COUNT_MODE'] = os.getenv('VIEW_COUNT_MODE', 'immediate')
+    app.config['VIEW_FLUSH_INTERVAL'] = int(os.getenv('VIEW_FLUSH_INTERVAL', 10))  # seconds
+    app.config['VIEW_FLUSH_THRESHOLD'] = int(os.getenv('VIEW_FLUSH_THRESHOLD', 1000))  # pending views
+    
+    # Việc định kỳ chạy trong chính worker web (app/services/maintenance.py), không cần cron
+    app.config['MAINTENANCE_ENABLED'] = os.getenv('MAINTENANCE_ENABLED', 'True') == 'True'
+    app.config['MAINTENANCE_TICK'] = int(os.getenv('MAINTENANCE_TICK', 30))  # seconds
+    app.config['RANKING_REFRESH_INTERVAL'] = int(os.getenv('RANKING_REFRESH_INTERVAL', 600))  # seconds
+    app.config['VIEW_COMPACT_INTERVAL'] = int(os.getenv('VIEW_COMPACT_INTERVAL', 3600))  # seconds
+    
+    # "Top rated": Bayesian average như thể mỗi truyện có thêm RATING_PRIOR_VOTES lượt RATING_PRIOR_MEAN sao
+    # (đổi giá trị thì chạy `flask ratings-reconcile` để tính lại rating_score)
+    app.config['RATING_PRIOR_VOTES'] = int(os.getenv('RATING_PRIOR_VOTES', 10))
+    app.config['RATING_PRIOR_MEAN'] = float(os.getenv('RATING_PRIOR_MEAN', 3.0))
+    
+    # Lưu nội dung chương truyện chữ: 'plain' hoặc 'gzip' (nén khi lưu, gửi thẳng với Content-Encoding)
+    app.config['CHAPTER_BODY_CODEC'] = os.getenv('CHAPTER_BODY_CODEC', 'plain')
+    
     # Configure MySQL connection
     app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST')
     app.config['MYSQL_USER'] = os.getenv('MYSQL_USER')
@@ -45,12 +89,21 @@ def create_app():
     app.config['MYSQL_DATABASE'] = os.getenv('MYSQL_DATABASE')
     
     # Initialize extensions with app
+    if not event.contains(Engine, 'connect', _enable_sqlite_foreign_keys):
+        event.listen(Engine, 'connect', _enable_sqlite_foreign_keys)
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     CORS(app)
     
+    from .utils.response_cache import page_cache
+    page_cache.init_app(app)
+    from .services.view_counter import view_counter
+    view_counter.init_app(app)
+    from .services.maintenance import maintenance
+    maintenance.init_app(app)
+    
     # Import models and blueprints
     from .models.user import User
     from .routes.auth import auth
@@ -58,6 +111,7 @@ def create_app():
     from .routes.main import main
     from .routes.admin import admin
     from .routes.progression import progression_bp
+    from .routes.feed import feed_bp
     
     # Register blueprints
     app.register_blueprint(auth, url_prefix='/auth')
@@ -65,7 +119,12 @@ def create_app():
     app.register_blueprint(main, url_prefix='/')
     app.register_blueprint(admin, url_prefix='/admin')
     app.register_blueprint(progression_bp, url_prefix='/progression')
-    
+    app.register_blueprint(feed_bp, url_prefix='/feed')
+
+    # Maintenance CLI commands (flask search-reindex, ...)
+    from .commands import register_commands
+    register_commands(app)
+
     # Setup login manager
     @login_manager.user_loader
     def load_user(user_id):
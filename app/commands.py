@@ -0,0 +1,122 @@
+"""
+Maintenance commands (run with `flask <command>`)
+"""
+import click
+
+
+def register_commands(app):
+    """Attach maintenance CLI commands to the app"""
+
+    @app.cli.command('search-reindex')
+    @click.option('--batch-size', default=500, show_default=True, help='Comics per commit')
+    def search_reindex(batch_size):
+        """Rebuild accent-folded search documents for every comic."""
+        from app.services.search import SearchService
+        total = SearchService.reindex_all(batch_size=batch_size)
+        click.echo(f'Indexed {total} comics.')
+
+    @app.cli.command('tags-rebuild-counts')
+    def tags_rebuild_counts():
+        """Recompute tag usage counts from the comic_tags table."""
+        from app.services.tags import TagService
+        updated = TagService.rebuild_counts()
+        click.echo(f'Updated {updated} tags.')
+
+    @app.cli.command('facets-rebuild')
+    def facets_rebuild():
+        """Recount genre/status/content_type facets from the comics table."""
+        from app.services.facets import FacetService
+        rows = FacetService.rebuild()
+        click.echo(f'Wrote {rows} facet rows.')
+
+    @app.cli.command('chapter-stats-backfill')
+    def chapter_stats_backfill():
+        """Recompute chapter_count / latest_chapter_number / last_chapter_at for all comics."""
+        from app.services.chapter_stats import ChapterStatsService
+        updated = ChapterStatsService.backfill()
+        click.echo(f'Updated chapter stats for {updated} comics.')
+
+    @app.cli.command('views-compact')
+    def views_compact():
+        """Roll old hourly view buckets into daily ones (and old daily into monthly)."""
+        from app.services.view_buckets import ViewBucketService
+        hours, days = ViewBucketService.compact()
+        click.echo(f'Compacted {hours} hourly and {days} daily buckets.')
+
+    @app.cli.command('rankings-refresh')
+    def rankings_refresh():
+        """Recompute ranking snapshots for every period/type/genre now (the maintenance scheduler also runs this)."""
+        from app.services.rankings import RankingService
+        combos = RankingService.refresh()
+        click.echo(f'Refreshed {combos} ranking snapshots.')
+
+    @app.cli.command('ratings-reconcile')
+    def ratings_reconcile():
+        """Recompute rating sums/counts, averages and top-rated scores from user_rating."""
+        from app.services.ratings import RatingService
+        drifted, updated = RatingService.reconcile()
+        click.echo(f'Recomputed ratings of {updated} comics ({drifted} had drifted).')
+
+    @app.cli.command('chapters-compress')
+    @click.option('--codec', type=click.Choice(['gzip', 'plain']), default='gzip', show_default=True)
+    @click.option('--batch-size', default=200, show_default=True, help='Chapters per commit')
+    def chapters_compress(codec, batch_size):
+        """Re-encode stored novel chapter text (gzip to compress, plain to undo)."""
+        from app.services.chapter_bodies import ChapterBodyService
+        rewritten, before, after = ChapterBodyService.reencode(codec, batch_size=batch_size)
+        saved = before - after
+        ratio = (saved / before * 100) if before else 0.0
+        click.echo(f'Re-encoded {rewritten} chapters: {before:,} -> {after:,} bytes '
+                   f'(saved {saved:,} bytes, {ratio:.1f}%).')
+
+    @app.cli.command('chapters-index-paragraphs')
+    @click.option('--batch-size', default=200, show_default=True, help='Chapters per commit')
+    def chapters_index_paragraphs(batch_size):
+        """Compute paragraph offsets for novel chapters that do not have them yet."""
+        from app.services.chapter_bodies import ChapterBodyService
+        indexed = ChapterBodyService.index_paragraphs(batch_size=batch_size)
+        click.echo(f'Indexed paragraphs of {indexed} chapters.')
+
+    @app.cli.command('chapters-hash-backfill')
+    @click.option('--batch-size', default=500, show_default=True, help='Chapters per commit')
+    def chapters_hash_backfill(batch_size):
+        """Compute content_hash for chapters that do not have one yet."""
+        from app.services.chapter_duplicates import ChapterDuplicateService
+        updated = ChapterDuplicateService.backfill(batch_size=batch_size)
+        click.echo(f'Hashed {updated} chapters.')
+
+    @app.cli.command('chapters-import')
+    @click.argument('comic_id', type=int)
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--dry-run', is_flag=True, help='Only report numbering conflicts and duplicates')
+    @click.option('--batch-size', default=10, show_default=True, help='Chapters per upload batch / commit')
+    @click.option('--skip-duplicates', is_flag=True, help='Do not import chapters with duplicate content')
+    def chapters_import(comic_id, path, dry_run, batch_size, skip_duplicates):
+        """Import chapters from a .cbz/.zip (one folder per chapter) or a JSON array."""
+        from app import db
+        from app.models.comic import Comic
+        from app.services.chapter_import import ChapterImportService, ChapterImportError
+        comic = db.session.get(Comic, comic_id)
+        if comic is None:
+            raise click.ClickException(f'Comic {comic_id} not found.')
+        with open(path, 'rb') as f:
+            try:
+                chapters, zf = ChapterImportService.open(f)
+            except ChapterImportError as e:
+                raise click.ClickException(str(e))
+            result = ChapterImportService.run(comic, chapters, zf, dry_run=dry_run,
+                                              batch_size=batch_size, skip_duplicates=skip_duplicates)
+        for item in result['chapters']:
+            click.echo(f"{item['chapter_number']:>8g}  {item['status']:<10}  {item['pages']:>4} pages  "
+                       f"{item['title'] or ''}  {item['detail'] or ''}")
+        for error in result['errors']:
+            click.echo(f"Error {', '.join(f'{n:g}' for n in error['chapters'])}: {error['error']}", err=True)
+        if not dry_run:
+            click.echo(f"Imported {len(result['created'])} of {len(result['chapters'])} chapters.")
+
+    @app.cli.command('upload-jobs-resume')
+    def upload_jobs_resume():
+        """Finish background chapter uploads interrupted by a worker restart."""
+        from app.services.upload_jobs import UploadJobService
+        job_ids = UploadJobService.resume_interrupted()
+        click.echo(f'Resumed {len(job_ids)} upload jobs.')
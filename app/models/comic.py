@@ -1,5 +1,13 @@
+import json
 from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy.dialects import mysql
+from sqlalchemy.exc import IntegrityError
 from app import db
+from app.utils.text_codec import PLAIN, encode_text, decode_text
+from app.utils.paragraphs import index_paragraphs, dump_offsets, load_offsets, slice_paragraphs
+from app.utils.content_hash import text_hash, image_set_hash
+from app.utils.perceptual_hash import chunks, to_signed, to_unsigned
 
 class Comic(db.Model):
     __tablename__ = 'comics'
@@ -20,13 +28,51 @@ class Comic(db.Model):
     chapters = db.relationship('app.models.comic.Chapter', backref='comic', lazy=True, cascade='all, delete-orphan')
     views = db.Column(db.Integer, default=0)
     status = db.Column(db.String(20), default='ongoing')  # ongoing, completed, hiatus
-    rating = db.Column(db.Float, default=0.0)
+    # Rating aggregates (RatingService): sum/count chính xác, rating và rating_score suy ra từ chúng
+    rating = db.Column(db.Float, default=0.0)  # điểm trung bình hiển thị = rating_sum / rating_count
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
     rating_count = db.Column(db.Integer, default=0)  # Số lượt đánh giá để tính trung bình
+    rating_score = db.Column(db.Float, default=0.0, nullable=False)  # Bayesian average, "top rated" sort
     follow_count = db.Column(db.Integer, default=0)  # Số người theo dõi
-    tags = db.Column(db.String(500))  # Store as comma-separated values
+    tags = db.Column(db.String(500))  # Store as comma-separated values (hiển thị); bản chuẩn hóa ở tag_set
+    # Denormalized chapter stats (ChapterStatsService) - list pages không cần đọc bảng chapters
+    chapter_count = db.Column(db.Integer, default=0, nullable=False)
+    latest_chapter_number = db.Column(db.Float, nullable=True)
+    last_chapter_at = db.Column(db.DateTime, nullable=True)
+    # Bumped whenever chapters change; invalidates cached ChapterIndex in every worker
+    chapter_index_version = db.Column(db.Integer, default=0, nullable=False)
     
     # Relationship với User (người đăng)
     uploader = db.relationship('User', backref=db.backref('uploaded_comics', lazy=True), foreign_keys=[uploader_id])
+    __table_args__ = (
+        # Keyset pagination (see app/utils/pagination.py)
+        db.Index('ix_comics_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_comics_uploader_created_at_id', 'uploader_id', 'created_at', 'id'),
+        db.Index('ix_comics_rating_score_id', 'rating_score', 'id'),
+    )
+    
+    # Normalized tags (kept in sync with `tags` by TagService)
+    tag_set = db.relationship('Tag', secondary='comic_tags', lazy=True,
+                              backref=db.backref('comics', lazy='dynamic'))
+
+comic_tags = db.Table('comic_tags',
+    db.Column('comic_id', db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    # Inverted index: tag -> comics
+    db.Index('ix_comic_tags_tag_id_comic_id', 'tag_id', 'comic_id')
+)
+
+class Tag(db.Model):
+    __tablename__ = 'tags'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # Tên hiển thị (giữ dấu)
+    slug = db.Column(db.String(100), nullable=False, unique=True)  # Accent-folded key, e.g. 'tu-tien'
+    usage_count = db.Column(db.Integer, default=0, nullable=False)  # Số truyện đang dùng tag
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Tag {self.slug} ({self.usage_count})>'
 
 class Chapter(db.Model):
     __tablename__ = 'chapters'
@@ -35,11 +81,215 @@ class Chapter(db.Model):
     comic_id = db.Column(db.Integer, db.ForeignKey('comics.id'), nullable=False)
     chapter_number = db.Column(db.Float, nullable=False)  # Using float for chapters like 1.5
     title = db.Column(db.String(200))
-    content = db.Column(db.Text)  # For novel chapters
-    image_urls = db.Column(db.Text)  # Store as JSON string for comic chapters
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     views = db.Column(db.Integer, default=0)
+    # sha256 of the text (novel) or page list (comic), set on write; duplicate checks are index lookups
+    content_hash = db.Column(db.String(64))
+    
+    # Nội dung nặng nằm ở chapter_bodies; chỉ trang đọc truyện mới load
+    body = db.relationship('ChapterBody', uselist=False, lazy='select',
+                           cascade='all, delete-orphan', passive_deletes=True)
+    # Trang ảnh của truyện tranh, theo thứ tự
+    images = db.relationship('ChapterImage', order_by='ChapterImage.position', lazy='select',
+                             cascade='all, delete-orphan', passive_deletes=True)
+    
+    __table_args__ = (
+        # Chapter lookup and prev/next navigation within a comic
+        db.Index('ix_chapters_comic_id_chapter_number', 'comic_id', 'chapter_number'),
+        # New chapters of followed comics (FeedService): one index range per follow
+        db.Index('ix_chapters_comic_id_created_at', 'comic_id', 'created_at'),
+        # Duplicate content within a comic / across the catalog
+        db.Index('ix_chapters_comic_id_content_hash', 'comic_id', 'content_hash'),
+        db.Index('ix_chapters_content_hash', 'content_hash'),
+    )
+    
+    def _body(self):
+        if self.body is None:
+            self.body = ChapterBody()
+        return self.body
+    
+    @property
+    def content(self):
+        """Novel chapter text (decompressed if stored compressed)"""
+        return self.body.text if self.body is not None else None
+    
+    @content.setter
+    def content(self, value):
+        self._body().set_text(value)
+        self.content_hash = text_hash(value)
+    
+    @property
+    def image_list(self):
+        """Comic chapter page URLs in reading order"""
+        return [image.url for image in self.images]
+    
+    def set_images(self, images):
+        """Replace the page list. Items are URLs or dicts with url/width/height/byte_size/content_hash."""
+        rows = []
+        urls = []
+        for position, image in enumerate(images or []):
+            info = image if isinstance(image, dict) else {'url': image}
+            urls.append(info['url'])
+            host_id, path = ImageHost.split(info['url'])
+            rows.append(ChapterImage(position=position, host_id=host_id, path=path,
+                                     width=info.get('width'), height=info.get('height'),
+                                     byte_size=info.get('byte_size'), content_hash=info.get('content_hash')))
+        if self.images:
+            # Flush deletes first so (chapter_id, position) can be reused
+            self.images = []
+            db.session.flush()
+        self.images = rows
+        if urls:
+            self.content_hash = image_set_hash(urls)
+        elif self.body is None or self.body.text is None:
+            self.content_hash = None
+    
+    @property
+    def image_urls(self):
+        """Page URLs as a JSON string (compatibility with the old column)"""
+        return json.dumps(self.image_list) if self.images else None
+    
+    @image_urls.setter
+    def image_urls(self, value):
+        self.set_images(json.loads(value) if isinstance(value, str) else value)
+    
+class ChapterBody(db.Model):
+    """Heavy chapter payload, split from `chapters` so listing, navigation and
+    counting queries never read it"""
+    __tablename__ = 'chapter_bodies'
+    
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id', ondelete='CASCADE'), primary_key=True)
+    content = db.Column(db.Text)  # For novel chapters (plain storage)
+    # Compressed storage (app/utils/text_codec.py): codec NULL = plain text in `content`
+    content_codec = db.Column(db.String(10))
+    content_compressed = db.Column(db.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'))
+    # Paragraph index computed at write time (app/utils/paragraphs.py), JSON [start, end, ...]
+    paragraph_offsets = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'))
+    paragraph_count = db.Column(db.Integer)
+    
+    @property
+    def text(self):
+        return decode_text(self.content, self.content_compressed, self.content_codec)
+    
+    def set_text(self, value, codec=None):
+        """Store chapter text using `codec` (default: CHAPTER_BODY_CODEC config)"""
+        if codec is None:
+            codec = current_app.config.get('CHAPTER_BODY_CODEC', PLAIN) if has_app_context() else PLAIN
+        self.content, self.content_compressed, self.content_codec = encode_text(value, codec)
+        self.index_paragraphs(value)
+    
+    def index_paragraphs(self, text=None):
+        offsets = index_paragraphs(self.text if text is None else text)
+        self.paragraph_offsets = dump_offsets(offsets) if offsets else None
+        self.paragraph_count = len(offsets) // 2
+    
+    def paragraphs(self, start=0, count=None):
+        """Slice of the chapter's paragraphs (falls back to indexing on the fly)"""
+        text = self.text or ''
+        offsets = load_offsets(self.paragraph_offsets) if self.paragraph_count is not None else index_paragraphs(text)
+        return slice_paragraphs(text, offsets, start, count), len(offsets) // 2
     
+class ImageHost(db.Model):
+    """Shared URL prefix (scheme://host/) of chapter images, stored once"""
+    __tablename__ = 'image_hosts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    prefix = db.Column(db.String(255), nullable=False, unique=True)
+    
+    _ids = {}  # prefix -> id (per process; rows are never updated)
+    _prefixes = {}  # id -> prefix
+    
+    @staticmethod
+    def split(url, create=True):
+        """(host_id, path) for a URL, creating the host row if needed.
+        With create=False an unknown host gives (False, path)."""
+        url = url.strip()
+        scheme_end = url.find('://')
+        slash = url.find('/', scheme_end + 3) if scheme_end != -1 else -1
+        if slash == -1 or slash + 1 > 255:
+            return None, url
+        prefix, path = url[:slash + 1], url[slash + 1:]
+        host_id = ImageHost._ids.get(prefix)
+        if host_id is not None:
+            return host_id, path
+        host = ImageHost.query.filter_by(prefix=prefix).first()
+        if host is not None:
+            ImageHost._ids[prefix] = host.id
+            ImageHost._prefixes[host.id] = prefix
+            return host.id, path
+        if not create:
+            return False, path
+        # New host: not cached until committed, in case this transaction rolls back
+        try:
+            with db.session.begin_nested():
+                host = ImageHost(prefix=prefix)
+                db.session.add(host)
+        except IntegrityError:
+            host = ImageHost.query.filter_by(prefix=prefix).first()
+        return host.id, path
+    
+    @staticmethod
+    def prefix_for(host_id):
+        if host_id is None:
+            return ''
+        prefix = ImageHost._prefixes.get(host_id)
+        if prefix is None:
+            prefix = db.session.query(ImageHost.prefix).filter_by(id=host_id).scalar() or ''
+            ImageHost._prefixes[host_id] = prefix
+        return prefix
+
+class ChapterImage(db.Model):
+    """One page of a comic chapter"""
+    __tablename__ = 'chapter_images'
+    
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id', ondelete='CASCADE'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    host_id = db.Column(db.Integer, db.ForeignKey('image_hosts.id'), nullable=True)  # NULL = path is the full URL
+    path = db.Column(db.Text, nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    byte_size = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of the image bytes, when known
+    
+    @property
+    def url(self):
+        return ImageHost.prefix_for(self.host_id) + self.path
+
+class ImageFingerprint(db.Model):
+    """Perceptual hash (dHash) of an uploaded page or cover (see ImageFingerprintService).
+
+    The 64-bit hash is also split into CHUNKS indexed bands: any hash within
+    Hamming distance < CHUNKS shares at least one band, so near-duplicate
+    lookups are a few index probes.
+    """
+    __tablename__ = 'image_fingerprints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), nullable=False, index=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id', ondelete='CASCADE'), nullable=True, index=True)
+    position = db.Column(db.Integer)  # page index; NULL for a cover
+    url = db.Column(db.Text)
+    phash = db.Column(db.BigInteger, nullable=False)  # signed storage of the unsigned 64-bit dHash
+    band_0 = db.Column(db.Integer, nullable=False, index=True)
+    band_1 = db.Column(db.Integer, nullable=False, index=True)
+    band_2 = db.Column(db.Integer, nullable=False, index=True)
+    band_3 = db.Column(db.Integer, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def kind(self):
+        return 'cover' if self.chapter_id is None else 'page'
+    
+    @property
+    def value(self):
+        return to_unsigned(self.phash)
+    
+    @staticmethod
+    def build(value, comic_id, chapter_id=None, position=None, url=None):
+        return ImageFingerprint(comic_id=comic_id, chapter_id=chapter_id, position=position, url=url,
+                                phash=to_signed(value),
+                                **{f'band_{i}': band for i, band in enumerate(chunks(value))})
+
 class UserReadHistory(db.Model):
     __tablename__ = 'user_read_history'
     
@@ -47,7 +297,10 @@ class UserReadHistory(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     comic_id = db.Column(db.Integer, db.ForeignKey('comics.id'), nullable=False)
     chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # lần đọc gần nhất
+    
+    # Một dòng mỗi user/chương (read_chapter upsert); đọc lại chỉ cập nhật created_at
+    __table_args__ = (db.UniqueConstraint('user_id', 'chapter_id', name='unique_user_chapter_read'),)
     
     user = db.relationship('User', backref=db.backref('read_history', lazy=True))
     comic = db.relationship('Comic')
@@ -63,13 +316,21 @@ class UserRating(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint: mỗi user chỉ được vote 1 lần cho mỗi comic
-    __table_args__ = (db.UniqueConstraint('user_id', 'comic_id', name='unique_user_comic_rating'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'comic_id', name='unique_user_comic_rating'),
+        db.Index('ix_user_rating_comic_id', 'comic_id'),  # per-comic aggregates (ratings-reconcile)
+    )
     
     user = db.relationship('User', backref=db.backref('ratings', lazy=True))
     comic = db.relationship('Comic', backref=db.backref('user_ratings', lazy=True))
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # Threaded loading (CommentThreadService): top-level page per comic, replies per parent
+        db.Index('ix_comments_comic_parent_created_at_id', 'comic_id', 'parent_id', 'created_at', 'id'),
+        db.Index('ix_comments_parent_created_at_id', 'parent_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -136,4 +397,172 @@ class Follow(db.Model):
     
     # Relationships
     user = db.relationship('User', backref=db.backref('follows', lazy=True))
-    comic = db.relationship('Comic', backref=db.backref('followers', lazy=True))
\ No newline at end of file
+    comic = db.relationship('Comic', backref=db.backref('followers', lazy=True))
+
+class ComicSearchDocument(db.Model):
+    """Accent-folded search document for a comic (one row per comic).
+
+    Folded columns keep Vietnamese text without diacritics ("Tu Tiên" -> "tu tien")
+    so that searches typed without accents still match. On PostgreSQL the
+    `document` column is indexed with a tsvector GIN index and `title`/`author`
+    with trigram indexes (see migration add_search_index).
+    """
+    __tablename__ = 'comic_search_documents'
+
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), primary_key=True)
+    title = db.Column(db.String(200))
+    author = db.Column(db.String(100))
+    genre = db.Column(db.String(100))
+    tags = db.Column(db.String(500))
+    document = db.Column(db.Text, nullable=False, default='')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    comic = db.relationship('Comic', backref=db.backref('search_document', uselist=False, lazy=True,
+                                                        cascade='all, delete-orphan'))
+
+
+class SearchTerm(db.Model):
+    """Inverted index used when the database has no native full-text search (SQLite, MySQL)"""
+    __tablename__ = 'search_terms'
+
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(64), nullable=False)
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), nullable=False, index=True)
+    field = db.Column(db.String(10), nullable=False)  # title, author, genre, tags
+    weight = db.Column(db.Integer, default=1, nullable=False)  # Số lần xuất hiện trong field
+
+    __table_args__ = (db.Index('ix_search_terms_term_field', 'term', 'field'),)
+
+    comic = db.relationship('Comic', backref=db.backref('search_terms', lazy=True, cascade='all, delete-orphan'))
+
+
+class FacetCount(db.Model):
+    """Per-value comic counts for listing filters (genre, status, content_type)"""
+    __tablename__ = 'facet_counts'
+
+    facet = db.Column(db.String(20), primary_key=True)  # genre, status, content_type
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class ComicViewBucket(db.Model):
+    """Views of a comic within one time bucket (hour, day or month).
+
+    Recent views (comic pages and chapter reads) are kept per hour; compaction
+    (maintenance scheduler or `flask views-compact`) rolls old hourly
+    buckets into daily ones and old daily buckets into monthly ones, so
+    windowed rankings only sum a bounded number of rows.
+    """
+    __tablename__ = 'comic_view_buckets'
+
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # hour, day, month
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    views = db.Column(db.Integer, default=0, nullable=False)
+
+    # Ranking queries: WHERE bucket_start >= :since GROUP BY comic_id
+    __table_args__ = (db.Index('ix_comic_view_buckets_start_comic', 'bucket_start', 'comic_id'),)
+
+
+class RankingSnapshot(db.Model):
+    """Materialized top-N ranking for one (period, content_type, genre).
+
+    Today's rows are overwritten on every refresh; rows of earlier dates are
+    the day's final ranking and drive history and rank movement.
+    """
+    __tablename__ = 'ranking_snapshots'
+
+    snapshot_date = db.Column(db.Date, primary_key=True)
+    period = db.Column(db.String(10), primary_key=True)  # day, week, month, all
+    content_type = db.Column(db.String(10), primary_key=True)  # all, comics, novels
+    genre = db.Column(db.String(100), primary_key=True, default='')  # '' = every genre
+    rank = db.Column(db.Integer, primary_key=True)
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), nullable=False)
+    score = db.Column(db.BigInteger, default=0, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UploadJob(db.Model):
+    """Background upload of a comic chapter's pages (see UploadJobService).
+
+    The Chapter row is only created once every file has uploaded; failed
+    files stay staged on disk and can be retried individually.
+    """
+    __tablename__ = 'upload_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    comic_id = db.Column(db.Integer, db.ForeignKey('comics.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    chapter_number = db.Column(db.Float, nullable=False)
+    title = db.Column(db.String(200))
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, completed, failed
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapters.id', ondelete='SET NULL'), nullable=True)
+    error = db.Column(db.Text)
+    warning = db.Column(db.Text)  # e.g. pages similar to another comic's
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    files = db.relationship('UploadJobFile', order_by='UploadJobFile.position', lazy=True,
+                            cascade='all, delete-orphan', passive_deletes=True)
+
+    __table_args__ = (db.Index('ix_upload_jobs_status_updated_at', 'status', 'updated_at'),)
+
+    def to_dict(self):
+        done = sum(1 for f in self.files if f.status == 'done')
+        return {
+            'id': self.id,
+            'comic_id': self.comic_id,
+            'chapter_number': self.chapter_number,
+            'status': self.status,
+            'chapter_id': self.chapter_id,
+            'error': self.error,
+            'warning': self.warning,
+            'total': len(self.files),
+            'done': done,
+            'failed': sum(1 for f in self.files if f.status == 'failed'),
+            'files': [f.to_dict() for f in self.files],
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class UploadJobFile(db.Model):
+    """One staged page of an UploadJob"""
+    __tablename__ = 'upload_job_files'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('upload_jobs.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    filename = db.Column(db.String(255))
+    staged_path = db.Column(db.String(500))
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    url = db.Column(db.Text)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    byte_size = db.Column(db.Integer)
+    content_hash = db.Column(db.String(64))
+    phash = db.Column(db.BigInteger)  # signed dHash, see ImageFingerprint
+    error = db.Column(db.Text)
+
+    def to_dict(self):
+        return {
+            'position': self.position,
+            'filename': self.filename,
+            'status': self.status,
+            'attempts': self.attempts,
+            'url': self.url,
+            'error': self.error
+        }
+
+
+class MaintenanceLease(db.Model):
+    """Who may run a periodic maintenance job next (see app/services/maintenance.py).
+
+    A worker runs a job only after moving locked_until forward with a
+    conditional UPDATE, so each job runs once per interval across every
+    worker and instance.
+    """
+    __tablename__ = 'maintenance_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    locked_until = db.Column(db.DateTime, nullable=False)
@@ -1,3 +1,4 @@
+import time
 from datetime import datetime
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -30,6 +31,9 @@ class User(db.Model, UserMixin):
     level = db.Column(db.Integer, default=1)  # Cấp độ
     rank_type = db.Column(db.String(50), default='tu_tien')  # Loại cấp bậc: tu_tien, ma_vuong, vuong_gia
     
+    # Chương mới từ truyện theo dõi (FeedService): đã xem feed đến thời điểm này
+    feed_seen_at = db.Column(db.DateTime, nullable=True)
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
@@ -269,6 +273,20 @@ class RankTitle(db.Model):
     
     __table_args__ = (db.UniqueConstraint('rank_type', 'level', name='unique_rank_level'),)
     
+    CACHE_TTL = 300  # seconds
+    _cache = None  # (loaded_at, {(rank_type, level): title})
+    
+    @staticmethod
+    def _titles():
+        """All titles in one query, memoized per process (comment lists render one per author)"""
+        cached = RankTitle._cache
+        if cached and time.monotonic() - cached[0] < RankTitle.CACHE_TTL:
+            return cached[1]
+        titles = {(rank_type, level): title for rank_type, level, title in
+                  db.session.query(RankTitle.rank_type, RankTitle.level, RankTitle.title)}
+        RankTitle._cache = (time.monotonic(), titles)
+        return titles
+    
     @staticmethod
     def get_title_for_level(rank_type, level):
         """Get title for specific rank type and level"""
@@ -282,15 +300,16 @@ class RankTitle(db.Model):
         # Convert to display name if needed
         display_rank_type = rank_type_mapping.get(rank_type, rank_type)
         
-        title_obj = RankTitle.query.filter_by(rank_type=display_rank_type, level=level).first()
-        if title_obj:
-            return title_obj.title
+        titles = RankTitle._titles()
+        title = titles.get((display_rank_type, level))
+        if title:
+            return title
         
         # For levels higher than available in database, use highest available title
         if display_rank_type == 'Vương Giả' and level > 10:
-            highest_title = RankTitle.query.filter_by(rank_type=display_rank_type).order_by(RankTitle.level.desc()).first()
-            if highest_title:
-                return highest_title.title
+            levels = [lvl for rt, lvl in titles if rt == display_rank_type]
+            if levels:
+                return titles[(display_rank_type, max(levels))]
         
         return f"Cấp {level}"
 
@@ -306,4 +325,6 @@ class UserActivity(db.Model):
     reference_id = db.Column(db.Integer)  # ID of comic, chapter, comment, etc.
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_user_activities_user_created_at_id', 'user_id', 'created_at', 'id'),)
+    
     user = db.relationship('User', backref=db.backref('activities', lazy=True))
\ No newline at end of file
@@ -1,12 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from ..models.comic import Comic
+from ..models.comic import Comic, UploadJob
 from ..models.user import User
 from ..decorators import admin_required
 from ..services.progression import ProgressionService
+from ..services.search import SearchService
+from ..services.tags import TagService
+from ..services.facets import FacetService
+from ..services.chapter_stats import ChapterStatsService
+from ..services.chapter_duplicates import ChapterDuplicateService
+from ..services.image_fingerprints import ImageFingerprintService
+from ..services.upload_jobs import UploadJobService
 from .. import db
-from ..utils.image_upload import upload_to_imgbb, is_valid_image, get_file_size_mb
+from ..utils.image_upload import upload_to_imgbb, check_image_file
+from ..utils.pagination import keyset_paginate, InvalidCursor
+from ..utils.response_cache import invalidate_pages, comic_tags, page_cache
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -19,8 +28,11 @@ def delete_comic(comic_id):
         flash('Bạn không có quyền xóa truyện này.', 'danger')
         return redirect(url_for('comic.view_comic', comic_id=comic.id))
     try:
+        TagService.release_comic(comic)
+        FacetService.record_delete(comic)
         db.session.delete(comic)
         db.session.commit()
+        invalidate_pages(*comic_tags(comic_id))
         flash('Đã xóa truyện thành công!', 'success')
         return redirect(url_for('comic.get_comics'))
     except Exception as e:
@@ -103,29 +115,35 @@ def upload_comic():
         
         # Xử lý upload ảnh bìa
         final_cover_image = None
+        cover_info = {}  # url/phash of an uploaded cover
         
         # Kiểm tra xem có file upload không
         if 'cover_file' in request.files:
             cover_file = request.files['cover_file']
             
             if cover_file and cover_file.filename:
-                # Validate file
-                if not is_valid_image(cover_file):
-                    flash('❌ Định dạng file không hợp lệ! Chỉ chấp nhận: PNG, JPG, JPEG, GIF, WEBP', 'danger')
-                    return redirect(url_for('admin.upload_comic'))
-                
-                # Check file size (max 10MB)
-                if get_file_size_mb(cover_file) > 10:
+                # Validate file: extension, magic bytes, size (max 10MB) in one pass
+                check = check_image_file(cover_file, max_mb=10)
+                if check.reason == 'too_large':
                     flash('❌ Kích thước file quá lớn! Tối đa 10MB', 'danger')
                     return redirect(url_for('admin.upload_comic'))
+                if not check.ok:
+                    flash('❌ Định dạng file không hợp lệ! Chỉ chấp nhận: PNG, JPG, JPEG, GIF, WEBP', 'danger')
+                    return redirect(url_for('admin.upload_comic'))
                 
                 # Upload to ImgBB
                 flash('⏳ Đang upload ảnh lên cloud...', 'info')
-                final_cover_image = upload_to_imgbb(cover_file)
+                final_cover_image = upload_to_imgbb(cover_file, cover_info)
                 
                 if not final_cover_image:
                     flash('❌ Upload ảnh thất bại! Vui lòng thử lại hoặc sử dụng URL', 'danger')
                     return redirect(url_for('admin.upload_comic'))
+                
+                # Ảnh bìa gần giống ảnh của truyện khác (perceptual hash)
+                warning = ImageFingerprintService.warning_text(
+                    ImageFingerprintService.similar_comics([cover_info.get('phash')]), 1)
+                if warning:
+                    flash(warning, 'warning')
         
         # Nếu không upload file, dùng URL từ input
         if not final_cover_image:
@@ -144,7 +162,14 @@ def upload_comic():
                 uploader_id=current_user.id
             )
             db.session.add(comic)
+            TagService.sync_comic(comic)
+            SearchService.index_comic(comic)
+            FacetService.record_create(comic)
+            if cover_info.get('phash') is not None:
+                db.session.flush()
+                ImageFingerprintService.record_cover(comic, final_cover_image, cover_info['phash'])
             db.session.commit()
+            invalidate_pages('catalog', 'homepage')
             
             # Cộng điểm progression cho việc upload comic
             progression_result = ProgressionService.award_points(current_user.id, 'upload_comic', reference_id=comic.id)
@@ -209,7 +234,6 @@ def check_duplicate():
 @login_required
 def add_chapter(comic_id):
     from ..models.comic import Chapter
-    import json, hashlib
     
     comic = Comic.query.get_or_404(comic_id)
     # Quyền: moderator (bao gồm admin) có thể thêm chapter bất kỳ; uploader chỉ thêm vào truyện của mình
@@ -242,16 +266,9 @@ def add_chapter(comic_id):
                 flash('Nội dung chương là bắt buộc cho truyện chữ!', 'danger')
                 return redirect(url_for('admin.add_chapter', comic_id=comic_id))
             content_trimmed = content.strip()
-            content_hash = hashlib.sha256(content_trimmed.encode('utf-8')).hexdigest()
 
-            # Optimized: Use DB index instead of loading all chapters - future enhancement: add content_hash column
-            # For now: only check last 50 chapters (most likely duplicates are recent)
-            potential_duplicate = None
-            recent_chapters = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number.desc()).limit(50).all()
-            for ch in recent_chapters:
-                if ch.content and hashlib.sha256(ch.content.strip().encode('utf-8')).hexdigest() == content_hash:
-                    potential_duplicate = ch
-                    break
+            # Same text already in any chapter of this comic? (index on comic_id, content_hash)
+            potential_duplicate = ChapterDuplicateService.find_text(content_trimmed, comic_id=comic_id)
 
             if potential_duplicate:
                 flash(f'⚠️ Nội dung trùng với chương {potential_duplicate.chapter_number} (ID: {potential_duplicate.id}).', 'warning')
@@ -265,7 +282,9 @@ def add_chapter(comic_id):
                     image_urls=None
                 )
                 db.session.add(chapter)
+                ChapterStatsService.refresh(comic_id, bump_updated=True)
                 db.session.commit()
+                invalidate_pages(*comic_tags(comic_id))
                 msg = f'Đã thêm chương {chapter_number} thành công!'
                 if potential_duplicate:
                     msg += ' (Cảnh báo trùng)'
@@ -278,30 +297,52 @@ def add_chapter(comic_id):
         else:
             # Check for file upload first
             image_urls = []
+            image_infos = []  # URL + size/hash for uploaded files (chapter_images)
             if 'chapter_images' in request.files:
                 files = request.files.getlist('chapter_images')
                 if files and files[0].filename:  # Check if files were actually uploaded
-                    from ..utils.image_upload import upload_to_imgbb, is_valid_image, get_file_size_mb
+                    from ..utils.image_upload import upload_images
                     
                     for file in files:
-                        if not is_valid_image(file):
-                            flash(f'❌ File không hợp lệ: {file.filename}', 'danger')
-                            return redirect(url_for('admin.add_chapter', comic_id=comic_id))
-                        
-                        if get_file_size_mb(file) > 10:
+                        check = check_image_file(file, max_mb=10)
+                        if check.reason == 'too_large':
                             flash(f'❌ File quá lớn (>10MB): {file.filename}', 'danger')
                             return redirect(url_for('admin.add_chapter', comic_id=comic_id))
-                        
-                        # Upload to ImgBB
-                        img_url = upload_to_imgbb(file)
-                        if img_url:
-                            image_urls.append(img_url)
-                        else:
-                            flash(f'❌ Không thể upload: {file.filename}', 'danger')
+                        if not check.ok:
+                            flash(f'❌ File không hợp lệ: {file.filename}', 'danger')
                             return redirect(url_for('admin.add_chapter', comic_id=comic_id))
                     
+                    # Upload nền: lưu file tạm, trả job id ngay; chương chỉ được tạo khi mọi ảnh đã upload
+                    if request.form.get('background') == '1':
+                        job = UploadJobService.create(comic, current_user.id, chapter_number_float, title, files)
+                        UploadJobService.start(job.id)
+                        return jsonify({
+                            'job_id': job.id,
+                            'status': job.status,
+                            'status_url': url_for('admin.upload_job_status', job_id=job.id),
+                            'retry_url': url_for('admin.retry_upload_job', job_id=job.id)
+                        }), 202
+                    
+                    # Upload to ImgBB song song (thread pool, retry, kết quả giữ đúng thứ tự trang)
+                    results = upload_images(files)
+                    failed = [r for r in results if r.url is None]
+                    if failed:
+                        names = ', '.join(r.filename for r in failed[:5])
+                        flash(f'❌ Không thể upload {len(failed)}/{len(results)} ảnh ({names}): {failed[0].error}', 'danger')
+                        return redirect(url_for('admin.add_chapter', comic_id=comic_id))
+                    image_urls = [r.url for r in results]
+                    image_infos = [r.info for r in results]
+                    
                     if image_urls:
                         flash(f'✅ Đã upload {len(image_urls)} ảnh lên ImgBB!', 'success')
+                    
+                    # Trang gần giống ảnh của truyện khác (bản re-upload với URL mới)
+                    warning = ImageFingerprintService.warning_text(
+                        ImageFingerprintService.similar_comics([i.get('phash') for i in image_infos],
+                                                               exclude_comic_id=comic_id),
+                        len(image_infos))
+                    if warning:
+                        flash(warning, 'warning')
             
             # Fallback to URL input if no files uploaded
             if not image_urls:
@@ -311,21 +352,8 @@ def add_chapter(comic_id):
                     return redirect(url_for('admin.add_chapter', comic_id=comic_id))
                 image_urls = [u.strip() for u in image_urls_text.split('\n') if u.strip()]
             
-            img_hash = hashlib.sha256('\n'.join(image_urls).encode('utf-8')).hexdigest()
-            
-            # Optimized: check last 50 chapters only
-            potential_img_duplicate = None
-            recent_chapters = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number.desc()).limit(50).all()
-            for ch in recent_chapters:
-                if ch.image_urls:
-                    try:
-                        existing_list = json.loads(ch.image_urls)
-                        existing_hash = hashlib.sha256('\n'.join(existing_list).encode('utf-8')).hexdigest()
-                        if existing_hash == img_hash:
-                            potential_img_duplicate = ch
-                            break
-                    except Exception:
-                        continue
+            # Same page list already used by a chapter of this comic? (index on comic_id, content_hash)
+            potential_img_duplicate = ChapterDuplicateService.find_images(image_urls, comic_id=comic_id)
                         
             if potential_img_duplicate:
                 flash(f'⚠️ Bộ ảnh trùng với chương {potential_img_duplicate.chapter_number} (ID: {potential_img_duplicate.id}).', 'warning')
@@ -333,11 +361,15 @@ def add_chapter(comic_id):
                 chapter = Chapter(
                     comic_id=comic_id,
                     chapter_number=chapter_number_float,
-                    title=title,
-                    image_urls=json.dumps(image_urls)
+                    title=title
                 )
+                chapter.set_images(image_infos or image_urls)
                 db.session.add(chapter)
+                ChapterStatsService.refresh(comic_id, bump_updated=True)
+                if image_infos:
+                    ImageFingerprintService.record_pages(chapter, image_infos)
                 db.session.commit()
+                invalidate_pages(*comic_tags(comic_id))
                 msg = f'Chapter {chapter_number} added successfully!'
                 if potential_img_duplicate:
                     msg += ' (Cảnh báo trùng)'
@@ -354,6 +386,40 @@ def add_chapter(comic_id):
     else:
         return render_template('admin/add_chapter.html', comic=comic)
 
+@admin.route('/comic/<int:comic_id>/import-chapters', methods=['POST'])
+@login_required
+def import_chapters(comic_id):
+    """Bulk import from a .cbz/.zip (one folder per chapter, or .txt per chapter) or a JSON array.
+    Dry run by default: send dry_run=0 to import after reviewing the report.
+
+    The import runs inside the request, so it is for small batches only: at most
+    ChapterImportService.MAX_REQUEST_PAGES archive pages to upload (413 otherwise).
+    Large archives go through `flask chapters-import` on the server."""
+    from ..services.chapter_import import ChapterImportService, ChapterImportError, ChapterImportTooLarge
+    comic = Comic.query.get_or_404(comic_id)
+    if not (current_user.is_moderator() or (comic.uploader_id == current_user.id and current_user.is_uploader())):
+        return jsonify({'error': 'Không có quyền'}), 403
+    file = request.files.get('archive')
+    if not file or not file.filename:
+        return jsonify({'error': 'Chưa chọn file import (.cbz, .zip, .json)'}), 400
+    try:
+        chapters, zf = ChapterImportService.open(file)
+    except ChapterImportError as e:
+        return jsonify({'error': str(e)}), 400
+    batch_size = max(1, min(request.form.get('batch_size', ChapterImportService.BATCH_SIZE, type=int), 100))
+    try:
+        result = ChapterImportService.run(comic, chapters, zf,
+                                          dry_run=request.form.get('dry_run', '1') != '0',
+                                          batch_size=batch_size,
+                                          skip_duplicates=request.form.get('skip_duplicates') == '1',
+                                          max_upload_pages=ChapterImportService.MAX_REQUEST_PAGES)
+    except ChapterImportTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    finally:
+        if zf is not None:
+            zf.close()
+    return jsonify(result), 200 if result['dry_run'] else 201
+
 @admin.route('/comic/<int:comic_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_comic(comic_id):
@@ -363,10 +429,15 @@ def edit_comic(comic_id):
         flash('Bạn không có quyền sửa truyện này.', 'danger')
         return redirect(url_for('comic.view_comic', comic_id=comic.id))
     if request.method == 'POST':
+        facets_before = FacetService.snapshot(comic)
         comic.title = request.form.get('title')
         comic.author = request.form.get('author')
         comic.description = request.form.get('description')
-        comic.cover_image = request.form.get('cover_image')
+        cover_image = request.form.get('cover_image')
+        if cover_image != comic.cover_image:
+            # Fingerprint belonged to the previous uploaded cover
+            ImageFingerprintService.record_cover(comic, cover_image, None)
+        comic.cover_image = cover_image
         # update content_type if provided
         content_type = request.form.get('content_type')
         if content_type:
@@ -374,7 +445,11 @@ def edit_comic(comic_id):
         comic.genre = request.form.get('genre')
         comic.status = request.form.get('status', 'ongoing')
         comic.tags = request.form.get('tags')
+        TagService.sync_comic(comic)
+        SearchService.index_comic(comic)
+        FacetService.record_update(facets_before, comic)
         db.session.commit()
+        invalidate_pages(*comic_tags(comic.id))
         flash('Comic updated successfully!', 'success')
         return redirect(url_for('comic.view_comic', comic_id=comic.id))
     return render_template('admin/edit_comic.html', comic=comic)
@@ -404,7 +479,7 @@ def edit_chapter(chapter_id):
                 return redirect(url_for('admin.edit_chapter', chapter_id=chapter_id))
             
             chapter.content = content.strip()
-            chapter.image_urls = None
+            chapter.set_images([])
         else:
             # Truyện tranh - cập nhật image URLs
             image_urls_text = request.form.get('image_urls')
@@ -413,9 +488,15 @@ def edit_chapter(chapter_id):
                 return redirect(url_for('admin.edit_chapter', chapter_id=chapter_id))
             
             image_urls = [url.strip() for url in image_urls_text.split('\n') if url.strip()]
-            chapter.image_urls = json.dumps(image_urls)
+            if image_urls != chapter.image_list:
+                chapter.set_images(image_urls)
+                # Pages now come from URLs, not uploads: old fingerprints no longer apply
+                ImageFingerprintService.record_pages(chapter, [])
         
+        # chapter_number có thể đã đổi
+        ChapterStatsService.refresh(comic.id)
         db.session.commit()
+        invalidate_pages(*comic_tags(comic.id))
         flash('Đã cập nhật chương thành công!' if comic.content_type == 'novel' else 'Chapter updated successfully!', 'success')
         return redirect(url_for('comic.view_comic', comic_id=comic.id))
     
@@ -423,9 +504,36 @@ def edit_chapter(chapter_id):
     if comic.content_type == 'novel':
         return render_template('admin/edit_novel_chapter.html', chapter=chapter, comic=comic)
     else:
-        image_urls = '\n'.join(json.loads(chapter.image_urls)) if chapter.image_urls else ''
+        image_urls = '\n'.join(chapter.image_list)
         return render_template('admin/edit_chapter.html', chapter=chapter, comic=comic, image_urls=image_urls)
 
+def _get_upload_job(job_id):
+    job = UploadJob.query.get_or_404(job_id)
+    if not (current_user.is_moderator() or job.user_id == current_user.id):
+        abort(403)
+    return job
+
+@admin.route('/upload-jobs/<int:job_id>')
+@login_required
+def upload_job_status(job_id):
+    """Per-file progress of a background chapter upload"""
+    job = _get_upload_job(job_id)
+    data = job.to_dict()
+    data['stale'] = UploadJobService.is_stale(job)
+    if job.chapter_id:
+        data['chapter_url'] = url_for('comic.read_chapter', comic_id=job.comic_id, chapter_number=job.chapter_number)
+    return jsonify(data)
+
+@admin.route('/upload-jobs/<int:job_id>/retry', methods=['POST'])
+@login_required
+def retry_upload_job(job_id):
+    """Re-upload only the failed pages of a job"""
+    job = _get_upload_job(job_id)
+    if not UploadJobService.retry(job):
+        return jsonify({'error': 'Job đang chạy hoặc đã hoàn thành', 'status': job.status}), 409
+    return jsonify({'job_id': job.id, 'status': job.status,
+                    'status_url': url_for('admin.upload_job_status', job_id=job.id)}), 202
+
 @admin.route('/chapter/<int:chapter_id>/delete', methods=['POST', 'GET'])
 @login_required
 def delete_chapter(chapter_id):
@@ -451,7 +559,9 @@ def delete_chapter(chapter_id):
 
         # Xóa chapter
         db.session.delete(chapter)
+        ChapterStatsService.refresh(comic.id)
         db.session.commit()
+        invalidate_pages(*comic_tags(comic.id))
 
         flash(f'Đã xóa "{chapter_title}" thành công! (Đã xóa {histories_deleted} lịch sử đọc)', 'success')
     except Exception as e:
@@ -467,46 +577,64 @@ def delete_chapter(chapter_id):
 @login_required
 def scan_duplicate_chapters(comic_id):
     """Scan chapters of a comic for duplicates (chapter number, content hash or image set hash).
-    Returns JSON report. Applicable for both truyện tranh and truyện chữ."""
+    Returns JSON report. Applicable for both truyện tranh và truyện chữ.
+    ?scope=catalog (moderator) also lists chapters of other comics with the same content."""
     from ..models.comic import Chapter
-    import json, hashlib
+    from sqlalchemy import func
     comic = Comic.query.get_or_404(comic_id)
     # Permission: allow moderator/admin or uploader owner
     if not (current_user.is_moderator() or comic.uploader_id == current_user.id):
         return jsonify({'error': 'Không có quyền'}), 403
 
-    chapters = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number).all()
-    number_map = {}
-    content_hash_map = {}
-    image_hash_map = {}
-
-    for ch in chapters:
-        # Chapter number duplicates
-        number_map.setdefault(ch.chapter_number, []).append(ch.id)
-        # Content hash (only novels with content)
-        if ch.content:
-            h = hashlib.sha256(ch.content.strip().encode('utf-8')).hexdigest()
-            content_hash_map.setdefault(h, []).append({'id': ch.id, 'num': ch.chapter_number})
-        # Image set hash (only comics with image_urls)
-        if ch.image_urls:
-            try:
-                imgs = json.loads(ch.image_urls)
-            except Exception:
-                imgs = []
-            h_img = hashlib.sha256('\n'.join(imgs).encode('utf-8')).hexdigest()
-            image_hash_map.setdefault(h_img, []).append({'id': ch.id, 'num': ch.chapter_number})
-
-    duplicate_numbers = {k: v for k, v in number_map.items() if len(v) > 1}
-    duplicate_contents = [v for v in content_hash_map.values() if len(v) > 1]
-    duplicate_images = [v for v in image_hash_map.values() if len(v) > 1]
-
-    return jsonify({
+    # Chapter number duplicates
+    number_rows = db.session.query(Chapter.chapter_number, func.count(Chapter.id)) \
+        .filter(Chapter.comic_id == comic_id) \
+        .group_by(Chapter.chapter_number).having(func.count(Chapter.id) > 1).all()
+    duplicate_numbers = {}
+    if number_rows:
+        for chapter_id, number in db.session.query(Chapter.id, Chapter.chapter_number) \
+                .filter(Chapter.comic_id == comic_id,
+                        Chapter.chapter_number.in_([number for number, _ in number_rows])) \
+                .order_by(Chapter.id).all():
+            duplicate_numbers.setdefault(number, []).append(chapter_id)
+
+    # Content / image set duplicates: GROUP BY content_hash
+    groups = ChapterDuplicateService.groups(comic_id)
+    duplicate_contents = []
+    duplicate_images = []
+    for group in groups:
+        items = [{'id': item['id'], 'num': item['num']} for item in group]
+        (duplicate_contents if comic.content_type == 'novel' else duplicate_images).append(items)
+
+    report = {
         'comic_id': comic_id,
         'title': comic.title,
         'duplicate_chapter_numbers': duplicate_numbers,
         'duplicate_novel_contents': duplicate_contents,
         'duplicate_image_sets': duplicate_images,
-        'total_chapters': len(chapters)
+        'total_chapters': Chapter.query.filter_by(comic_id=comic_id).count()
+    }
+    if request.args.get('scope') == 'catalog' and current_user.is_moderator():
+        report['duplicates_in_other_comics'] = ChapterDuplicateService.other_comics(comic_id)
+    return jsonify(report)
+
+@admin.route('/comic/<int:comic_id>/scan-similar-images', methods=['GET'])
+@login_required
+def scan_similar_images(comic_id):
+    """Moderator report: pages/cover of this comic that look like images of other comics
+    (perceptual hash within ?distance= bits, default ImageFingerprintService.SCAN_DISTANCE)"""
+    comic = Comic.query.get_or_404(comic_id)
+    if not current_user.is_moderator():
+        return jsonify({'error': 'Không có quyền'}), 403
+    distance = request.args.get('distance', ImageFingerprintService.SCAN_DISTANCE, type=int)
+    # Tra theo band index: chỉ chính xác với khoảng cách < CHUNKS
+    distance = max(0, min(distance, ImageFingerprintService.SCAN_DISTANCE))
+    similar = ImageFingerprintService.scan(comic_id, distance)
+    return jsonify({
+        'comic_id': comic_id,
+        'title': comic.title,
+        'distance': distance,
+        'similar_comics': similar
     })
 
 @admin.route('/user/<int:user_id>/delete', methods=['POST'])
@@ -547,10 +675,18 @@ def my_comics():
         target_user_id = current_user.id
         target_user = current_user
     
-    # Lấy truyện của user
-    pagination = Comic.query.filter_by(uploader_id=target_user_id)\
-        .order_by(Comic.created_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    # Lấy truyện của user (cursor mode: ?cursor=... hoặc ?mode=cursor, không OFFSET)
+    cursor = request.args.get('cursor')
+    if cursor or request.args.get('mode') == 'cursor':
+        try:
+            pagination = keyset_paginate(Comic.query.filter_by(uploader_id=target_user_id),
+                                         Comic.created_at, Comic.id, cursor=cursor, per_page=per_page)
+        except InvalidCursor:
+            return redirect(url_for('admin.my_comics'))
+    else:
+        pagination = Comic.query.filter_by(uploader_id=target_user_id)\
+            .order_by(Comic.created_at.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False)
     
     comics = pagination.items
     
@@ -561,10 +697,8 @@ def my_comics():
     total_follows = db.session.query(db.func.sum(Comic.follow_count))\
         .filter(Comic.uploader_id == target_user_id).scalar() or 0
     
-    # Tính tổng số chapters
-    from ..models.comic import Chapter
-    total_chapters = db.session.query(db.func.count(Chapter.id))\
-        .join(Comic)\
+    # Tính tổng số chapters (từ chapter_count, không quét bảng chapters)
+    total_chapters = db.session.query(db.func.sum(Comic.chapter_count))\
         .filter(Comic.uploader_id == target_user_id).scalar() or 0
     
     stats = {
@@ -679,3 +813,20 @@ def unban_user(user_id):
     db.session.commit()
     flash(f'Đã gỡ cấm tài khoản {user.username}!', 'success')
     return redirect(url_for('admin.manage_users'))
+
+
+@admin.route('/cache/stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Hit/miss counters of this worker's page cache"""
+    return jsonify(page_cache.stats())
+
+
+@admin.route('/cache/clear', methods=['POST'])
+@login_required
+@admin_required
+def cache_clear():
+    """Drop every cached page in this worker"""
+    page_cache.clear()
+    return jsonify({'success': True})
@@ -1,14 +1,40 @@
-from flask import Blueprint, request, jsonify, render_template, current_app, flash, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, stream_template, current_app, flash, redirect, url_for, abort
 from flask_login import current_user, login_required
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from sqlalchemy import func, update
 from app.models.comic import Comic, Chapter, UserReadHistory, UserRating, Comment, Follow, CommentReaction
 from app.schemas.comic import ComicCreate, ChapterCreate
 from app.services.progression import ProgressionService
+from app.services.search import SearchService
+from app.services.tags import TagService
+from app.services.facets import FacetService
+from app.services.chapter_stats import ChapterStatsService
+from app.services.chapter_index import ChapterIndexService
+from app.services.comments import CommentThreadService
+from app.services.ratings import RatingService
+from app.services.view_counter import view_counter
+from app.utils.pagination import keyset_paginate, offset_cursor_paginate, InvalidCursor
+from app.utils.response_cache import cached_page, invalidate_pages, comic_tags
+from app.utils.text_codec import GZIP
+from app.utils.upsert import insert_ignore, upsert, delete_where, increment
 from app import db
-import json
 
 comic = Blueprint('comic', __name__)
 
+# Novel reader: paragraphs rendered with the page / fetched per JSON request
+NOVEL_FIRST_SCREEN = 40
+NOVEL_PARAGRAPH_PAGE = 60
+
+def _on_cached_comic_hit(comic_id):
+    # Page served from cache: still count the view
+    view_counter.record_comic_view(comic_id)
+    db.session.commit()
+
+def _on_cached_chapter_hit(comic_id, chapter_number):
+    view_counter.record_chapter_view(comic_id, chapter_number)
+    db.session.commit()
+
 @comic.route('/<int:comic_id>/rate', methods=['POST'])
 @login_required
 def rate_comic(comic_id):
@@ -19,38 +45,7 @@ def rate_comic(comic_id):
             flash('Điểm đánh giá không hợp lệ.', 'danger')
             return redirect(url_for('comic.view_comic', comic_id=comic.id))
         
-        # Kiểm tra xem user đã vote chưa
-        existing_rating = UserRating.query.filter_by(
-            user_id=current_user.id,
-            comic_id=comic_id
-        ).first()
-        
-        if existing_rating:
-            # User đã vote rồi, cập nhật vote cũ
-            old_rating = existing_rating.rating
-            existing_rating.rating = rating
-            
-            # Cập nhật lại rating trung bình
-            if comic.rating is None:
-                comic.rating = 0.0
-            if comic.rating_count is None or comic.rating_count == 0:
-                comic.rating_count = 1
-                comic.rating = float(rating)
-            else:
-                # Trừ điểm cũ, cộng điểm mới
-                total = comic.rating * comic.rating_count - old_rating + rating
-                comic.rating = total / comic.rating_count
-            
-            flash('Đánh giá của bạn đã được cập nhật!', 'success')
-        else:
-            # User chưa vote, tạo vote mới
-            new_rating = UserRating(
-                user_id=current_user.id,
-                comic_id=comic_id,
-                rating=rating
-            )
-            db.session.add(new_rating)
-            
+        if RatingService.vote(current_user.id, comic_id, rating):
             # Award points for rating
             progression_result = ProgressionService.award_points(
                 current_user.id, 
@@ -58,89 +53,157 @@ def rate_comic(comic_id):
                 comic_id
             )
             
-            # Cập nhật rating trung bình
-            if comic.rating is None:
-                comic.rating = 0.0
-            if comic.rating_count is None:
-                comic.rating_count = 0
-            total = comic.rating * comic.rating_count
-            comic.rating_count += 1
-            comic.rating = (total + rating) / comic.rating_count
-            
             # Show level up message if applicable
             if progression_result and progression_result['level_up']:
                 flash(f'Cảm ơn bạn đã đánh giá! 🎉 Bạn đã lên cấp {progression_result["new_level"]} - {progression_result["rank_title"]}!', 'success')
             else:
                 flash('Cảm ơn bạn đã đánh giá!', 'success')
+        else:
+            flash('Đánh giá của bạn đã được cập nhật!', 'success')
         
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
     except Exception as e:
         db.session.rollback()
         flash(f'Lỗi khi gửi đánh giá: {str(e)}', 'danger')
     return redirect(url_for('comic.view_comic', comic_id=comic.id))
 # ...existing code...
 
-@comic.route('/', methods=['GET'])
-def get_comics():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 12, type=int)
+def _catalog_query(content_type=None):
+    """Build the filtered catalog query from request args (shared by pages and JSON API)"""
     genre = request.args.get('genre')
     status = request.args.get('status')
     search = request.args.get('search')  # tìm theo tiêu đề hoặc tác giả
-    tag = request.args.get('tag')  # tìm theo tag đơn lẻ
+    tag = request.args.get('tag')  # một hoặc nhiều tag, phân cách bằng dấu phẩy
+    tag_mode = request.args.get('tag_mode', 'any')  # any (OR) hoặc all (AND)
 
     query = Comic.query
 
+    if content_type == 'novel':
+        query = query.filter(Comic.content_type == 'novel')
+    elif content_type == 'comic':
+        query = query.filter((Comic.content_type == 'comic') | (Comic.content_type == None))
     if genre:
         query = query.filter(Comic.genre == genre)
     if status:
         query = query.filter(Comic.status == status)
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Comic.title.ilike(search_term)) |
-            (Comic.author.ilike(search_term)) |
-            (Comic.genre.ilike(search_term)) 
-            
-        )
+        # Kết quả xếp theo độ liên quan, sau đó theo ngày cập nhật
+        query = SearchService.apply(query, search)
     if tag:
-        tag_term = f"%{tag}%"
-        query = query.filter(Comic.tags.ilike(tag_term))
+        # Exact tag match through the comic_tags index ("action" không khớp "non-action")
+        query = TagService.filter_query(query, tag, mode=tag_mode)
+    return query
 
-    comics = query.order_by(Comic.updated_at.desc()).paginate(page=page, per_page=per_page)
+# ?sort=: catalog orderings served by a (column, id) index
+CATALOG_SORTS = {'updated': Comic.updated_at, 'top_rated': Comic.rating_score}
 
-    # Lấy genres và statuses động
-    genres = sorted(set([g[0] for g in db.session.query(Comic.genre).distinct().all() if g[0]]))
-    statuses = sorted(set([s[0] for s in db.session.query(Comic.status).distinct().all() if s[0]]))
+def _catalog_sort(query):
+    """(query, sort name, sort column) for ?sort=; top_rated leaves out comics nobody has rated"""
+    sort = request.args.get('sort')
+    if sort not in CATALOG_SORTS:
+        sort = 'updated'
+    if sort == 'top_rated':
+        query = query.filter(Comic.rating_count > 0)
+    return query, sort, CATALOG_SORTS[sort]
 
-    return render_template('comic/list.html', comics=comics, genre=genre, status=status, search=search, tag=tag, genres=genres, statuses=statuses)
+def _cursor_page(query, sort, sort_column, per_page):
+    """Cursor page of a sorted catalog query (raises InvalidCursor).
+
+    No OFFSET and no COUNT(*) unless with_total=1. The cursor carries the sort
+    name, so it cannot be replayed under another ordering. Search results keep
+    their relevance order, which has no keyset: their cursor is a row offset.
+    """
+    cursor = request.args.get('cursor')
+    with_total = request.args.get('with_total', type=int) == 1
+    if request.args.get('search'):
+        return offset_cursor_paginate(query.order_by(sort_column.desc(), Comic.id.desc()),
+                                      cursor=cursor, per_page=per_page, with_total=with_total,
+                                      cursor_key='search:' + sort)
+    return keyset_paginate(query, sort_column, Comic.id, cursor=cursor, per_page=per_page,
+                           with_total=with_total, cursor_key=sort)
+
+def _paginate_catalog(query, per_page):
+    """Offset pagination by default; cursor mode when ?cursor=... or ?mode=cursor is given"""
+    query, sort, sort_column = _catalog_sort(query)
+    if request.args.get('cursor') or request.args.get('mode') == 'cursor':
+        try:
+            return _cursor_page(query, sort, sort_column, per_page)
+        except InvalidCursor:
+            abort(400)
+    page = request.args.get('page', 1, type=int)
+    return query.order_by(sort_column.desc(), Comic.id.desc()).paginate(page=page, per_page=per_page)
+
+@comic.route('/', methods=['GET'])
+@cached_page('catalog')
+def get_comics():
+    per_page = request.args.get('per_page', 12, type=int)
+    genre = request.args.get('genre')
+    status = request.args.get('status')
+    search = request.args.get('search')
+    tag = request.args.get('tag')
+    tag_mode = request.args.get('tag_mode')
+    sort = request.args.get('sort')
+
+    comics = _paginate_catalog(_catalog_query(), per_page)
+
+    # Genres và statuses kèm số lượng, đọc từ facet_counts (không quét bảng comics)
+    genres = FacetService.counts('genre')
+    statuses = FacetService.counts('status')
+
+    return render_template('comic/list.html', comics=comics, genre=genre, status=status, search=search, tag=tag,
+                           tag_mode=tag_mode, sort=sort, genres=genres, statuses=statuses)
 
 @comic.route('/novels', methods=['GET'])
+@cached_page('catalog')
 def get_novels():
     """Route for novels (truyện chữ) - filter by content_type"""
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 12, type=int)
     search = request.args.get('search')
     status = request.args.get('status')
+    tag = request.args.get('tag')
+    tag_mode = request.args.get('tag_mode')
+    sort = request.args.get('sort')
     
     # Filter for novels using content_type field
-    query = Comic.query.filter(Comic.content_type == 'novel')
-    
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Comic.title.ilike(search_term)) |
-            (Comic.author.ilike(search_term)) |
-            (Comic.genre.ilike(search_term))  
-            
-        )
-    
-    if status:
-        query = query.filter(Comic.status == status)
-    
-    novels = query.order_by(Comic.updated_at.desc()).paginate(page=page, per_page=per_page)
+    novels = _paginate_catalog(_catalog_query(content_type='novel'), per_page)
     
-    return render_template('comic/novels.html', novels=novels, search=search, status=status)
+    return render_template('comic/novels.html', novels=novels, search=search, status=status,
+                           tag=tag, tag_mode=tag_mode, sort=sort)
+
+@comic.route('/api/list', methods=['GET'])
+def list_comics_api():
+    """
+    Cursor-paginated catalog listing for infinite scroll
+    Params: type (comic|novel), genre, status, search, tag, tag_mode,
+            sort (updated|top_rated), cursor, per_page (tối đa 50), with_total (1 để đếm tổng)
+    """
+    per_page = min(request.args.get('per_page', 12, type=int), 50)
+    content_type = request.args.get('type')
+    query, sort, sort_column = _catalog_sort(_catalog_query(content_type=content_type))
+    try:
+        page = _cursor_page(query, sort, sort_column, per_page)
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({
+        'success': True,
+        'data': [{
+            'id': c.id,
+            'title': c.title,
+            'author': c.author,
+            'genre': c.genre,
+            'status': c.status,
+            'content_type': c.content_type or 'comic',
+            'cover_image': c.cover_image,
+            'views': c.views,
+            'rating': c.rating,
+            'rating_count': c.rating_count or 0,
+            'url': url_for('comic.view_comic', comic_id=c.id),
+            'updated_at': c.updated_at.strftime('%Y-%m-%d %H:%M:%S') if c.updated_at else None
+        } for c in page.items],
+        'pagination': page.to_dict()
+    })
 
 @comic.route('/api/search', methods=['GET'])
 def search_comics_api():
@@ -164,36 +227,17 @@ def search_comics_api():
         # Base query
         query = Comic.query
         
-        # Filters
-        filters = []
-        
+        # Filters (accent-insensitive, ranked by relevance)
         if general_query:
-            general_term = f"%{general_query}%"
-            filters.append(
-                (Comic.title.ilike(general_term)) |
-                (Comic.author.ilike(general_term)) |
-                (Comic.genre.ilike(general_term)) 
-                
-            )
-            
+            query = SearchService.apply(query, general_query)
         if title_query:
-            title_term = f"%{title_query}%"
-            filters.append(Comic.title.ilike(title_term))
-            
+            query = SearchService.apply(query, title_query, field='title')
         if author_query:
-            author_term = f"%{author_query}%"
-            filters.append(Comic.author.ilike(author_term))
-            
+            query = SearchService.apply(query, author_query, field='author')
         if genre_query:
-            genre_term = f"%{genre_query}%"
-            filters.append(Comic.genre.ilike(genre_term))
-            
-        # Apply filters
-        if filters:
-            from sqlalchemy import and_
-            query = query.filter(and_(*filters))
+            query = SearchService.apply(query, genre_query, field='genre')
         
-        # Execute query
+        # Execute query (views break ties between equally relevant results)
         comics = query.order_by(Comic.views.desc(), Comic.updated_at.desc()).limit(limit).all()
         
         # Format response
@@ -209,7 +253,8 @@ def search_comics_api():
                 'views': comic.views,
                 'rating': comic.rating,
                 'status': comic.status,
-                'chapters_count': len(comic.chapters) if comic.chapters else 0,
+                'chapters_count': comic.chapter_count or 0,
+                'latest_chapter_number': comic.latest_chapter_number,
                 'updated_at': comic.updated_at.strftime('%Y-%m-%d %H:%M:%S') if comic.updated_at else None
             })
             
@@ -232,9 +277,11 @@ def search_comics_api():
         }), 500
 
 @comic.route('/<int:comic_id>', methods=['GET'])
+@cached_page('comic:{comic_id}', on_hit=_on_cached_comic_hit)
 def view_comic(comic_id):
     comic = Comic.query.get_or_404(comic_id)
-    comic.views += 1
+    # Immediate mode: UPDATE views = views + 1; buffered mode: gộp trong bộ nhớ worker
+    view_counter.record_comic_view(comic_id)
     db.session.commit()
     
     chapters = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number.asc()).all()
@@ -270,34 +317,11 @@ def view_comic(comic_id):
         ).first()
         is_following = follow_obj is not None
     
-    # Lấy comments cho comic này
-    # Filter out hidden comments for regular users
-    # Only get top-level comments (parent_id is NULL), replies will be accessed via comment.replies
-    if current_user.is_authenticated and (current_user.is_admin() or current_user.is_moderator()):
-        # Admin/moderator can see all comments including hidden ones
-        comments = Comment.query.filter_by(comic_id=comic_id, parent_id=None).order_by(Comment.created_at.desc()).all()
-    else:
-        # Regular users only see non-hidden comments
-        comments = Comment.query.filter_by(comic_id=comic_id, parent_id=None, is_hidden=False).order_by(Comment.created_at.desc()).all()
-    
-    # Get user reactions for all comments (if authenticated)
-    user_reactions = {}
-    if current_user.is_authenticated:
-        # Get all comment IDs (including replies)
-        all_comment_ids = [c.id for c in comments]
-        for comment in comments:
-            if current_user.is_admin() or current_user.is_moderator():
-                all_comment_ids.extend([r.id for r in comment.get_all_replies()])
-            else:
-                all_comment_ids.extend([r.id for r in comment.get_replies()])
-        
-        # Query all user reactions at once
-        reactions = CommentReaction.query.filter(
-            CommentReaction.user_id == current_user.id,
-            CommentReaction.comment_id.in_(all_comment_ids)
-        ).all()
-        
-        user_reactions = {r.comment_id: r.reaction_type for r in reactions}
+    # Một trang bình luận gốc + vài trả lời đầu + tác giả: số query cố định (CommentThreadService)
+    # Admin/moderator thấy cả bình luận đã ẩn
+    comment_threads, comments_cursor, user_reactions = CommentThreadService.load_page(
+        comic_id, show_hidden=_can_see_hidden_comments(),
+        user_id=current_user.id if current_user.is_authenticated else None)
     
     return render_template('comic/view.html',
                            comic=comic,
@@ -306,80 +330,72 @@ def view_comic(comic_id):
                            latest_chapter=latest_chapter,
                            resume_chapter=resume_chapter,
                            user_rating=user_rating,
-                           comments=comments,
+                           comment_threads=comment_threads,
+                           comments_cursor=comments_cursor,
                            user_reactions=user_reactions,
                            is_following=is_following)
 
 @comic.route('/<int:comic_id>/chapter/<float:chapter_number>')
+@cached_page('comic:{comic_id}', on_hit=_on_cached_chapter_hit)
 def read_chapter(comic_id, chapter_number):
     from flask_login import current_user
     
     comic = Comic.query.get_or_404(comic_id)
-    chapter = Chapter.query.filter_by(comic_id=comic_id, chapter_number=chapter_number).first_or_404()
+    # Reader is the only page that needs the chapter body
+    chapter = Chapter.query.options(db.joinedload(Chapter.body), db.selectinload(Chapter.images)) \
+        .filter_by(comic_id=comic_id, chapter_number=chapter_number).first_or_404()
+    # Cached sorted chapter list; answers prev/next/first/last without queries
+    chapter_index = ChapterIndexService.get(comic)
     
     # Increment view count
-    chapter.views += 1
+    view_counter.record_chapter_view(comic_id, chapter_number)
     
     # Update read history for logged-in users
     if current_user.is_authenticated:
-        history = UserReadHistory.query.filter_by(
-            user_id=current_user.id,
-            comic_id=comic_id,
-            chapter_id=chapter.id
-        ).first()
-        
-        if history:
-            # Update the timestamp by updating created_at
-            history.created_at = db.func.now()
-        else:
-            history = UserReadHistory(
-                user_id=current_user.id,
-                comic_id=comic_id,
-                chapter_id=chapter.id
-            )
-            db.session.add(history)
-            
+        # Một dòng mỗi (user, chapter): đọc lại chỉ cập nhật thời gian
+        first_read = upsert(UserReadHistory,
+                            {'user_id': current_user.id, 'chapter_id': chapter.id},
+                            {'comic_id': comic_id, 'created_at': datetime.utcnow()},
+                            update_values={'created_at': datetime.utcnow()})
+        if first_read:
             # Award points for reading a new chapter
-            progression_result = ProgressionService.award_points(
-                current_user.id, 
-                'read_chapter', 
-                chapter.id
-            )
+            ProgressionService.award_points(current_user.id, 'read_chapter', chapter.id)
     
     db.session.commit()
     
     # Get next and previous chapters
-    next_chapter = Chapter.query.filter(
-        Chapter.comic_id == comic_id,
-        Chapter.chapter_number > chapter_number
-    ).order_by(Chapter.chapter_number.asc()).first()
-    
-    prev_chapter = Chapter.query.filter(
-        Chapter.comic_id == comic_id,
-        Chapter.chapter_number < chapter_number
-    ).order_by(Chapter.chapter_number.desc()).first()
+    next_chapter = chapter_index.next(chapter_number)
+    prev_chapter = chapter_index.prev(chapter_number)
 
     # First and last chapter (for jump buttons)
-    first_chapter = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number.asc()).first()
-    last_chapter = Chapter.query.filter_by(comic_id=comic_id).order_by(Chapter.chapter_number.desc()).first()
+    first_chapter = chapter_index.first()
+    last_chapter = chapter_index.last()
     
-    # Parse image URLs from JSON string if it's a comic
-    image_urls = json.loads(chapter.image_urls) if chapter.image_urls else []
+    # Page URLs from chapter_images (comics)
+    image_urls = chapter.image_list
     
     # Use different template based on content type
     all_chapters = None  # ensure variable exists for both content types
+    paragraphs, paragraph_total, paragraph_next = None, 0, None
+    stream = False
     if comic.content_type == 'novel':
         template = 'comic/read_novel.html'
         # Provide full chapter list for jump navigation (only for novel)
-        all_chapters = Chapter.query.with_entities(Chapter.chapter_number, Chapter.title) \
-            .filter_by(comic_id=comic_id) \
-            .order_by(Chapter.chapter_number.asc()) \
-            .all()
+        all_chapters = chapter_index.chapters
+        # Chương dài: render màn hình đầu, phần sau tải dần qua /paragraphs.
+        # ?mode=full render toàn bộ chương bằng streamed template.
+        full = request.args.get('mode') == 'full'
+        if chapter.body is not None:
+            paragraphs, paragraph_total = chapter.body.paragraphs(0, None if full else NOVEL_FIRST_SCREEN)
+        else:
+            paragraphs = []
+        if len(paragraphs) < paragraph_total:
+            paragraph_next = len(paragraphs)
+        stream = full and paragraph_total > NOVEL_FIRST_SCREEN
     else:
         template = 'comic/read.html'
     
-    return render_template(
-        template,
+    context = dict(
         comic=comic,
         chapter=chapter,
         images=image_urls,
@@ -387,8 +403,54 @@ def read_chapter(comic_id, chapter_number):
         prev_chapter=prev_chapter,
         first_chapter=first_chapter,
         last_chapter=last_chapter,
-        all_chapters=all_chapters if comic.content_type == 'novel' else None
+        all_chapters=all_chapters if comic.content_type == 'novel' else None,
+        paragraphs=paragraphs,
+        paragraph_total=paragraph_total,
+        paragraph_next=paragraph_next
     )
+    if stream:
+        # First bytes go out before the whole chapter is rendered (not page-cached)
+        return current_app.response_class(stream_template(template, **context))
+    return render_template(template, **context)
+
+@comic.route('/<int:comic_id>/chapter/<float:chapter_number>/paragraphs')
+def chapter_paragraphs(comic_id, chapter_number):
+    """JSON range of a novel chapter's paragraphs: ?start=0&count=60"""
+    start = max(request.args.get('start', 0, type=int), 0)
+    count = min(max(request.args.get('count', NOVEL_PARAGRAPH_PAGE, type=int), 1), 200)
+    chapter = Chapter.query.options(db.joinedload(Chapter.body)) \
+        .filter_by(comic_id=comic_id, chapter_number=chapter_number).first_or_404()
+    if chapter.body is None:
+        paragraphs, total = [], 0
+    else:
+        paragraphs, total = chapter.body.paragraphs(start, count)
+    end = start + len(paragraphs)
+    return jsonify({
+        'start': start,
+        'count': len(paragraphs),
+        'total': total,
+        'next_start': end if end < total else None,
+        'paragraphs': paragraphs
+    })
+
+@comic.route('/<int:comic_id>/chapter/<float:chapter_number>/text')
+def chapter_text(comic_id, chapter_number):
+    """Plain text of a novel chapter ("Tải toàn bộ chương" in read_novel.html).
+    Bodies stored gzip-compressed are sent as-is with Content-Encoding: gzip
+    when the client accepts it, so the server never recompresses them."""
+    chapter = Chapter.query.options(db.joinedload(Chapter.body)) \
+        .filter_by(comic_id=comic_id, chapter_number=chapter_number).first_or_404()
+    body = chapter.body
+    if body is None or (body.content is None and body.content_compressed is None):
+        abort(404)
+
+    if body.content_codec == GZIP and request.accept_encodings['gzip']:
+        response = current_app.response_class(body.content_compressed, mimetype='text/plain')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = current_app.response_class(body.text, mimetype='text/plain')
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
 
 # API endpoints for admin/upload functionality
 @comic.route('/', methods=['POST'])
@@ -399,7 +461,11 @@ def create_comic():
         comic = Comic(**data.model_dump())
         
         db.session.add(comic)
+        TagService.sync_comic(comic)
+        SearchService.index_comic(comic)
+        FacetService.record_create(comic)
         db.session.commit()
+        invalidate_pages('catalog', 'homepage')
         
         return jsonify({'message': 'Comic created successfully', 'id': comic.id}), 201
         
@@ -419,7 +485,9 @@ def add_chapter(comic_id):
         )
         
         db.session.add(chapter)
+        ChapterStatsService.refresh(comic_id, bump_updated=True)
         db.session.commit()
+        invalidate_pages(*comic_tags(comic_id))
         
         return jsonify({'message': 'Chapter added successfully', 'id': chapter.id}), 201
     except ValueError as e:
@@ -445,6 +513,7 @@ def add_comment(comic_id):
         )
         db.session.add(comment)
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
         
         # Award points for commenting (only for top-level comments, not replies)
         if not parent_id:
@@ -467,34 +536,69 @@ def add_comment(comic_id):
     
     return redirect(url_for('comic.view_comic', comic_id=comic_id))
 
+def _can_see_hidden_comments():
+    return current_user.is_authenticated and (current_user.is_admin() or current_user.is_moderator())
+
+@comic.route('/<int:comic_id>/comments', methods=['GET'])
+def comment_threads(comic_id):
+    """Next page of comment threads ("Xem thêm bình luận"): {html, next_cursor, next_url}"""
+    comic_obj = Comic.query.get_or_404(comic_id)
+    try:
+        threads, next_cursor, user_reactions = CommentThreadService.load_page(
+            comic_id, cursor=request.args.get('cursor'), show_hidden=_can_see_hidden_comments(),
+            user_id=current_user.id if current_user.is_authenticated else None)
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor không hợp lệ'}), 400
+    html = render_template('comic/_comment_fragment.html', comic=comic_obj,
+                           threads=threads, user_reactions=user_reactions)
+    return jsonify({
+        'html': html,
+        'count': len(threads),
+        'next_cursor': next_cursor,
+        'next_url': url_for('comic.comment_threads', comic_id=comic_id, cursor=next_cursor) if next_cursor else None
+    })
+
+@comic.route('/<int:comic_id>/comments/<int:comment_id>/replies', methods=['GET'])
+def comment_replies(comic_id, comment_id):
+    """Next page of replies to a comment ("Xem thêm trả lời"): {html, next_cursor, next_url}"""
+    show_hidden = _can_see_hidden_comments()
+    parent = Comment.query.get_or_404(comment_id)
+    if parent.comic_id != comic_id or (parent.is_hidden and not show_hidden):
+        abort(404)
+    try:
+        replies, next_cursor, user_reactions = CommentThreadService.load_replies(
+            comment_id, cursor=request.args.get('cursor'), show_hidden=show_hidden,
+            user_id=current_user.id if current_user.is_authenticated else None)
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor không hợp lệ'}), 400
+    html = render_template('comic/_comment_fragment.html', comic=parent.comic,
+                           replies=replies, user_reactions=user_reactions)
+    return jsonify({
+        'html': html,
+        'count': len(replies),
+        'next_cursor': next_cursor,
+        'next_url': url_for('comic.comment_replies', comic_id=comic_id, comment_id=comment_id,
+                            cursor=next_cursor) if next_cursor else None
+    })
+
 @comic.route('/<int:comic_id>/follow', methods=['POST'])
 @login_required
 def toggle_follow(comic_id):
-    comic = Comic.query.get_or_404(comic_id)
-    
-    # Kiểm tra xem user đã follow chưa
-    existing_follow = Follow.query.filter_by(
-        user_id=current_user.id,
-        comic_id=comic_id
-    ).first()
+    Comic.query.get_or_404(comic_id)
     
     try:
-        if existing_follow:
-            # Nếu đã follow thì unfollow
-            db.session.delete(existing_follow)
-            comic.follow_count = max(0, comic.follow_count - 1)
+        # DELETE trước: xóa được -> unfollow; không có gì để xóa -> follow.
+        # follow_count chỉ đổi khi thực sự có dòng bị xóa/thêm (không lệch khi double-click)
+        if delete_where(Follow, user_id=current_user.id, comic_id=comic_id):
+            increment(Comic, comic_id, follow_count=-1)
             flash('Đã bỏ theo dõi truyện!', 'info')
         else:
-            # Nếu chưa follow thì follow
-            new_follow = Follow(
-                user_id=current_user.id,
-                comic_id=comic_id
-            )
-            db.session.add(new_follow)
-            comic.follow_count = comic.follow_count + 1
+            if insert_ignore(Follow, {'user_id': current_user.id, 'comic_id': comic_id}):
+                increment(Comic, comic_id, follow_count=1)
             flash('Đã theo dõi truyện!', 'success')
         
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
     except Exception as e:
         db.session.rollback()
         flash(f'Lỗi khi cập nhật theo dõi: {str(e)}', 'danger')
@@ -518,6 +622,7 @@ def hide_comment(comic_id, comment_id):
     try:
         comment.is_hidden = True
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
         flash('Đã ẩn bình luận.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -542,6 +647,7 @@ def unhide_comment(comic_id, comment_id):
     try:
         comment.is_hidden = False
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
         flash('Đã hiện lại bình luận.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -564,53 +670,38 @@ def react_comment(comic_id, comment_id):
         return jsonify({'error': 'Loại reaction không hợp lệ'}), 400
     
     try:
-        # Kiểm tra xem user đã react chưa
-        existing_reaction = CommentReaction.query.filter_by(
-            user_id=current_user.id,
-            comment_id=comment_id
-        ).first()
-        
-        if existing_reaction:
-            # User đã react rồi
-            if existing_reaction.reaction_type == reaction_type:
-                # Click lại cùng loại = remove reaction
-                if reaction_type == 'like':
-                    comment.likes_count = max(0, comment.likes_count - 1)
-                else:
-                    comment.dislikes_count = max(0, comment.dislikes_count - 1)
-                db.session.delete(existing_reaction)
-                action = 'removed'
-            else:
-                # Chuyển từ like sang dislike hoặc ngược lại
-                if existing_reaction.reaction_type == 'like':
-                    comment.likes_count = max(0, comment.likes_count - 1)
-                    comment.dislikes_count += 1
-                else:
-                    comment.dislikes_count = max(0, comment.dislikes_count - 1)
-                    comment.likes_count += 1
-                existing_reaction.reaction_type = reaction_type
-                action = 'changed'
+        counter = {'like': 'likes_count', 'dislike': 'dislikes_count'}
+        keys = {'user_id': current_user.id, 'comment_id': comment_id}
+        if delete_where(CommentReaction, reaction_type=reaction_type, **keys):
+            # Click lại cùng loại = remove reaction
+            deltas = {counter[reaction_type]: -1}
+            action = 'removed'
+        elif db.session.execute(
+                update(CommentReaction)
+                .where(CommentReaction.user_id == current_user.id, CommentReaction.comment_id == comment_id,
+                       CommentReaction.reaction_type != reaction_type)
+                .values(reaction_type=reaction_type)).rowcount:
+            # Chuyển từ like sang dislike hoặc ngược lại
+            other = 'dislike' if reaction_type == 'like' else 'like'
+            deltas = {counter[reaction_type]: 1, counter[other]: -1}
+            action = 'changed'
         else:
-            # User chưa react, tạo mới
-            new_reaction = CommentReaction(
-                user_id=current_user.id,
-                comment_id=comment_id,
-                reaction_type=reaction_type
-            )
-            if reaction_type == 'like':
-                comment.likes_count += 1
-            else:
-                comment.dislikes_count += 1
-            db.session.add(new_reaction)
+            # Chưa react: tạo mới (request song song đã tạo rồi thì không cộng thêm)
+            inserted = insert_ignore(CommentReaction, keys, {'reaction_type': reaction_type})
+            deltas = {counter[reaction_type]: 1} if inserted else {}
             action = 'added'
+        increment(Comment, comment_id, **deltas)
+        likes_count, dislikes_count = db.session.query(Comment.likes_count, Comment.dislikes_count) \
+            .filter(Comment.id == comment_id).one()
         
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
         
         return jsonify({
             'success': True,
             'action': action,
-            'likes_count': comment.likes_count,
-            'dislikes_count': comment.dislikes_count,
+            'likes_count': likes_count,
+            'dislikes_count': dislikes_count,
             'user_reaction': reaction_type if action != 'removed' else None
         })
     except Exception as e:
@@ -634,6 +725,7 @@ def delete_comment(comic_id, comment_id):
     try:
         db.session.delete(comment)
         db.session.commit()
+        invalidate_pages(f'comic:{comic_id}')
         flash('Đã xóa vĩnh viễn bình luận.', 'warning')
     except Exception as e:
         db.session.rollback()
@@ -641,10 +733,18 @@ def delete_comment(comic_id, comment_id):
     
     return redirect(url_for('comic.view_comic', comic_id=comic_id))
 
+@comic.route('/api/tags', methods=['GET'])
+def get_tag_cloud():
+    """Tag cloud: most used tags with their usage counts"""
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    tags = TagService.tag_cloud(limit=limit)
+    return jsonify({'tags': [{'name': t.name, 'slug': t.slug, 'count': t.usage_count} for t in tags]})
+
 @comic.route('/genres-statuses', methods=['GET'])
 def get_genres_statuses():
-    genres = db.session.query(Comic.genre).distinct().all()
-    statuses = db.session.query(Comic.status).distinct().all()
-    genres = sorted(set([g[0] for g in genres if g[0]]))
-    statuses = sorted(set([s[0] for s in statuses if s[0]]))
-    return jsonify({'genres': genres, 'statuses': statuses})
\ No newline at end of file
+    facets = {facet: FacetService.counts(facet) for facet in ('genre', 'status', 'content_type', 'tag')}
+    return jsonify({
+        'genres': [value for value, _ in facets['genre']],
+        'statuses': [value for value, _ in facets['status']],
+        'counts': {facet: dict(rows) for facet, rows in facets.items()}
+    })
\ No newline at end of file
@@ -0,0 +1,66 @@
+from flask import Blueprint, request, jsonify, render_template, url_for
+from flask_login import login_required, current_user
+from app import db
+from app.services.feed import FeedService
+from app.utils.pagination import InvalidCursor
+
+feed_bp = Blueprint('feed', __name__)
+
+
+def _item(row):
+    return {
+        'comic_id': row.comic_id,
+        'comic_title': row.comic_title,
+        'cover_image': row.cover_image,
+        'chapter_id': row.id,
+        'chapter_number': row.chapter_number,
+        'title': row.title,
+        'is_new': bool(row.is_new),
+        'url': url_for('comic.read_chapter', comic_id=row.comic_id, chapter_number=row.chapter_number),
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else None
+    }
+
+
+@feed_bp.route('/')
+@login_required
+def index():
+    """Chương mới từ truyện đang theo dõi; mở trang = đã xem (badge về 0)"""
+    page = FeedService.page(current_user)
+    items = [_item(row) for row in page.items]
+    FeedService.mark_seen(current_user)
+    db.session.commit()
+    return render_template('feed/index.html', items=items, feed_days=FeedService.FEED_DAYS,
+                           next_url=url_for('feed.api_feed', cursor=page.next_cursor) if page.next_cursor else None)
+
+
+@feed_bp.route('/api/chapters')
+@login_required
+def api_feed():
+    """JSON feed page: ?cursor=&per_page= (tối đa 100)"""
+    per_page = min(request.args.get('per_page', FeedService.PER_PAGE, type=int), 100)
+    try:
+        page = FeedService.page(current_user, cursor=request.args.get('cursor'), per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'data': [_item(row) for row in page.items],
+        'pagination': page.to_dict(),
+        'next_url': url_for('feed.api_feed', cursor=page.next_cursor) if page.next_cursor else None
+    })
+
+
+@feed_bp.route('/api/unread-count')
+def unread_count():
+    """Badge count for the navbar, fetched on every page load (one query over the user's follows)"""
+    if not current_user.is_authenticated:
+        return jsonify({'count': 0})
+    return jsonify({'count': FeedService.unread_count(current_user)})
+
+
+@feed_bp.route('/api/mark-seen', methods=['POST'])
+@login_required
+def mark_seen():
+    FeedService.mark_seen(current_user)
+    db.session.commit()
+    return jsonify({'success': True, 'count': 0})
@@ -4,6 +4,9 @@ from app.models.user import User
 from app import db
 from datetime import datetime, timedelta
 from sqlalchemy import func
+from app.utils.response_cache import cached_page
+from app.services.rankings import RankingService
+from app.services.shelf import ShelfService
 
 main = Blueprint('main', __name__)
 
@@ -13,6 +16,7 @@ def homepage():
     return redirect(url_for('main.comic_homepage'))
 
 @main.route('/comics-home')
+@cached_page('homepage')
 def comic_homepage():
     """Homepage dedicated to comics (truyện tranh)"""
     # Filter for comics only (using content_type field)
@@ -31,6 +35,7 @@ def comic_homepage():
                          page_type='comics')
 
 @main.route('/novels-home')
+@cached_page('homepage')
 def novel_homepage():
     """Homepage dedicated to novels (truyện chữ)"""
     # Filter for novels only (using content_type field)
@@ -46,56 +51,63 @@ def novel_homepage():
                          ranking_novels=ranking_novels,
                          page_type='novels')
 
+def _parse_snapshot_date(value):
+    """?date=YYYY-MM-DD for historical rankings; None means today"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _ranked_comics(ranking):
+    """Pair snapshot items with their Comic rows (one IN query), keeping rank order"""
+    ids = [item['comic_id'] for item in ranking['items']]
+    comics = {c.id: c for c in Comic.query.filter(Comic.id.in_(ids)).all()} if ids else {}
+    return [(comics[item['comic_id']], item) for item in ranking['items'] if item['comic_id'] in comics]
+
 @main.route('/api/ranking/<period>')
 def get_ranking_data(period):
     """
     API endpoint để lấy dữ liệu xếp hạng theo khoảng thời gian
     period: 'thang', 'tuan', 'ngay'
+    Đọc từ bảng ranking_snapshots (xem RankingService), kèm as_of và rank_change
     """
     try:
-        now = datetime.utcnow()
-        
-        if period == 'ngay':
-            # Lấy comics được cập nhật trong 24h qua, sắp xếp theo views
-            date_filter = now - timedelta(days=1)
-            comics = Comic.query.filter(
-                Comic.updated_at >= date_filter
-            ).order_by(Comic.views.desc()).limit(10).all()
-            
-        elif period == 'tuan':
-            # Lấy comics được cập nhật trong 7 ngày qua, sắp xếp theo views
-            date_filter = now - timedelta(days=7)
-            comics = Comic.query.filter(
-                Comic.updated_at >= date_filter
-            ).order_by(Comic.views.desc()).limit(10).all()
-            
-        elif period == 'thang':
-            # Lấy comics được cập nhật trong 30 ngày qua, sắp xếp theo views
-            date_filter = now - timedelta(days=30)
-            comics = Comic.query.filter(
-                Comic.updated_at >= date_filter
-            ).order_by(Comic.views.desc()).limit(10).all()
-            
-        else:
+        normalized = RankingService.normalize_period(period)
+        if normalized is None or normalized == 'all':
             return jsonify({'error': 'Invalid period'}), 400
+        try:
+            snapshot_date = _parse_snapshot_date(request.args.get('date'))
+        except ValueError:
+            return jsonify({'error': 'Invalid date'}), 400
+        try:
+            ranking = RankingService.get(normalized, genre=request.args.get('genre', ''),
+                                         date=snapshot_date, limit=10)
+        except ValueError as e:
+            # Thể loại không tồn tại hoặc ngày ngoài HISTORY_DAYS
+            return jsonify({'error': str(e)}), 400
             
         # Format dữ liệu để trả về
         ranking_data = []
-        for idx, comic in enumerate(comics, 1):
+        for comic, item in _ranked_comics(ranking):
             ranking_data.append({
-                'rank': idx,
+                'rank': item['rank'],
+                'rank_change': item['rank_change'],
                 'id': comic.id,
                 'title': comic.title,
                 'author': comic.author,
                 'cover_image': comic.cover_image,
                 'views': comic.views,
-                'chapters_count': len(comic.chapters) if comic.chapters else 0,
+                'period_views': item['score'],
+                'chapters_count': comic.chapter_count or 0,
+                'latest_chapter_number': comic.latest_chapter_number,
                 'updated_at': comic.updated_at.strftime('%Y-%m-%d %H:%M:%S') if comic.updated_at else None
             })
             
         return jsonify({
             'success': True,
             'period': period,
+            'as_of': ranking['as_of'].strftime('%Y-%m-%d %H:%M:%S') if ranking['as_of'] else None,
+            'date': ranking['date'].isoformat(),
+            'previous_date': ranking['previous_date'].isoformat() if ranking['previous_date'] else None,
             'data': ranking_data
         })
         
@@ -104,14 +116,17 @@ def get_ranking_data(period):
 
 # Profile page (after login)
 from flask_login import login_required, current_user
-from app.models.comic import Follow, Comic
 
 @main.route('/profile')
 @login_required
 def profile():
-    # Lấy các truyện đang theo dõi
-    followed_comics = db.session.query(Comic).join(Follow).filter(Follow.user_id == current_user.id).order_by(Follow.created_at.desc()).all()
-    return render_template('auth/profile.html', user=current_user, followed_comics=followed_comics)
+    # Truyện đang theo dõi kèm chương mới nhất / đã đọc / số chương chưa đọc (một query)
+    shelf_sort = request.args.get('shelf_sort', 'followed')
+    if shelf_sort not in ShelfService.SORTS:
+        shelf_sort = 'followed'
+    followed_comics = ShelfService.followed(current_user.id, sort=shelf_sort)
+    return render_template('auth/profile.html', user=current_user, followed_comics=followed_comics,
+                           shelf_sort=shelf_sort)
 
 @main.route('/demo/level-colors')
 def demo_level_colors():
@@ -144,50 +159,48 @@ def comic_ranking():
 
 @main.route('/api/comic-ranking')
 def get_comic_ranking():
-    """API endpoint for comic ranking"""
+    """API endpoint for comic ranking (served from ranking snapshots)"""
     try:
-        period = request.args.get('period', 'all')  # all, month, week, day
+        period = request.args.get('period', 'all')  # all, month, week, day; rated = đánh giá cao
         content_type = request.args.get('type', 'all')  # all, comics, novels
+        genre = request.args.get('genre', '')
         
-        # Base query
-        comics_query = Comic.query
-        
-        # Filter by content type
-        if content_type == 'comics':
-            # Filter for comics only
-            comics_query = comics_query.filter(
-                (Comic.content_type == 'comic') | (Comic.content_type == None)
-            )
-        elif content_type == 'novels':
-            # Filter for novels only
-            comics_query = comics_query.filter(Comic.content_type == 'novel')
+        if period != 'rated' and RankingService.normalize_period(period) is None:
+            return jsonify({'success': False, 'error': 'Invalid period'}), 400
+        if content_type not in RankingService.CONTENT_TYPES:
+            content_type = 'all'
+        try:
+            snapshot_date = _parse_snapshot_date(request.args.get('date'))
+        except ValueError:
+            return jsonify({'success': False, 'error': 'Invalid date'}), 400
         
-        # Filter by time period
-        if period != 'all':
-            now = datetime.utcnow()
-            if period == 'day':
-                date_filter = now - timedelta(days=1)
-            elif period == 'week':
-                date_filter = now - timedelta(days=7)
-            elif period == 'month':
-                date_filter = now - timedelta(days=30)
-            
-            comics_query = comics_query.filter(Comic.updated_at >= date_filter)
-        
-        # Order by views (descending) and limit to top 20
-        comics = comics_query.order_by(Comic.views.desc()).limit(20).all()
+        try:
+            if period == 'rated':
+                # Bayesian rating_score (không có snapshot lịch sử)
+                ranking = RankingService.top_rated(content_type, genre, limit=20)
+            else:
+                ranking = RankingService.get(RankingService.normalize_period(period), content_type, genre,
+                                             date=snapshot_date, limit=20)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         # Format data
         comics_data = []
-        for comic in comics:
+        for comic, item in _ranked_comics(ranking):
             comics_data.append({
                 'id': comic.id,
+                'rank': item['rank'],
+                'rank_change': item['rank_change'],
                 'title': comic.title,
                 'author': comic.author,
                 'cover_image': comic.cover_image,
                 'views': comic.views or 0,
+                'period_views': item['score'] if period != 'rated' else None,
+                'rating': round(comic.rating or 0, 2),
+                'rating_count': comic.rating_count or 0,
                 'likes': 0,  # Placeholder for likes
-                'chapters_count': len(comic.chapters) if comic.chapters else 0,
+                'chapters_count': comic.chapter_count or 0,
+                'latest_chapter_number': comic.latest_chapter_number,
                 'status': 'Đang tiến hành',  # Default status
                 'genre': comic.genre,
                 'updated_at': comic.updated_at.strftime('%Y-%m-%d') if comic.updated_at else None
@@ -198,10 +211,13 @@ def get_comic_ranking():
             'comics': comics_data,
             'period': period,
             'type': content_type,
+            'genre': genre,
+            'as_of': ranking['as_of'].strftime('%Y-%m-%d %H:%M:%S') if ranking['as_of'] else None,
+            'date': ranking['date'].isoformat(),
+            'previous_date': ranking['previous_date'].isoformat() if ranking['previous_date'] else None,
             'total': len(comics_data)
         })
         
     except Exception as e:
         print(f"Error in comic ranking API: {e}")  # Debug print
         return jsonify({'success': False, 'error': str(e)}), 500
-
@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from app import db
 from app.models.user import User, UserBadge, Badge, RankTitle, UserActivity
 from app.services.progression import ProgressionService
+from app.utils.pagination import keyset_paginate, InvalidCursor
 
 progression_bp = Blueprint('progression', __name__)
 
@@ -165,6 +166,29 @@ def get_user_activities():
             return jsonify({'success': False, 'disabled': True, 'message': 'Hoạt động đang phát triển'}), 503
         page = request.args.get('page', 1, type=int)
         per_page = 20
+        cursor = request.args.get('cursor')
+        
+        if cursor or request.args.get('mode') == 'cursor':
+            # Keyset mode: (created_at, id) cursor, total only when include_total=1
+            try:
+                activities = keyset_paginate(
+                    UserActivity.query.filter_by(user_id=current_user.id),
+                    UserActivity.created_at, UserActivity.id,
+                    cursor=cursor, per_page=per_page,
+                    with_total=request.args.get('include_total', type=int) == 1
+                )
+            except InvalidCursor as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({
+                'success': True,
+                'activities': [{
+                    'activity_type': activity.activity_type,
+                    'points_earned': activity.points_earned,
+                    'reference_id': activity.reference_id,
+                    'created_at': activity.created_at.isoformat()
+                } for activity in activities.items],
+                'pagination': activities.to_dict()
+            })
         
         activities = UserActivity.query.filter_by(user_id=current_user.id)\
             .order_by(UserActivity.created_at.desc())\
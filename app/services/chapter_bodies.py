@@ -0,0 +1,57 @@
+from app import db
+from app.models.comic import ChapterBody
+from app.utils.text_codec import stored_size
+
+
+class ChapterBodyService:
+    """Maintenance for stored chapter bodies"""
+
+    @staticmethod
+    def reencode(codec, batch_size=200):
+        """Re-store every novel chapter body with `codec`.
+
+        Walks chapter_bodies by primary key in batches and commits per batch.
+        Returns (bodies_rewritten, bytes_before, bytes_after).
+        """
+        rewritten = before = after = 0
+        last_id = 0
+        while True:
+            bodies = ChapterBody.query \
+                .filter(ChapterBody.chapter_id > last_id) \
+                .filter((ChapterBody.content != None) | (ChapterBody.content_compressed != None)) \
+                .order_by(ChapterBody.chapter_id.asc()) \
+                .limit(batch_size).all()
+            if not bodies:
+                break
+            for body in bodies:
+                old_size = stored_size(body.content, body.content_compressed)
+                if (body.content_codec or 'plain') != codec:
+                    body.set_text(body.text, codec)
+                    rewritten += 1
+                before += old_size
+                after += stored_size(body.content, body.content_compressed)
+            last_id = bodies[-1].chapter_id
+            db.session.commit()
+            db.session.expunge_all()
+        return rewritten, before, after
+
+    @staticmethod
+    def index_paragraphs(batch_size=200):
+        """Compute paragraph offsets for bodies written before they existed. Returns bodies indexed."""
+        indexed = 0
+        last_id = 0
+        while True:
+            bodies = ChapterBody.query \
+                .filter(ChapterBody.chapter_id > last_id, ChapterBody.paragraph_count == None) \
+                .filter((ChapterBody.content != None) | (ChapterBody.content_compressed != None)) \
+                .order_by(ChapterBody.chapter_id.asc()) \
+                .limit(batch_size).all()
+            if not bodies:
+                break
+            for body in bodies:
+                body.index_paragraphs()
+                indexed += 1
+            last_id = bodies[-1].chapter_id
+            db.session.commit()
+            db.session.expunge_all()
+        return indexed
@@ -0,0 +1,96 @@
+from sqlalchemy import func
+from app import db
+from app.models.comic import Chapter
+from app.utils.content_hash import text_hash, image_set_hash
+
+
+class ChapterDuplicateService:
+    """Duplicate chapter detection over the indexed chapters.content_hash.
+
+    The hash is computed when a chapter's text or page list is written, so a
+    check is one index lookup and a scan is one GROUP BY, however many
+    chapters a comic has.
+    """
+
+    @staticmethod
+    def find(content_hash, comic_id=None, exclude_chapter_id=None):
+        """First chapter with this hash, within `comic_id` (None = whole catalog)"""
+        if not content_hash:
+            return None
+        query = Chapter.query.filter(Chapter.content_hash == content_hash)
+        if comic_id is not None:
+            query = query.filter(Chapter.comic_id == comic_id)
+        if exclude_chapter_id is not None:
+            query = query.filter(Chapter.id != exclude_chapter_id)
+        return query.order_by(Chapter.id).first()
+
+    @staticmethod
+    def find_text(text, comic_id=None, exclude_chapter_id=None):
+        return ChapterDuplicateService.find(text_hash(text), comic_id, exclude_chapter_id)
+
+    @staticmethod
+    def find_images(urls, comic_id=None, exclude_chapter_id=None):
+        return ChapterDuplicateService.find(image_set_hash(urls), comic_id, exclude_chapter_id)
+
+    @staticmethod
+    def groups(comic_id=None, limit=500):
+        """Chapters sharing a content hash, as lists of {id, comic_id, num}.
+
+        Args:
+            comic_id: restrict to one comic (None = whole catalog, across comics)
+            limit: max number of groups returned
+        """
+        dup_hashes = db.session.query(Chapter.content_hash) \
+            .filter(Chapter.content_hash.isnot(None))
+        if comic_id is not None:
+            dup_hashes = dup_hashes.filter(Chapter.comic_id == comic_id)
+        dup_hashes = dup_hashes.group_by(Chapter.content_hash) \
+            .having(func.count(Chapter.id) > 1).limit(limit).subquery()
+
+        rows = db.session.query(Chapter.content_hash, Chapter.id, Chapter.comic_id, Chapter.chapter_number) \
+            .join(dup_hashes, dup_hashes.c.content_hash == Chapter.content_hash)
+        if comic_id is not None:
+            rows = rows.filter(Chapter.comic_id == comic_id)
+        groups = {}
+        for content_hash, chapter_id, chapter_comic_id, number in \
+                rows.order_by(Chapter.content_hash, Chapter.comic_id, Chapter.chapter_number).all():
+            groups.setdefault(content_hash, []).append(
+                {'id': chapter_id, 'comic_id': chapter_comic_id, 'num': number})
+        return list(groups.values())
+
+    @staticmethod
+    def other_comics(comic_id, limit=500):
+        """Chapters of other comics sharing a hash with a chapter of `comic_id`,
+        grouped per hash with this comic's chapters first"""
+        mine = db.session.query(Chapter.content_hash) \
+            .filter(Chapter.comic_id == comic_id, Chapter.content_hash.isnot(None)).distinct().subquery()
+        shared = db.session.query(Chapter.content_hash) \
+            .join(mine, mine.c.content_hash == Chapter.content_hash) \
+            .filter(Chapter.comic_id != comic_id).distinct().limit(limit).subquery()
+        rows = db.session.query(Chapter.content_hash, Chapter.id, Chapter.comic_id, Chapter.chapter_number) \
+            .join(shared, shared.c.content_hash == Chapter.content_hash) \
+            .order_by(Chapter.content_hash, Chapter.comic_id != comic_id, Chapter.comic_id, Chapter.chapter_number)
+        groups = {}
+        for content_hash, chapter_id, chapter_comic_id, number in rows.all():
+            groups.setdefault(content_hash, []).append(
+                {'id': chapter_id, 'comic_id': chapter_comic_id, 'num': number})
+        return list(groups.values())
+
+    @staticmethod
+    def backfill(batch_size=500):
+        """Compute content_hash for chapters written before the column existed. Returns count."""
+        updated = 0
+        last_id = 0
+        while True:
+            chapters = Chapter.query.options(db.selectinload(Chapter.body), db.selectinload(Chapter.images)) \
+                .filter(Chapter.content_hash.is_(None), Chapter.id > last_id) \
+                .order_by(Chapter.id).limit(batch_size).all()
+            if not chapters:
+                return updated
+            for chapter in chapters:
+                last_id = chapter.id
+                value = image_set_hash(chapter.image_list) if chapter.images else text_hash(chapter.content)
+                if value:
+                    chapter.content_hash = value
+                    updated += 1
+            db.session.commit()
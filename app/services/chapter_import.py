@@ -0,0 +1,313 @@
+import json
+import os
+import re
+import tempfile
+import zipfile
+from collections import namedtuple
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models.comic import Chapter
+from app.services.chapter_duplicates import ChapterDuplicateService
+from app.services.chapter_stats import ChapterStatsService
+from app.services.image_fingerprints import ImageFingerprintService
+from app.utils.content_hash import text_hash, image_set_hash
+from app.utils.image_upload import check_image_file, upload_images
+from app.utils.response_cache import invalidate_pages, comic_tags
+
+# One chapter to import. `members` are archive paths: the pages of an image
+# folder (in reading order) or a single .txt; JSON items carry content/image_urls.
+ImportChapter = namedtuple('ImportChapter', 'chapter_number title content image_urls members source')
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
+_NUMBER = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+class ChapterImportError(ValueError):
+    """Malformed archive or JSON"""
+
+
+class ChapterImportTooLarge(ChapterImportError):
+    """More pages to upload than one web request may handle (use `flask chapters-import`)"""
+
+
+def _natural_key(name):
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def _parse_name(name):
+    """'Chapter 12.5 - Tên chương' -> (12.5, 'Tên chương'); (None, None) without a number"""
+    match = _NUMBER.search(name)
+    if not match:
+        return None, None
+    title = name[match.end():].strip(' -_:.')
+    return float(match.group(1)), title or None
+
+
+def _is_text(chapter):
+    return bool(chapter.members) and chapter.members[0].lower().endswith('.txt')
+
+
+class ChapterImportService:
+    """Bulk chapter import from a CBZ/ZIP archive or a JSON array.
+
+    Archives are read through the zip central directory: members are
+    streamed one at a time (pages into spooled temp files for the current
+    batch only), never extracted as a whole. Each batch of BATCH_SIZE
+    chapters uploads its pages in parallel and is inserted in one
+    transaction.
+    """
+
+    BATCH_SIZE = 10
+    MAX_REQUEST_PAGES = 50  # pages uploaded by one web request; larger archives go through the CLI
+    MAX_IMAGE_MB = 10
+    SPOOL_BYTES = 1024 * 1024  # pages larger than this are spooled to disk
+
+    @staticmethod
+    def open(file):
+        """(chapters, ZipFile or None) for an uploaded or opened .cbz/.zip/.json file"""
+        name = (getattr(file, 'filename', None) or getattr(file, 'name', None) or '').lower()
+        stream = getattr(file, 'stream', file)
+        if name.endswith('.json'):
+            return ChapterImportService.read_json(stream), None
+        try:
+            zf = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile:
+            raise ChapterImportError('File phải là .cbz/.zip hoặc .json')
+        return ChapterImportService.read_archive(zf), zf
+
+    @staticmethod
+    def read_archive(zf):
+        """ImportChapters from a ZipFile: one folder of images per chapter, or one .txt per chapter (novels)"""
+        folders = {}
+        chapters = []
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            parts = [p for p in info.filename.split('/') if p]
+            if not parts or parts[0] == '__MACOSX' or parts[-1].startswith('.'):
+                continue
+            ext = parts[-1].rsplit('.', 1)[-1].lower() if '.' in parts[-1] else ''
+            if ext == 'txt':
+                number, title = _parse_name(parts[-1][:-4])
+                if number is None:
+                    raise ChapterImportError(f'Không đọc được số chương từ file "{info.filename}"')
+                chapters.append(ImportChapter(number, title, None, None, (info.filename,), info.filename))
+            elif ext in IMAGE_EXTENSIONS and len(parts) >= 2:
+                folders.setdefault('/'.join(parts[:-1]), []).append(info.filename)
+
+        for folder, members in folders.items():
+            number, title = _parse_name(folder.rsplit('/', 1)[-1])
+            if number is None:
+                raise ChapterImportError(f'Không đọc được số chương từ thư mục "{folder}"')
+            chapters.append(ImportChapter(number, title, None, None,
+                                          tuple(sorted(members, key=_natural_key)), folder))
+        if not chapters:
+            raise ChapterImportError('Archive không có thư mục chương hoặc file .txt nào')
+        chapters.sort(key=lambda c: c.chapter_number)
+        return chapters
+
+    @staticmethod
+    def read_json(stream):
+        """ImportChapters from [{chapter_number, title, content | image_urls}, ...]"""
+        try:
+            items = json.load(stream)
+        except ValueError as e:
+            raise ChapterImportError(f'JSON không hợp lệ: {e}')
+        if not isinstance(items, list):
+            raise ChapterImportError('JSON phải là một mảng các chương')
+        chapters = []
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                raise ChapterImportError(f'Chương #{i + 1}: phải là một object')
+            try:
+                number = float(item['chapter_number'])
+            except (KeyError, TypeError, ValueError):
+                raise ChapterImportError(f'Chương #{i + 1}: thiếu hoặc sai chapter_number')
+            urls = item.get('image_urls')
+            if isinstance(urls, str):
+                urls = [u.strip() for u in urls.split('\n') if u.strip()]
+            elif isinstance(urls, list):
+                if not all(isinstance(u, str) for u in urls):
+                    raise ChapterImportError(f'Chương {number:g}: image_urls chỉ được chứa chuỗi URL')
+                urls = [u.strip() for u in urls if u.strip()]
+            elif urls is not None:
+                raise ChapterImportError(f'Chương {number:g}: image_urls phải là mảng hoặc chuỗi')
+            content = item.get('content')
+            if content is not None and not isinstance(content, str):
+                raise ChapterImportError(f'Chương {number:g}: content phải là chuỗi')
+            title = item.get('title')
+            if title is not None and not isinstance(title, str):
+                raise ChapterImportError(f'Chương {number:g}: title phải là chuỗi')
+            content = content.strip() if content else None
+            if not content and not urls:
+                raise ChapterImportError(f'Chương {number:g}: cần content hoặc image_urls')
+            chapters.append(ImportChapter(number, title, content, urls or None, None, f'#{i + 1}'))
+        return chapters
+
+    @staticmethod
+    def _read_text(zf, chapter):
+        if chapter.content is not None or not _is_text(chapter):
+            return chapter.content
+        with zf.open(chapter.members[0]) as f:
+            return f.read().decode('utf-8-sig').strip()
+
+    @staticmethod
+    def plan(comic, chapters, zf=None):
+        """Dry-run report: numbering conflicts and duplicate content, nothing written.
+
+        Returns:
+            list of dicts {chapter_number, title, source, pages, status, detail}; status is
+            'new', 'wrong_type' (text chapter for a comic or pages for a novel), 'exists'
+            (number already in the comic), 'repeated' (number twice in the import) or
+            'duplicate' (same content as an existing chapter or an earlier item).
+            Only 'new' and 'duplicate' chapters are imported.
+        """
+        # NULL content_type is treated as 'comic' everywhere else
+        novel = comic.content_type == 'novel'
+        existing = {number: chapter_id for chapter_id, number in
+                    db.session.query(Chapter.id, Chapter.chapter_number).filter_by(comic_id=comic.id)}
+        seen_numbers = set()
+        seen_hashes = {}
+        report = []
+        for chapter in chapters:
+            text = ChapterImportService._read_text(zf, chapter)
+            item = {
+                'chapter_number': chapter.chapter_number,
+                'title': chapter.title,
+                'source': chapter.source,
+                'pages': 0 if text else len(chapter.members or chapter.image_urls or ()),
+                'status': 'new',
+                'detail': None
+            }
+            # Archive pages only get URLs once uploaded; their duplicates show up after import
+            content_hash = text_hash(text) if text else image_set_hash(chapter.image_urls)
+            if (_is_text(chapter) or chapter.content is not None) != novel:
+                item['status'] = 'wrong_type'
+                item['detail'] = ('Truyện chữ chỉ nhận chương dạng văn bản (.txt / content)' if novel
+                                  else 'Truyện tranh chỉ nhận chương dạng ảnh (thư mục ảnh / image_urls)')
+            elif chapter.chapter_number in existing:
+                item['status'] = 'exists'
+                item['detail'] = f'Chương {chapter.chapter_number:g} đã tồn tại (ID: {existing[chapter.chapter_number]})'
+            elif chapter.chapter_number in seen_numbers:
+                item['status'] = 'repeated'
+                item['detail'] = f'Số chương {chapter.chapter_number:g} lặp lại trong file import'
+            elif content_hash:
+                duplicate = ChapterDuplicateService.find(content_hash, comic_id=comic.id)
+                if duplicate is not None:
+                    item['status'] = 'duplicate'
+                    item['detail'] = f'Nội dung trùng với chương {duplicate.chapter_number:g} (ID: {duplicate.id})'
+                elif content_hash in seen_hashes:
+                    item['status'] = 'duplicate'
+                    item['detail'] = f'Nội dung trùng với chương {seen_hashes[content_hash]:g} trong file import'
+            seen_numbers.add(chapter.chapter_number)
+            if content_hash:
+                seen_hashes.setdefault(content_hash, chapter.chapter_number)
+            report.append(item)
+        return report
+
+    @staticmethod
+    def run(comic, chapters, zf=None, dry_run=False, batch_size=None, skip_duplicates=False,
+            max_upload_pages=None):
+        """Plan, then (unless dry_run) import the chapters that do not conflict, in batches.
+
+        Args:
+            comic: target Comic
+            chapters: from read_archive / read_json
+            zf: the ZipFile that `members` refer to
+            dry_run: only return the plan
+            batch_size: chapters per upload batch and per commit (default BATCH_SIZE)
+            skip_duplicates: also skip chapters whose content duplicates another one
+            max_upload_pages: raise ChapterImportTooLarge, before writing anything, when the
+                chapters to import have more archive pages to upload than this
+
+        Returns:
+            dict {dry_run, chapters: plan, created: [chapter ids], errors: [{chapters, error}]}
+        """
+        report = ChapterImportService.plan(comic, chapters, zf)
+        result = {'dry_run': dry_run, 'chapters': report, 'created': [], 'errors': []}
+        if dry_run:
+            return result
+
+        allowed = ('new',) if skip_duplicates else ('new', 'duplicate')
+        todo = [c for c, item in zip(chapters, report) if item['status'] in allowed]
+        if max_upload_pages is not None:
+            pages = sum(len(c.members) for c in todo if c.members and not _is_text(c))
+            if pages > max_upload_pages:
+                raise ChapterImportTooLarge(
+                    f'Import có {pages} ảnh cần upload (tối đa {max_upload_pages} mỗi request). '
+                    f'Chia nhỏ file hoặc chạy `flask chapters-import {comic.id} <file>` trên server.')
+        batch_size = batch_size or ChapterImportService.BATCH_SIZE
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            try:
+                result['created'].extend(ChapterImportService._import_batch(comic, batch, zf, result['errors']))
+            except Exception as e:
+                db.session.rollback()
+                result['errors'].append({'chapters': [c.chapter_number for c in batch], 'error': str(e)})
+        if result['created']:
+            invalidate_pages(*comic_tags(comic.id))
+        return result
+
+    @staticmethod
+    def _import_batch(comic, batch, zf, errors):
+        """Upload the batch's pages in parallel, insert its chapters and commit once"""
+        failed = {}  # batch index -> error
+        page_infos = {}  # batch index -> [upload info, ...]
+        spooled = []  # (batch index, FileStorage)
+        try:
+            for i, chapter in enumerate(batch):
+                if _is_text(chapter) or not chapter.members:
+                    continue
+                for member in chapter.members:
+                    if zf.getinfo(member).file_size > ChapterImportService.MAX_IMAGE_MB * 1024 * 1024:
+                        failed[i] = f'{member}: quá lớn (>{ChapterImportService.MAX_IMAGE_MB}MB)'
+                        break
+                    file = ChapterImportService._spool(zf, member)
+                    spooled.append((i, file))
+                    check = check_image_file(file, max_mb=ChapterImportService.MAX_IMAGE_MB)
+                    if not check.ok:
+                        failed[i] = f'{member}: file ảnh không hợp lệ ({check.reason})'
+                        break
+
+            to_upload = [(i, file) for i, file in spooled if i not in failed]
+            if to_upload:
+                for (i, file), upload in zip(to_upload, upload_images([file for _, file in to_upload])):
+                    if upload.url is None:
+                        failed.setdefault(i, f'{file.filename}: {upload.error}')
+                    else:
+                        page_infos.setdefault(i, []).append(upload.info)
+        finally:
+            for _, file in spooled:
+                file.close()
+
+        rows = []
+        for i, chapter in enumerate(batch):
+            if i in failed:
+                errors.append({'chapters': [chapter.chapter_number], 'error': failed[i]})
+                continue
+            row = Chapter(comic_id=comic.id, chapter_number=chapter.chapter_number, title=chapter.title)
+            text = ChapterImportService._read_text(zf, chapter)
+            if text:
+                row.content = text
+            else:
+                row.set_images(page_infos.get(i) or chapter.image_urls)
+            db.session.add(row)
+            rows.append((i, row))
+        if not rows:
+            return []
+        ChapterStatsService.refresh(comic.id, bump_updated=True)
+        for i, row in rows:
+            if i in page_infos:
+                ImageFingerprintService.record_pages(row, page_infos[i])
+        db.session.commit()
+        return [row.id for _, row in rows]
+
+    @staticmethod
+    def _spool(zf, member):
+        """Copy one archive member into a spooled temp file (memory up to SPOOL_BYTES, then disk)"""
+        stream = tempfile.SpooledTemporaryFile(max_size=ChapterImportService.SPOOL_BYTES)
+        with zf.open(member) as source:
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                stream.write(chunk)
+        stream.seek(0)
+        return FileStorage(stream=stream, filename=os.path.basename(member))
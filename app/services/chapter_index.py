@@ -0,0 +1,74 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+from app import db
+from app.models.comic import Chapter
+
+ChapterRef = namedtuple('ChapterRef', 'id chapter_number title')
+
+
+class ChapterIndex:
+    """Sorted chapter numbers of one comic, answering navigation by bisection"""
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.chapters = [ChapterRef(*row) for row in rows]  # sorted by chapter_number
+        self.numbers = [c.chapter_number for c in self.chapters]
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def find(self, chapter_number):
+        i = bisect_left(self.numbers, chapter_number)
+        if i < len(self.numbers) and self.numbers[i] == chapter_number:
+            return self.chapters[i]
+        return None
+
+    def next(self, chapter_number):
+        i = bisect_right(self.numbers, chapter_number)
+        return self.chapters[i] if i < len(self.chapters) else None
+
+    def prev(self, chapter_number):
+        i = bisect_left(self.numbers, chapter_number)
+        return self.chapters[i - 1] if i > 0 else None
+
+    def first(self):
+        return self.chapters[0] if self.chapters else None
+
+    def last(self):
+        return self.chapters[-1] if self.chapters else None
+
+
+class ChapterIndexService:
+    """Per-process LRU of ChapterIndex objects.
+
+    An entry is valid while its version matches Comic.chapter_index_version,
+    which ChapterStatsService.refresh bumps on every chapter add/edit/delete.
+    read_chapter already loads the comic, so a warm lookup costs no query.
+    """
+
+    MAX_COMICS = 2000
+
+    _entries = OrderedDict()  # comic_id -> ChapterIndex
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(comic):
+        version = comic.chapter_index_version or 0
+        with ChapterIndexService._lock:
+            index = ChapterIndexService._entries.get(comic.id)
+            if index is not None and index.version == version:
+                ChapterIndexService._entries.move_to_end(comic.id)
+                return index
+
+        rows = db.session.query(Chapter.id, Chapter.chapter_number, Chapter.title) \
+            .filter(Chapter.comic_id == comic.id) \
+            .order_by(Chapter.chapter_number.asc(), Chapter.id.asc()).all()
+        index = ChapterIndex(version, rows)
+        with ChapterIndexService._lock:
+            ChapterIndexService._entries[comic.id] = index
+            ChapterIndexService._entries.move_to_end(comic.id)
+            while len(ChapterIndexService._entries) > ChapterIndexService.MAX_COMICS:
+                ChapterIndexService._entries.popitem(last=False)
+        return index
+
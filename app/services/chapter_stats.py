@@ -0,0 +1,52 @@
+from datetime import datetime
+from sqlalchemy import func, select
+from app import db
+from app.models.comic import Comic, Chapter
+
+
+class ChapterStatsService:
+    """Maintain the denormalized chapter statistics stored on Comic.
+
+    chapter_count, latest_chapter_number and last_chapter_at let list pages
+    show chapter info without touching the chapters table.
+    """
+
+    @staticmethod
+    def _stat_values(comic_id_column):
+        """Correlated subqueries computing the stats for the given comic id column"""
+        where = Chapter.comic_id == comic_id_column
+        return {
+            'chapter_count': select(func.count(Chapter.id)).where(where).scalar_subquery(),
+            'latest_chapter_number': select(func.max(Chapter.chapter_number)).where(where).scalar_subquery(),
+            'last_chapter_at': select(func.max(Chapter.created_at)).where(where).scalar_subquery(),
+        }
+
+    @staticmethod
+    def refresh(comic_id, bump_updated=False):
+        """Recompute the stats of one comic in a single UPDATE. Caller commits.
+
+        Args:
+            comic_id: comic whose chapters changed
+            bump_updated: True when a chapter was added, so "latest updates" lists pick it up
+        """
+        db.session.flush()
+        values = ChapterStatsService._stat_values(Comic.id)
+        # Keep updated_at unless asked to bump it (the column has onupdate=utcnow)
+        values['updated_at'] = datetime.utcnow() if bump_updated else Comic.updated_at
+        values['chapter_index_version'] = Comic.chapter_index_version + 1
+        db.session.execute(
+            Comic.__table__.update().where(Comic.id == comic_id).values(**values)
+        )
+        comic = db.session.get(Comic, comic_id)
+        if comic is not None:
+            db.session.expire(comic, ['chapter_count', 'latest_chapter_number', 'last_chapter_at',
+                                      'chapter_index_version', 'updated_at'])
+
+    @staticmethod
+    def backfill():
+        """Recompute stats for every comic. Returns number of comics updated."""
+        values = ChapterStatsService._stat_values(Comic.id)
+        values['updated_at'] = Comic.updated_at
+        result = db.session.execute(Comic.__table__.update().values(**values))
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,122 @@
+from sqlalchemy import and_, func, or_
+from app import db
+from app.models.comic import Comment, CommentReaction
+from app.utils.pagination import keyset_paginate, encode_cursor, decode_cursor
+
+
+class CommentThread:
+    """A top-level comment with its first replies, for templates"""
+
+    def __init__(self, comment, replies, reply_count, replies_cursor=None):
+        self.comment = comment
+        self.replies = replies
+        self.reply_count = reply_count
+        self.replies_cursor = replies_cursor  # position after the previewed replies
+
+    @property
+    def has_more_replies(self):
+        return self.reply_count > len(self.replies)
+
+
+class CommentThreadService:
+    """Load comment threads in a fixed number of queries.
+
+    A page of top-level comments (newest first, keyset pagination) costs
+    four queries whatever its size: the comments with their authors, reply
+    counts (GROUP BY), the first REPLY_PREVIEW replies of every comment with
+    their authors (ROW_NUMBER window), and the viewer's reactions.
+    Replies are oldest first; further pages come from load_replies.
+    """
+
+    PER_PAGE = 20
+    REPLY_PREVIEW = 3
+    REPLIES_PER_PAGE = 20
+
+    @staticmethod
+    def _visible(query, show_hidden):
+        return query if show_hidden else query.filter(Comment.is_hidden.is_(False))
+
+    @staticmethod
+    def load_page(comic_id, cursor=None, show_hidden=False, user_id=None, per_page=None):
+        """One page of threads.
+
+        Args:
+            comic_id: comic whose comments to load
+            cursor: next_cursor of the previous page (raises InvalidCursor if malformed)
+            show_hidden: include hidden comments (moderators)
+            user_id: viewer, for their like/dislike state
+
+        Returns:
+            (threads, next_cursor, reactions) where reactions is {comment_id: 'like'|'dislike'}
+        """
+        per_page = per_page or CommentThreadService.PER_PAGE
+        query = CommentThreadService._visible(
+            Comment.query.options(db.joinedload(Comment.user))
+            .filter(Comment.comic_id == comic_id, Comment.parent_id.is_(None)), show_hidden)
+        page = keyset_paginate(query, Comment.created_at, Comment.id, cursor=cursor, per_page=per_page)
+        comments = page.items
+        if not comments:
+            return [], None, {}
+        ids = [c.id for c in comments]
+
+        counts = dict(CommentThreadService._visible(
+            db.session.query(Comment.parent_id, func.count(Comment.id))
+            .filter(Comment.parent_id.in_(ids)), show_hidden)
+            .group_by(Comment.parent_id).all())
+
+        previews = {}
+        preview = CommentThreadService.REPLY_PREVIEW
+        if preview and counts:
+            row_number = func.row_number().over(
+                partition_by=Comment.parent_id, order_by=(Comment.created_at.asc(), Comment.id.asc())
+            ).label('rn')
+            ranked = CommentThreadService._visible(
+                db.session.query(Comment.id.label('id'), row_number)
+                .filter(Comment.parent_id.in_(list(counts))), show_hidden).subquery()
+            replies = Comment.query.options(db.joinedload(Comment.user)) \
+                .join(ranked, ranked.c.id == Comment.id) \
+                .filter(ranked.c.rn <= preview) \
+                .order_by(Comment.parent_id, Comment.created_at.asc(), Comment.id.asc()).all()
+            for reply in replies:
+                previews.setdefault(reply.parent_id, []).append(reply)
+
+        threads = []
+        for comment in comments:
+            replies = previews.get(comment.id, [])
+            total = counts.get(comment.id, 0)
+            replies_cursor = encode_cursor(replies[-1].created_at, replies[-1].id) if replies else None
+            threads.append(CommentThread(comment, replies, total, replies_cursor))
+
+        reactions = CommentThreadService.reactions(
+            user_id, ids + [r.id for t in threads for r in t.replies])
+        return threads, page.next_cursor, reactions
+
+    @staticmethod
+    def load_replies(parent_id, cursor=None, show_hidden=False, user_id=None, per_page=None):
+        """Replies of one comment after `cursor` (oldest first).
+
+        Returns:
+            (replies, next_cursor, reactions)
+        """
+        per_page = per_page or CommentThreadService.REPLIES_PER_PAGE
+        query = CommentThreadService._visible(
+            Comment.query.options(db.joinedload(Comment.user)).filter(Comment.parent_id == parent_id), show_hidden)
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.filter(or_(Comment.created_at > created_at,
+                                     and_(Comment.created_at == created_at, Comment.id > last_id)))
+        replies = query.order_by(Comment.created_at.asc(), Comment.id.asc()).limit(per_page + 1).all()
+        next_cursor = None
+        if len(replies) > per_page:
+            replies = replies[:per_page]
+            next_cursor = encode_cursor(replies[-1].created_at, replies[-1].id)
+        return replies, next_cursor, CommentThreadService.reactions(user_id, [r.id for r in replies])
+
+    @staticmethod
+    def reactions(user_id, comment_ids):
+        """{comment_id: reaction_type} of one user, in one query"""
+        if not user_id or not comment_ids:
+            return {}
+        rows = db.session.query(CommentReaction.comment_id, CommentReaction.reaction_type) \
+            .filter(CommentReaction.user_id == user_id, CommentReaction.comment_id.in_(comment_ids)).all()
+        return dict(rows)
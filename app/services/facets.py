@@ -0,0 +1,123 @@
+import time
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.comic import Comic, FacetCount, Tag
+
+
+class FacetService:
+    """Incrementally maintained facet counts for the catalog filters.
+
+    Counts live in the facet_counts table and are adjusted on comic create,
+    edit and delete, so listing pages never run SELECT DISTINCT over comics.
+    Reads are memoized per process for CACHE_TTL seconds.
+    """
+
+    FACETS = ('genre', 'status', 'content_type')
+    CACHE_TTL = 60  # seconds
+
+    _cache = {}  # facet -> (loaded_at, [(value, count)])
+
+    @staticmethod
+    def snapshot(comic):
+        """Current facet values of a comic (take before editing it)"""
+        return {
+            'genre': (comic.genre or '').strip() or None,
+            'status': (comic.status or '').strip() or None,
+            # NULL content_type is treated as 'comic' everywhere else
+            'content_type': comic.content_type or 'comic',
+        }
+
+    @staticmethod
+    def record_create(comic):
+        """Count a new comic. Caller commits."""
+        FacetService._apply(FacetService.snapshot(comic), 1)
+
+    @staticmethod
+    def record_delete(comic):
+        """Uncount a comic that is about to be deleted. Caller commits."""
+        FacetService._apply(FacetService.snapshot(comic), -1)
+
+    @staticmethod
+    def record_update(before, comic):
+        """Move counts from the `before` snapshot to the comic's current values. Caller commits."""
+        after = FacetService.snapshot(comic)
+        old = {f: v for f, v in before.items() if after.get(f) != v}
+        new = {f: after[f] for f in old}
+        FacetService._apply(old, -1)
+        FacetService._apply(new, 1)
+
+    @staticmethod
+    def _apply(values, delta):
+        for facet, value in values.items():
+            if value is None:
+                continue
+            value = value[:100]
+            result = db.session.execute(
+                FacetCount.__table__.update()
+                .where(FacetCount.facet == facet, FacetCount.value == value)
+                .values(count=FacetCount.count + delta)
+            )
+            if result.rowcount == 0 and delta > 0:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(FacetCount(facet=facet, value=value, count=delta))
+                except IntegrityError:
+                    # Another request inserted the row first
+                    db.session.execute(
+                        FacetCount.__table__.update()
+                        .where(FacetCount.facet == facet, FacetCount.value == value)
+                        .values(count=FacetCount.count + delta)
+                    )
+            FacetService._cache.pop(facet, None)
+
+    @staticmethod
+    def counts(facet):
+        """[(value, count)] for a facet, sorted by value, zero counts omitted"""
+        cached = FacetService._cache.get(facet)
+        now = time.monotonic()
+        if cached and now - cached[0] < FacetService.CACHE_TTL:
+            return cached[1]
+
+        if facet == 'tag':
+            rows = db.session.query(Tag.name, Tag.usage_count) \
+                .filter(Tag.usage_count > 0).order_by(Tag.name.asc()).all()
+        else:
+            rows = db.session.query(FacetCount.value, FacetCount.count) \
+                .filter(FacetCount.facet == facet, FacetCount.count > 0) \
+                .order_by(FacetCount.value.asc()).all()
+        result = [(value, count) for value, count in rows]
+        FacetService._cache[facet] = (now, result)
+        return result
+
+    @staticmethod
+    def values(facet):
+        """Just the facet values, for dropdowns"""
+        return [value for value, _ in FacetService.counts(facet)]
+
+    @staticmethod
+    def rebuild():
+        """Recount every facet from the comics table. Returns number of rows written."""
+        FacetCount.query.delete(synchronize_session=False)
+        rows = []
+        columns = {
+            'genre': Comic.genre,
+            'status': Comic.status,
+            'content_type': func.coalesce(Comic.content_type, 'comic'),
+        }
+        for facet, column in columns.items():
+            for value, count in db.session.query(column, func.count(Comic.id)).group_by(column).all():
+                if value and value.strip():
+                    rows.append({'facet': facet, 'value': value.strip()[:100], 'count': count})
+        # Values differing only by surrounding spaces are merged
+        merged = {}
+        for row in rows:
+            key = (row['facet'], row['value'])
+            merged[key] = merged.get(key, 0) + row['count']
+        if merged:
+            db.session.execute(FacetCount.__table__.insert(), [
+                {'facet': f, 'value': v, 'count': c} for (f, v), c in merged.items()
+            ])
+        db.session.commit()
+        FacetService._cache.clear()
+        return len(merged)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, func, or_
+from app import db
+from app.models.comic import Comic, Chapter, Follow
+from app.utils.pagination import keyset_paginate
+
+
+class FeedService:
+    """New chapters of the comics a user follows (fan-out on read).
+
+    Nothing is written when a chapter is published. The badge count joins
+    the user's follows with comics.last_chapter_at (maintained by
+    ChapterStatsService), so it costs one row per follow and never reads
+    chapters. The feed itself walks chapters through the
+    (comic_id, created_at) index, one range per followed comic.
+
+    A chapter is new when it was published after both the user's
+    feed_seen_at watermark and the moment they followed the comic.
+    """
+
+    PER_PAGE = 30
+    FEED_DAYS = 30  # older chapters are not listed in the feed
+
+    @staticmethod
+    def _new_filter(published_at, user):
+        condition = or_(Follow.created_at.is_(None), published_at > Follow.created_at)
+        if user.feed_seen_at is not None:
+            condition = and_(condition, published_at > user.feed_seen_at)
+        return condition
+
+    @staticmethod
+    def unread_count(user):
+        """Followed comics with chapters newer than the watermark (badge count)"""
+        return db.session.query(func.count(Follow.id)) \
+            .join(Comic, Comic.id == Follow.comic_id) \
+            .filter(Follow.user_id == user.id, Comic.last_chapter_at.isnot(None),
+                    FeedService._new_filter(Comic.last_chapter_at, user)) \
+            .scalar() or 0
+
+    @staticmethod
+    def page(user, cursor=None, per_page=None):
+        """Newest chapters of followed comics, keyset-paginated.
+
+        Returns:
+            KeysetPage whose items are rows with id, created_at, chapter_number,
+            title, comic_id, comic_title, cover_image, is_new
+        """
+        since = datetime.utcnow() - timedelta(days=FeedService.FEED_DAYS)
+        is_new = FeedService._new_filter(Chapter.created_at, user)
+        query = db.session.query(
+            Chapter.id.label('id'),
+            Chapter.created_at.label('created_at'),
+            Chapter.chapter_number,
+            Chapter.title,
+            Chapter.comic_id,
+            Comic.title.label('comic_title'),
+            Comic.cover_image,
+            db.case((is_new, True), else_=False).label('is_new')
+        ).join(Follow, and_(Follow.comic_id == Chapter.comic_id, Follow.user_id == user.id)) \
+            .join(Comic, Comic.id == Chapter.comic_id) \
+            .filter(Chapter.created_at >= since)
+        return keyset_paginate(query, Chapter.created_at, Chapter.id, cursor=cursor,
+                               per_page=per_page or FeedService.PER_PAGE)
+
+    @staticmethod
+    def mark_seen(user, at=None):
+        """Move the user's watermark to `at` (default now). Caller commits."""
+        user.feed_seen_at = at or datetime.utcnow()
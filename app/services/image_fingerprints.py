@@ -0,0 +1,133 @@
+from sqlalchemy import or_
+from app import db
+from app.models.comic import Comic, Chapter, ImageFingerprint
+from app.utils.perceptual_hash import CHUNKS, chunks, hamming, is_distinctive
+
+
+class ImageFingerprintService:
+    """Near-duplicate detection for uploaded pages and covers.
+
+    Uploads record a dHash per image. Upload warnings and the moderator
+    scan both look neighbours up through the indexed hash bands, which is
+    exact for distance < CHUNKS and never reads the whole catalog.
+
+    Near-constant hashes (blank, white or black pages) are neither stored
+    nor looked up: they would all match each other across comics.
+    """
+
+    WARN_DISTANCE = CHUNKS - 1  # 3 of 64 bits: re-encoded / resized copies
+    SCAN_DISTANCE = CHUNKS - 1  # largest distance the band lookup finds exactly
+
+    @staticmethod
+    def record_pages(chapter, infos):
+        """Store fingerprints of a chapter's uploaded pages (dicts with url/phash), replacing old ones.
+        Caller commits."""
+        ImageFingerprint.query.filter_by(chapter_id=chapter.id).delete(synchronize_session=False)
+        for position, info in enumerate(infos or []):
+            if isinstance(info, dict) and info.get('phash') is not None and is_distinctive(info['phash']):
+                db.session.add(ImageFingerprint.build(info['phash'], chapter.comic_id, chapter.id,
+                                                      position, info.get('url')))
+
+    @staticmethod
+    def record_cover(comic, url, value):
+        """Store the fingerprint of a comic's uploaded cover. Caller commits."""
+        ImageFingerprint.query.filter_by(comic_id=comic.id, chapter_id=None) \
+            .delete(synchronize_session=False)
+        if value is not None and is_distinctive(value):
+            db.session.add(ImageFingerprint.build(value, comic.id, url=url))
+
+    @staticmethod
+    def find_near(value, distance=None, exclude_comic_id=None, limit=20):
+        """[(distance, ImageFingerprint), ...] within `distance` (< CHUNKS) of a hash, via the band indexes
+        (closest first, at most `limit`; None for all)"""
+        distance = ImageFingerprintService.WARN_DISTANCE if distance is None else distance
+        if distance >= CHUNKS:
+            raise ValueError(f'band lookup is only exact for distance < {CHUNKS}')
+        if not is_distinctive(value):
+            return []
+        bands = chunks(value)
+        query = ImageFingerprint.query.filter(or_(
+            *(getattr(ImageFingerprint, f'band_{i}') == band for i, band in enumerate(bands))
+        ))
+        if exclude_comic_id is not None:
+            query = query.filter(ImageFingerprint.comic_id != exclude_comic_id)
+        found = []
+        for fp in query.all():
+            d = hamming(value, fp.value)
+            # Rows recorded before degenerate hashes were skipped
+            if d <= distance and is_distinctive(fp.value):
+                found.append((d, fp))
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
+
+    @staticmethod
+    def similar_comics(values, exclude_comic_id=None, distance=None):
+        """Other comics with images close to any of `values`, for upload warnings.
+
+        Returns:
+            list of {comic_id, title, matches}, most matches first
+        """
+        counts = {}
+        for value in values:
+            if value is None:
+                continue
+            seen = set()
+            for _, fp in ImageFingerprintService.find_near(value, distance, exclude_comic_id):
+                if fp.comic_id not in seen:
+                    seen.add(fp.comic_id)
+                    counts[fp.comic_id] = counts.get(fp.comic_id, 0) + 1
+        if not counts:
+            return []
+        titles = dict(db.session.query(Comic.id, Comic.title).filter(Comic.id.in_(counts)).all())
+        result = [{'comic_id': cid, 'title': titles.get(cid), 'matches': n} for cid, n in counts.items()]
+        result.sort(key=lambda item: -item['matches'])
+        return result
+
+    @staticmethod
+    def warning_text(similar, total):
+        """Vietnamese warning for the uploader, or None"""
+        if not similar:
+            return None
+        names = ', '.join(f'"{s["title"]}" ({s["matches"]}/{total})' for s in similar[:3])
+        return f'⚠️ Ảnh giống với ảnh đã có ở truyện khác: {names}. Kiểm tra để tránh đăng trùng!'
+
+    @staticmethod
+    def scan(comic_id, distance=None):
+        """Near-duplicates of a comic's pages/cover in other comics (moderator report).
+
+        One band lookup per fingerprint of the comic; `distance` must be < CHUNKS.
+
+        Returns:
+            list of {comic_id, title, matches: [{source, match, distance}]}, most matches first;
+            source/match are {chapter_id, chapter_number, position} (chapter_id None = cover)
+        """
+        distance = ImageFingerprintService.SCAN_DISTANCE if distance is None else distance
+        own = ImageFingerprint.query.filter_by(comic_id=comic_id) \
+            .order_by(ImageFingerprint.chapter_id, ImageFingerprint.position).all()
+        by_comic = {}
+        chapter_ids = set()
+        for fp in own:
+            for d, other in ImageFingerprintService.find_near(fp.value, distance, exclude_comic_id=comic_id,
+                                                              limit=None):
+                by_comic.setdefault(other.comic_id, []).append({
+                    'source': {'chapter_id': fp.chapter_id, 'position': fp.position},
+                    'match': {'chapter_id': other.chapter_id, 'position': other.position},
+                    'distance': d
+                })
+                chapter_ids.update((fp.chapter_id, other.chapter_id))
+        if not by_comic:
+            return []
+
+        chapter_ids.discard(None)
+        numbers = dict(db.session.query(Chapter.id, Chapter.chapter_number)
+                       .filter(Chapter.id.in_(chapter_ids)).all()) if chapter_ids else {}
+        titles = dict(db.session.query(Comic.id, Comic.title).filter(Comic.id.in_(by_comic)).all())
+        report = []
+        for other_comic, matches in by_comic.items():
+            for match in matches:
+                for side in ('source', 'match'):
+                    match[side]['chapter_number'] = numbers.get(match[side]['chapter_id'])
+            matches.sort(key=lambda m: m['distance'])
+            report.append({'comic_id': other_comic, 'title': titles.get(other_comic), 'matches': matches})
+        report.sort(key=lambda item: -len(item['matches']))
+        return report
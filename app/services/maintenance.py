@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import request
+from sqlalchemy import update
+from app import db
+from app.models.comic import MaintenanceLease
+from app.utils.upsert import insert_ignore
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh_rankings():
+    from app.services.rankings import RankingService
+    return RankingService.refresh()
+
+
+def _compact_views():
+    from app.services.view_buckets import ViewBucketService
+    return ViewBucketService.compact()
+
+
+class MaintenanceScheduler:
+    """Periodic jobs run by the web workers themselves (no cron needed).
+
+    Each worker starts a daemon thread on its first request (after gunicorn
+    forks). Every MAINTENANCE_TICK seconds the thread tries to claim each
+    due job through its maintenance_leases row; the claim is a conditional
+    UPDATE, so a job runs once per interval no matter how many workers or
+    instances are up. The CLI commands stay available for manual runs.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.tick = 30
+        self.jobs = []  # (name, interval seconds, callable)
+        self._app = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self._app = app
+        # An in-memory SQLite database is one connection shared by every thread
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        in_memory = uri in ('sqlite://', 'sqlite:///:memory:')
+        self.enabled = app.config.get('MAINTENANCE_ENABLED', True) and not in_memory
+        self.tick = app.config.get('MAINTENANCE_TICK', self.tick)
+        self.jobs = [
+            ('rankings-refresh', app.config.get('RANKING_REFRESH_INTERVAL', 600), _refresh_rankings),
+            ('views-compact', app.config.get('VIEW_COMPACT_INTERVAL', 3600), _compact_views),
+        ]
+        app.extensions['maintenance'] = self
+        app.before_request(self._ensure_thread)
+
+    def _ensure_thread(self):
+        if not self.enabled or request.endpoint == 'static':
+            return
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='maintenance', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self.run_due()
+            if self._stop.wait(self.tick):
+                return
+
+    def run_due(self):
+        """Run every job whose lease this worker can claim. Returns the names of jobs run."""
+        ran = []
+        for name, interval, job in self.jobs:
+            with self._app.app_context():
+                try:
+                    if not MaintenanceScheduler.claim(name, interval):
+                        continue
+                    job()
+                    ran.append(name)
+                except Exception:
+                    logger.exception('Maintenance job %s failed', name)
+                    db.session.rollback()
+        return ran
+
+    def stop(self):
+        self._stop.set()
+
+    @staticmethod
+    def claim(name, seconds):
+        """Take the lease of job `name` for `seconds` if it has expired. Commits.
+
+        Returns:
+            True if this caller now holds the lease and should run the job
+        """
+        now = datetime.utcnow()
+        until = now + timedelta(seconds=seconds)
+        claimed = db.session.execute(
+            update(MaintenanceLease)
+            .where(MaintenanceLease.name == name, MaintenanceLease.locked_until <= now)
+            .values(locked_until=until)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not claimed:
+            # First run ever: exactly one worker inserts the row
+            claimed = insert_ignore(MaintenanceLease, {'name': name}, {'locked_until': until})
+        db.session.commit()
+        return claimed
+
+
+maintenance = MaintenanceScheduler()
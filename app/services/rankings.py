@@ -0,0 +1,228 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models.comic import Comic, RankingSnapshot
+from app.services.facets import FacetService
+from app.services.view_buckets import ViewBucketService
+
+
+class RankingService:
+    """Precomputed top-N rankings per (period, content_type, genre).
+
+    refresh() recomputes every combination into ranking_snapshots; the
+    maintenance scheduler (app/services/maintenance.py) runs it every
+    RANKING_REFRESH_INTERVAL, and `flask rankings-refresh` runs it by hand.
+    Reads load the latest stored snapshot. Only when there is none yet, or
+    it is older than STALE_AFTER (scheduler stopped), is the ranking
+    computed live, and that result is cached like a snapshot. period='all'
+    is always read live from comics.views. One snapshot per day is kept,
+    which gives historical rankings and rank movement for free.
+
+    Loaded rankings are memoized per process in a small LRU (CACHE_SIZE
+    entries, CACHE_TTL seconds). Keys come from query arguments, so genre
+    and date are validated first: unknown genres and dates outside the
+    HISTORY_DAYS window raise ValueError.
+    """
+
+    PERIODS = ('day', 'week', 'month', 'all')
+    CONTENT_TYPES = ('all', 'comics', 'novels')
+    TOP_N = 50
+    HISTORY_DAYS = 90
+    STALE_AFTER = timedelta(days=1)
+    CACHE_TTL = 60  # seconds
+    CACHE_SIZE = 256
+
+    # API aliases used by /api/ranking/<period>
+    PERIOD_ALIASES = {'ngay': 'day', 'tuan': 'week', 'thang': 'month'}
+
+    _cache = OrderedDict()  # key -> (loaded_at, result), least recently used first
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def normalize_period(period):
+        period = RankingService.PERIOD_ALIASES.get(period, period)
+        return period if period in RankingService.PERIODS else None
+
+    @staticmethod
+    def validate(genre='', date=None):
+        """Normalized (genre, date) for a ranking read; raises ValueError for
+        an unknown genre or a date outside the snapshot history"""
+        genre = (genre or '').strip()[:100]
+        if genre and genre not in FacetService.values('genre'):
+            raise ValueError('Unknown genre')
+        if date is not None:
+            today = datetime.utcnow().date()
+            if not today - timedelta(days=RankingService.HISTORY_DAYS) <= date <= today:
+                raise ValueError('Date outside ranking history')
+        return genre, date
+
+    @staticmethod
+    def _cached(key, load):
+        with RankingService._cache_lock:
+            cached = RankingService._cache.get(key)
+            if cached and time.monotonic() - cached[0] < RankingService.CACHE_TTL:
+                RankingService._cache.move_to_end(key)
+                return cached[1]
+        result = load()
+        with RankingService._cache_lock:
+            RankingService._cache[key] = (time.monotonic(), result)
+            RankingService._cache.move_to_end(key)
+            while len(RankingService._cache) > RankingService.CACHE_SIZE:
+                RankingService._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _base_query(content_type, genre):
+        query = Comic.query
+        if content_type == 'comics':
+            query = query.filter((Comic.content_type == 'comic') | (Comic.content_type == None))
+        elif content_type == 'novels':
+            query = query.filter(Comic.content_type == 'novel')
+        if genre:
+            query = query.filter(Comic.genre == genre)
+        return query
+
+    @staticmethod
+    def compute(period, content_type='all', genre='', now=None):
+        """Live top-N as [(comic_id, score)]"""
+        query = RankingService._base_query(content_type, genre)
+        if period == 'all':
+            rows = query.with_entities(Comic.id, func.coalesce(Comic.views, 0)) \
+                .order_by(Comic.views.desc(), Comic.id.desc()) \
+                .limit(RankingService.TOP_N).all()
+            return [(comic_id, score) for comic_id, score in rows]
+        since = ViewBucketService.window_start(period, now)
+        return [(comic.id, int(score or 0))
+                for comic, score in ViewBucketService.top_comics(query, since, RankingService.TOP_N)]
+
+    @staticmethod
+    def _store(snapshot_date, period, content_type, genre, ranked, now):
+        RankingSnapshot.query.filter_by(snapshot_date=snapshot_date, period=period,
+                                        content_type=content_type, genre=genre) \
+            .delete(synchronize_session=False)
+        if ranked:
+            db.session.execute(RankingSnapshot.__table__.insert(), [
+                {'snapshot_date': snapshot_date, 'period': period, 'content_type': content_type,
+                 'genre': genre, 'rank': rank, 'comic_id': comic_id, 'score': score, 'computed_at': now}
+                for rank, (comic_id, score) in enumerate(ranked, 1)
+            ])
+
+    @staticmethod
+    def refresh(now=None):
+        """Recompute every combination and prune old history. Returns combinations written."""
+        now = now or datetime.utcnow()
+        genres = [''] + [g[:100] for g in FacetService.values('genre')]
+        combos = 0
+        for period in RankingService.PERIODS:
+            for content_type in RankingService.CONTENT_TYPES:
+                for genre in genres:
+                    ranked = RankingService.compute(period, content_type, genre, now)
+                    RankingService._store(now.date(), period, content_type, genre, ranked, now)
+                    combos += 1
+            db.session.commit()
+        RankingSnapshot.query.filter(
+            RankingSnapshot.snapshot_date < (now - timedelta(days=RankingService.HISTORY_DAYS)).date()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        with RankingService._cache_lock:
+            RankingService._cache.clear()
+        return combos
+
+    @staticmethod
+    def get(period, content_type='all', genre='', date=None, limit=20):
+        """Ranking from the snapshot table.
+
+        Returns {'as_of', 'date', 'previous_date', 'items': [{'rank', 'comic_id', 'score', 'rank_change'}]};
+        rank_change is previous snapshot rank minus current rank (positive =
+        moved up) or None for new entries. date=None means the latest stored
+        snapshot (today's, or the last one before it), or a live ranking when
+        that is missing or stale; a past date is served as stored.
+        """
+        genre, date = RankingService.validate(genre, date)
+        key = (date, period, content_type, genre)
+
+        def load():
+            if date is not None:
+                return RankingService._load(date, period, content_type, genre)
+            if period != 'all':
+                latest = db.session.query(func.max(RankingSnapshot.snapshot_date)) \
+                    .filter_by(period=period, content_type=content_type, genre=genre).scalar()
+                if latest is not None:
+                    result = RankingService._load(latest, period, content_type, genre)
+                    if result['as_of'] and datetime.utcnow() - result['as_of'] <= RankingService.STALE_AFTER:
+                        return result
+            return RankingService._live(period, content_type, genre)
+
+        result = RankingService._cached(key, load)
+        return dict(result, items=result['items'][:limit])
+
+    @staticmethod
+    def top_rated(content_type='all', genre='', limit=20):
+        """Live "top rated" ranking, read straight from the comics.rating_score index.
+
+        Same shape as get(); there are no snapshots, so as_of/previous_date
+        are None and rank_change is always None.
+        """
+        genre, _ = RankingService.validate(genre)
+
+        def load():
+            rows = RankingService._base_query(content_type, genre) \
+                .with_entities(Comic.id, Comic.rating_score) \
+                .filter(Comic.rating_count > 0) \
+                .order_by(Comic.rating_score.desc(), Comic.id.desc()) \
+                .limit(RankingService.TOP_N).all()
+            return {
+                'as_of': None,
+                'date': datetime.utcnow().date(),
+                'previous_date': None,
+                'items': [{'rank': rank, 'comic_id': comic_id, 'score': round(score, 3), 'rank_change': None}
+                          for rank, (comic_id, score) in enumerate(rows, 1)],
+            }
+
+        result = RankingService._cached(('rated', content_type, genre), load)
+        return dict(result, items=result['items'][:limit])
+
+    @staticmethod
+    def _load(date, period, content_type, genre):
+        rows = RankingSnapshot.query.filter_by(snapshot_date=date, period=period,
+                                               content_type=content_type, genre=genre) \
+            .order_by(RankingSnapshot.rank.asc()).all()
+        ranked = [(r.comic_id, r.score) for r in rows]
+        return RankingService._result(date, rows[0].computed_at if rows else None,
+                                      ranked, period, content_type, genre)
+
+    @staticmethod
+    def _live(period, content_type, genre):
+        """Ranking computed now (not stored), compared with the last snapshot before today"""
+        now = datetime.utcnow()
+        ranked = RankingService.compute(period, content_type, genre, now)
+        return RankingService._result(now.date(), now, ranked, period, content_type, genre)
+
+    @staticmethod
+    def _result(date, as_of, ranked, period, content_type, genre):
+        """get() result for [(comic_id, score)] in rank order, with movement since the previous snapshot"""
+        combo = dict(period=period, content_type=content_type, genre=genre)
+        previous_date = db.session.query(func.max(RankingSnapshot.snapshot_date)) \
+            .filter_by(**combo).filter(RankingSnapshot.snapshot_date < date).scalar()
+        previous = {}
+        if previous_date is not None and ranked:
+            previous = dict(
+                db.session.query(RankingSnapshot.comic_id, RankingSnapshot.rank)
+                .filter_by(snapshot_date=previous_date, **combo)
+                .filter(RankingSnapshot.comic_id.in_([comic_id for comic_id, _ in ranked]))
+                .all()
+            )
+        return {
+            'as_of': as_of,
+            'date': date,
+            'previous_date': previous_date,
+            'items': [{
+                'rank': rank,
+                'comic_id': comic_id,
+                'score': score,
+                'rank_change': previous[comic_id] - rank if comic_id in previous else None,
+            } for rank, (comic_id, score) in enumerate(ranked, 1)],
+        }
@@ -0,0 +1,104 @@
+from flask import current_app
+from sqlalchemy import Float, case, cast, func, update
+from app import db
+from app.models.comic import Comic, UserRating
+from app.utils.upsert import insert_ignore
+
+
+class RatingService:
+    """Comic rating aggregates.
+
+    comics.rating_sum / rating_count are exact integers changed by deltas
+    in a single UPDATE per vote. `rating` (the displayed average) and
+    `rating_score` (Bayesian average used for "top rated" sorting) are
+    derived from them in the same statement. The score pulls comics with
+    few votes towards RATING_PRIOR_MEAN, as if each had RATING_PRIOR_VOTES
+    extra votes of that value, so one 5-star vote does not top the list.
+    """
+
+    @staticmethod
+    def _prior():
+        config = current_app.config
+        return config.get('RATING_PRIOR_VOTES', 10), config.get('RATING_PRIOR_MEAN', 3.0)
+
+    @staticmethod
+    def score(rating_sum, rating_count):
+        """Bayesian average of a comic's votes (0 when it has none)"""
+        if not rating_count:
+            return 0.0
+        prior_votes, prior_mean = RatingService._prior()
+        return (prior_votes * prior_mean + rating_sum) / (prior_votes + rating_count)
+
+    @staticmethod
+    def _derived(rating_sum, rating_count):
+        """SQL expressions for (rating, rating_score) from sum/count expressions"""
+        prior_votes, prior_mean = RatingService._prior()
+        total = cast(rating_sum, Float)
+        average = case((rating_count > 0, total / rating_count), else_=0.0)
+        score = case((rating_count > 0, (prior_votes * prior_mean + total) / (prior_votes + rating_count)),
+                     else_=0.0)
+        return average, score
+
+    @staticmethod
+    def apply(comic_id, sum_delta, count_delta):
+        """Add a vote delta to a comic's aggregates in one UPDATE"""
+        new_sum = Comic.rating_sum + sum_delta
+        new_count = Comic.rating_count + count_delta
+        average, score = RatingService._derived(new_sum, new_count)
+        # Derived columns first: MySQL evaluates SET assignments left to right with already-updated values
+        db.session.execute(update(Comic).where(Comic.id == comic_id).ordered_values(
+            (Comic.rating, average),
+            (Comic.rating_score, score),
+            (Comic.rating_sum, new_sum),
+            (Comic.rating_count, new_count),
+            (Comic.updated_at, Comic.updated_at)))
+
+    @staticmethod
+    def vote(user_id, comic_id, rating):
+        """Record a user's 1-5 vote and update the comic's aggregates. Caller commits.
+
+        Returns:
+            True for a first vote, False when an existing vote was changed
+        """
+        keys = {'user_id': user_id, 'comic_id': comic_id}
+        if insert_ignore(UserRating, keys, {'rating': rating}):
+            RatingService.apply(comic_id, rating, 1)
+            return True
+        # Lock the old vote so two concurrent changes do not both subtract it
+        old_rating = db.session.query(UserRating.rating).filter_by(**keys).with_for_update().scalar()
+        if old_rating is not None and old_rating != rating:
+            db.session.execute(update(UserRating).filter_by(**keys).values(rating=rating))
+            RatingService.apply(comic_id, rating - old_rating, 0)
+        return False
+
+    @staticmethod
+    def reconcile():
+        """Recompute every comic's aggregates from user_rating and commit.
+
+        Returns:
+            (comics whose sum/count had drifted, comics updated)
+        """
+        votes = db.session.query(
+            UserRating.comic_id.label('comic_id'),
+            func.sum(UserRating.rating).label('rating_sum'),
+            func.count(UserRating.id).label('rating_count')
+        ).group_by(UserRating.comic_id).subquery()
+        drifted = db.session.query(func.count(Comic.id)) \
+            .outerjoin(votes, votes.c.comic_id == Comic.id) \
+            .filter((func.coalesce(Comic.rating_sum, 0) != func.coalesce(votes.c.rating_sum, 0))
+                    | (func.coalesce(Comic.rating_count, 0) != func.coalesce(votes.c.rating_count, 0))) \
+            .scalar()
+
+        def correlated(aggregate):
+            return func.coalesce(
+                db.session.query(aggregate).filter(UserRating.comic_id == Comic.id).scalar_subquery(), 0)
+
+        db.session.execute(update(Comic).values(
+            rating_sum=correlated(func.sum(UserRating.rating)),
+            rating_count=correlated(func.count(UserRating.id)),
+            updated_at=Comic.updated_at))
+        average, score = RatingService._derived(Comic.rating_sum, Comic.rating_count)
+        updated = db.session.execute(update(Comic).values(
+            rating=average, rating_score=score, updated_at=Comic.updated_at)).rowcount
+        db.session.commit()
+        return drifted, updated
@@ -0,0 +1,197 @@
+import re
+import unicodedata
+from collections import Counter
+from sqlalchemy import and_, or_, case, false, func, select
+from app import db
+from app.models.comic import Comic, ComicSearchDocument, SearchTerm
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold_text(text):
+    """Lowercase and strip Vietnamese diacritics: 'Tu Tiên Đạo' -> 'tu tien dao'"""
+    if not text:
+        return ''
+    # 'đ' is a separate letter, not a combining mark, so NFD does not split it
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return ' '.join(_TOKEN_RE.findall(text.lower()))
+
+
+def tokenize(text):
+    """Split folded text into search terms"""
+    return fold_text(text).split()
+
+
+class SearchService:
+    """Catalog search shared by the listing pages and the search API.
+
+    PostgreSQL uses a tsvector GIN index on the folded document plus trigram
+    indexes for fuzzy title matching. Other databases use the `search_terms`
+    inverted index and rank results in Python.
+    """
+
+    # Relevance boost per field
+    FIELD_WEIGHTS = {
+        'title': 8,
+        'tags': 4,
+        'author': 3,
+        'genre': 2,
+    }
+    MAX_CANDIDATES = 500  # Số kết quả tối đa được xếp hạng cho một truy vấn
+    MIN_PREFIX_LENGTH = 2  # Không mở rộng tiền tố cho từ quá ngắn
+    MAX_TERM_LENGTH = 64
+
+    @staticmethod
+    def uses_native_fts():
+        """True when the database supports tsvector/trigram search"""
+        return db.engine.dialect.name == 'postgresql'
+
+    @staticmethod
+    def build_fields(comic):
+        """Folded search fields for a comic"""
+        tags = (comic.tags or '').replace(',', ' ')
+        return {
+            'title': fold_text(comic.title),
+            'author': fold_text(comic.author),
+            'genre': fold_text(comic.genre),
+            'tags': fold_text(tags),
+        }
+
+    @staticmethod
+    def index_comic(comic):
+        """Create or refresh the search document of a comic. Caller commits."""
+        if comic.id is None:
+            db.session.flush()
+
+        fields = SearchService.build_fields(comic)
+        document = db.session.get(ComicSearchDocument, comic.id)
+        if document is None:
+            document = ComicSearchDocument(comic_id=comic.id)
+            db.session.add(document)
+        document.title = fields['title'][:200]
+        document.author = fields['author'][:100]
+        document.genre = fields['genre'][:100]
+        document.tags = fields['tags'][:500]
+        document.document = ' '.join(v for v in fields.values() if v)
+
+        if SearchService.uses_native_fts():
+            return document
+
+        # Rebuild inverted index rows for this comic
+        SearchTerm.query.filter_by(comic_id=comic.id).delete(synchronize_session=False)
+        rows = []
+        for field, value in fields.items():
+            counts = Counter(t[:SearchService.MAX_TERM_LENGTH] for t in value.split())
+            for term, weight in counts.items():
+                rows.append({'term': term, 'comic_id': comic.id, 'field': field, 'weight': weight})
+        if rows:
+            db.session.execute(SearchTerm.__table__.insert(), rows)
+        return document
+
+    @staticmethod
+    def reindex_all(batch_size=500):
+        """Rebuild search documents for the whole catalog. Returns number of comics indexed."""
+        total = 0
+        last_id = 0
+        while True:
+            comics = Comic.query.filter(Comic.id > last_id).order_by(Comic.id.asc()).limit(batch_size).all()
+            if not comics:
+                break
+            for comic in comics:
+                SearchService.index_comic(comic)
+            db.session.commit()
+            total += len(comics)
+            last_id = comics[-1].id
+        return total
+
+    @staticmethod
+    def apply(query, text, field=None):
+        """Restrict a Comic query to matches for `text` and order it by relevance.
+
+        Args:
+            query: Comic query (other filters may already be applied)
+            text: raw user input, accents optional
+            field: one of FIELD_WEIGHTS keys to search a single field, None for all
+
+        Returns:
+            Query ordered by relevance; callers may append tie-breaker ordering.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return query
+        if SearchService.uses_native_fts():
+            return SearchService._apply_postgres(query, tokens, field)
+        return SearchService._apply_inverted_index(query, tokens, field)
+
+    @staticmethod
+    def _apply_postgres(query, tokens, field):
+        doc = db.aliased(ComicSearchDocument)
+        folded = ' '.join(tokens)
+        query = query.join(doc, doc.comic_id == Comic.id)
+
+        if field is not None:
+            # Trigram index makes ILIKE '%...%' on the folded column an index scan
+            column = getattr(doc, field)
+            return query.filter(column.ilike(f'%{folded}%')) \
+                .order_by(func.similarity(column, folded).desc())
+
+        # Prefix match on every token so partially typed words still hit
+        vector = func.to_tsvector(db.literal_column("'simple'"), doc.document)
+        ts_query = func.to_tsquery(db.literal_column("'simple'"), ' & '.join(f'{t}:*' for t in tokens))
+        return query.filter(
+            or_(vector.op('@@')(ts_query), doc.title.op('%')(folded))
+        ).order_by((func.ts_rank(vector, ts_query) + func.similarity(doc.title, folded)).desc())
+
+    @staticmethod
+    def _apply_inverted_index(query, tokens, field):
+        # The caller's filters (genre, status, tags...) restrict the candidates before truncation
+        ranked = SearchService.rank(tokens, field,
+                                    comic_ids=query.with_entities(Comic.id).order_by(None).subquery())
+        if not ranked:
+            return query.filter(false())
+        ids = [comic_id for comic_id, _ in ranked]
+        position = case({comic_id: pos for pos, comic_id in enumerate(ids)}, value=Comic.id)
+        return query.filter(Comic.id.in_(ids)).order_by(position)
+
+    @staticmethod
+    def rank(tokens, field=None, comic_ids=None):
+        """Score comics from the inverted index.
+
+        Every token must match (AND). The last token is treated as a prefix so
+        type-ahead queries work. `comic_ids` (a subquery with an `id` column)
+        limits scoring to those comics, so the MAX_CANDIDATES cut happens
+        after filtering. Returns [(comic_id, score)] best first.
+        """
+        last = len(tokens) - 1
+        clauses = []
+        for idx, token in enumerate(tokens):
+            if idx == last and len(token) >= SearchService.MIN_PREFIX_LENGTH:
+                # Range scan on the term index instead of LIKE 'x%'
+                clauses.append(and_(SearchTerm.term >= token, SearchTerm.term < token + '\uffff'))
+            else:
+                clauses.append(SearchTerm.term == token)
+
+        term_query = db.session.query(SearchTerm.comic_id, SearchTerm.term, SearchTerm.field, SearchTerm.weight) \
+            .filter(or_(*clauses))
+        if field is not None:
+            term_query = term_query.filter(SearchTerm.field == field)
+        if comic_ids is not None:
+            term_query = term_query.filter(SearchTerm.comic_id.in_(select(comic_ids.c.id)))
+
+        scores = {}
+        matched = {}
+        for comic_id, term, term_field, weight in term_query:
+            for idx, token in enumerate(tokens):
+                exact = term == token
+                if not exact and not (idx == last and term.startswith(token)):
+                    continue
+                boost = SearchService.FIELD_WEIGHTS.get(term_field, 1) * weight * (1.0 if exact else 0.5)
+                scores[comic_id] = scores.get(comic_id, 0) + boost
+                matched.setdefault(comic_id, set()).add(idx)
+
+        required = len(tokens)
+        candidates = [cid for cid, hits in matched.items() if len(hits) == required]
+        candidates.sort(key=lambda cid: (-scores[cid], cid))
+        return [(cid, scores[cid]) for cid in candidates[:SearchService.MAX_CANDIDATES]]
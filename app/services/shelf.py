@@ -0,0 +1,62 @@
+from sqlalchemy import case, func, select
+from app import db
+from app.models.comic import Comic, Chapter, Follow, UserReadHistory
+
+
+class ShelfService:
+    """A user's followed comics with reading progress, in one query.
+
+    Per followed comic the row carries the denormalized chapter stats from
+    comics, the furthest chapter the user has read (grouped over their own
+    read history) and the number of chapters after it. That count is an
+    index range on chapters(comic_id, chapter_number) covering only the
+    unread chapters; a comic never read uses chapter_count. The cost grows
+    with the user's follows and read history, not with catalog size.
+    """
+
+    SORTS = ('followed', 'updated', 'unread')
+
+    @staticmethod
+    def followed(user_id, sort='followed'):
+        """Rows with comic_id, title, author, cover_image, content_type, chapter_count,
+        latest_chapter_number, last_update, followed_at, last_read_number, last_read_at, unread"""
+        progress = db.session.query(
+            UserReadHistory.comic_id.label('comic_id'),
+            func.max(Chapter.chapter_number).label('last_read_number'),
+            func.max(UserReadHistory.created_at).label('last_read_at')
+        ).join(Chapter, Chapter.id == UserReadHistory.chapter_id) \
+            .filter(UserReadHistory.user_id == user_id) \
+            .group_by(UserReadHistory.comic_id).subquery()
+
+        unread_after = select(func.count(Chapter.id)).where(
+            Chapter.comic_id == Follow.comic_id,
+            Chapter.chapter_number > progress.c.last_read_number
+        ).scalar_subquery()
+        unread = case((progress.c.last_read_number.is_(None), func.coalesce(Comic.chapter_count, 0)),
+                      else_=unread_after).label('unread')
+        last_update = func.coalesce(Comic.last_chapter_at, Comic.updated_at).label('last_update')
+
+        query = db.session.query(
+            Comic.id.label('comic_id'),
+            Comic.title,
+            Comic.author,
+            Comic.cover_image,
+            Comic.content_type,
+            Comic.chapter_count,
+            Comic.latest_chapter_number,
+            last_update,
+            Follow.created_at.label('followed_at'),
+            progress.c.last_read_number,
+            progress.c.last_read_at,
+            unread
+        ).join(Comic, Comic.id == Follow.comic_id) \
+            .outerjoin(progress, progress.c.comic_id == Follow.comic_id) \
+            .filter(Follow.user_id == user_id)
+
+        if sort == 'updated':
+            query = query.order_by(last_update.desc(), Comic.id.desc())
+        elif sort == 'unread':
+            query = query.order_by(unread.desc(), last_update.desc(), Comic.id.desc())
+        else:
+            query = query.order_by(Follow.created_at.desc(), Follow.id.desc())
+        return query.all()
@@ -0,0 +1,126 @@
+from sqlalchemy import case, false, func, select
+from app import db
+from app.models.comic import Comic, Tag, comic_tags
+from app.services.search import fold_text
+
+
+def tag_slug(name):
+    """Accent-folded tag key: 'Tu Tiên' -> 'tu-tien'"""
+    return '-'.join(fold_text(name).split())[:100]
+
+
+def parse_tags(raw):
+    """Parse a comma-separated tag string into [(name, slug)], de-duplicated, input order kept"""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    result = []
+    seen = set()
+    for part in raw:
+        name = (part or '').strip()[:100]
+        slug = tag_slug(name)
+        if not slug or slug in seen:
+            continue
+        seen.add(slug)
+        result.append((name, slug))
+    return result
+
+
+class TagService:
+    """Keep the normalized tag tables in sync with Comic.tags and query them"""
+
+    @staticmethod
+    def sync_comic(comic):
+        """Make comic.tag_set match comic.tags and adjust usage counts. Caller commits."""
+        if comic.id is None:
+            db.session.flush()
+
+        wanted = parse_tags(comic.tags)
+        wanted_slugs = [slug for _, slug in wanted]
+        current = {tag.slug: tag for tag in comic.tag_set}
+
+        removed = [tag for slug, tag in current.items() if slug not in wanted_slugs]
+        added_slugs = [slug for slug in wanted_slugs if slug not in current]
+
+        tags_by_slug = {}
+        if added_slugs:
+            tags_by_slug = {t.slug: t for t in Tag.query.filter(Tag.slug.in_(added_slugs)).all()}
+            for name, slug in wanted:
+                if slug in added_slugs and slug not in tags_by_slug:
+                    tag = Tag(name=name, slug=slug, usage_count=0)
+                    db.session.add(tag)
+                    tags_by_slug[slug] = tag
+            db.session.flush()
+
+        for tag in removed:
+            comic.tag_set.remove(tag)
+        for slug in added_slugs:
+            comic.tag_set.append(tags_by_slug[slug])
+
+        # Counters are updated in SQL so concurrent edits don't overwrite each other
+        TagService._bump([t.id for t in removed], -1)
+        TagService._bump([tags_by_slug[s].id for s in added_slugs], 1)
+        return removed, [tags_by_slug[s] for s in added_slugs]
+
+    @staticmethod
+    def release_comic(comic):
+        """Decrement usage counts before a comic is deleted. Caller commits."""
+        TagService._bump([tag.id for tag in comic.tag_set], -1)
+
+    @staticmethod
+    def _bump(tag_ids, delta):
+        if not tag_ids:
+            return
+        new_count = Tag.usage_count + delta
+        db.session.execute(
+            Tag.__table__.update()
+            .where(Tag.id.in_(tag_ids))
+            .values(usage_count=case((new_count < 0, 0), else_=new_count))
+        )
+
+    @staticmethod
+    def filter_query(query, tags, mode='any'):
+        """Filter a Comic query by tags through the comic_tags index.
+
+        Args:
+            query: Comic query
+            tags: list of tag names (or a comma-separated string)
+            mode: 'any' (OR) or 'all' (AND)
+        """
+        slugs = [slug for _, slug in parse_tags(tags)]
+        if not slugs:
+            return query
+        tag_ids = [row[0] for row in db.session.query(Tag.id).filter(Tag.slug.in_(slugs)).all()]
+
+        if mode == 'all':
+            if len(tag_ids) < len(slugs):
+                # Một tag không tồn tại thì không truyện nào khớp tất cả
+                return query.filter(false())
+            matching = select(comic_tags.c.comic_id) \
+                .where(comic_tags.c.tag_id.in_(tag_ids)) \
+                .group_by(comic_tags.c.comic_id) \
+                .having(func.count(comic_tags.c.tag_id) == len(tag_ids))
+        else:
+            if not tag_ids:
+                return query.filter(false())
+            matching = select(comic_tags.c.comic_id).where(comic_tags.c.tag_id.in_(tag_ids))
+
+        return query.filter(Comic.id.in_(matching))
+
+    @staticmethod
+    def tag_cloud(limit=50):
+        """Most used tags, read straight from the usage counters"""
+        return Tag.query.filter(Tag.usage_count > 0) \
+            .order_by(Tag.usage_count.desc(), Tag.name.asc()) \
+            .limit(limit).all()
+
+    @staticmethod
+    def rebuild_counts():
+        """Recompute every usage_count from comic_tags. Returns number of tags updated."""
+        counts = select(func.count(comic_tags.c.comic_id)) \
+            .where(comic_tags.c.tag_id == Tag.id) \
+            .scalar_subquery()
+        result = db.session.execute(Tag.__table__.update().values(usage_count=counts))
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,216 @@
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+from app import db
+from app.models.comic import Chapter, UploadJob, UploadJobFile
+from app.services.chapter_stats import ChapterStatsService
+from app.services.image_fingerprints import ImageFingerprintService
+from app.utils.image_upload import iter_upload_images
+from app.utils.perceptual_hash import to_signed, to_unsigned
+from app.utils.response_cache import invalidate_pages, comic_tags
+
+logger = logging.getLogger(__name__)
+
+
+class UploadJobService:
+    """Chapter page uploads that run outside the request.
+
+    The POST stages files under UPLOAD_FOLDER/upload_jobs/<job id>/ and
+    returns; a per-worker thread pool uploads them, recording per-file
+    progress. The chapter is created only when every page is uploaded.
+    Failed pages stay staged so a retry only re-sends those.
+    """
+
+    STALE_AFTER = timedelta(minutes=10)  # a 'running' job not updated for this long was interrupted
+
+    _executor = None
+    _executor_pid = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def staging_dir(job_id):
+        root = current_app.config.get('UPLOAD_FOLDER') or os.path.join(current_app.instance_path, 'uploads')
+        return os.path.join(root, 'upload_jobs', str(job_id))
+
+    @staticmethod
+    def create(comic, user_id, chapter_number, title, files):
+        """Stage `files` (FileStorage, in page order) and record the job. Commits."""
+        job = UploadJob(comic_id=comic.id, user_id=user_id, chapter_number=chapter_number, title=title)
+        db.session.add(job)
+        db.session.flush()
+        directory = UploadJobService.staging_dir(job.id)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for position, file in enumerate(files):
+                name = secure_filename(file.filename or '') or 'page'
+                path = os.path.join(directory, f'{position:04d}_{name}')
+                file.save(path)
+                job.files.append(UploadJobFile(position=position, filename=file.filename, staged_path=path))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return job
+
+    @staticmethod
+    def _pool():
+        # One pool per process, created after gunicorn forks
+        with UploadJobService._lock:
+            if UploadJobService._executor is None or UploadJobService._executor_pid != os.getpid():
+                workers = current_app.config.get('UPLOAD_JOB_WORKERS', 2)
+                UploadJobService._executor = ThreadPoolExecutor(max_workers=workers,
+                                                                thread_name_prefix='upload-job')
+                UploadJobService._executor_pid = os.getpid()
+            return UploadJobService._executor
+
+    @staticmethod
+    def start(job_id):
+        app = current_app._get_current_object()
+        UploadJobService._pool().submit(UploadJobService._run, app, job_id)
+
+    @staticmethod
+    def _run(app, job_id):
+        with app.app_context():
+            try:
+                UploadJobService.process(job_id)
+            except Exception as e:
+                logger.exception('Upload job %s crashed', job_id)
+                db.session.rollback()
+                job = db.session.get(UploadJob, job_id)
+                if job is not None:
+                    job.status = 'failed'
+                    job.error = str(e)
+                    db.session.commit()
+
+    @staticmethod
+    def process(job_id):
+        """Upload the job's remaining files, then create the chapter if all succeeded"""
+        job = db.session.get(UploadJob, job_id)
+        if job is None or job.status == 'completed':
+            return
+        job.status = 'running'
+        job.error = None
+        db.session.commit()
+
+        pending = []
+        for row in job.files:
+            if row.status == 'done':
+                continue
+            if not row.staged_path or not os.path.exists(row.staged_path):
+                row.status = 'failed'
+                row.error = 'File tạm không còn, cần upload lại chương'
+                continue
+            pending.append(row)
+        db.session.commit()
+
+        handles = [FileStorage(stream=open(row.staged_path, 'rb'), filename=row.filename) for row in pending]
+        try:
+            for result in iter_upload_images(handles):
+                row = pending[result.index]
+                row.attempts += result.attempts
+                if result.url:
+                    row.status = 'done'
+                    row.error = None
+                    row.url = result.url
+                    for field in ('width', 'height', 'byte_size', 'content_hash'):
+                        setattr(row, field, result.info.get(field))
+                    phash = result.info.get('phash')
+                    row.phash = to_signed(phash) if phash is not None else None
+                else:
+                    row.status = 'failed'
+                    row.error = result.error
+                # Each finished file is visible to the progress endpoint right away
+                job.updated_at = datetime.utcnow()
+                db.session.commit()
+        finally:
+            for handle in handles:
+                handle.close()
+
+        failed = [row for row in job.files if row.status != 'done']
+        if failed:
+            job.status = 'failed'
+            job.error = f'{len(failed)}/{len(job.files)} ảnh upload thất bại'
+            db.session.commit()
+            return
+        UploadJobService._finalize(job)
+
+    @staticmethod
+    def _finalize(job):
+        existing = Chapter.query.filter_by(comic_id=job.comic_id, chapter_number=job.chapter_number).first()
+        if existing:
+            job.status = 'failed'
+            job.error = f'Chương {job.chapter_number:g} đã tồn tại (ID: {existing.id})'
+            db.session.commit()
+            return
+
+        infos = [{
+            'url': row.url, 'width': row.width, 'height': row.height,
+            'byte_size': row.byte_size, 'content_hash': row.content_hash,
+            'phash': to_unsigned(row.phash) if row.phash is not None else None
+        } for row in job.files]
+        chapter = Chapter(comic_id=job.comic_id, chapter_number=job.chapter_number, title=job.title)
+        chapter.set_images(infos)
+        db.session.add(chapter)
+        ChapterStatsService.refresh(job.comic_id, bump_updated=True)
+        job.warning = ImageFingerprintService.warning_text(
+            ImageFingerprintService.similar_comics([i['phash'] for i in infos], exclude_comic_id=job.comic_id),
+            len(infos))
+        ImageFingerprintService.record_pages(chapter, infos)
+        job.chapter_id = chapter.id
+        job.status = 'completed'
+        db.session.commit()
+        invalidate_pages(*comic_tags(job.comic_id))
+        shutil.rmtree(UploadJobService.staging_dir(job.id), ignore_errors=True)
+
+    @staticmethod
+    def is_stale(job):
+        return job.status == 'running' and job.updated_at is not None \
+            and datetime.utcnow() - job.updated_at > UploadJobService.STALE_AFTER
+
+    @staticmethod
+    def retry(job):
+        """Re-queue the failed files of a job. Returns False if it is pending, running or completed.
+
+        The failed -> pending transition is one conditional UPDATE, so of two
+        concurrent retries only the one that changed the row starts the job.
+        """
+        cutoff = datetime.utcnow() - UploadJobService.STALE_AFTER
+        claimed = db.session.execute(
+            update(UploadJob)
+            .where(UploadJob.id == job.id,
+                   or_(UploadJob.status == 'failed',
+                       and_(UploadJob.status == 'running', UploadJob.updated_at < cutoff)))
+            .values(status='pending', error=None, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if not claimed:
+            db.session.rollback()
+            db.session.refresh(job)
+            return False
+        db.session.execute(
+            update(UploadJobFile)
+            .where(UploadJobFile.job_id == job.id, UploadJobFile.status == 'failed')
+            .values(status='pending', error=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        UploadJobService.start(job.id)
+        return True
+
+    @staticmethod
+    def resume_interrupted():
+        """Re-queue pending/stale jobs left by a restarted worker. Returns job ids."""
+        cutoff = datetime.utcnow() - UploadJobService.STALE_AFTER
+        jobs = UploadJob.query.filter(UploadJob.status.in_(('pending', 'running')),
+                                      UploadJob.updated_at < cutoff).all()
+        for job in jobs:
+            UploadJobService.process(job.id)
+        return [job.id for job in jobs]
@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.comic import Comic, ComicViewBucket
+
+
+class ViewBucketService:
+    """Time-bucketed view counters used for day/week/month rankings"""
+
+    HOURLY_RETENTION = timedelta(days=2)  # Giữ bucket theo giờ trong 48h
+    DAILY_RETENTION = timedelta(days=180)  # Sau đó gộp bucket ngày thành bucket tháng
+
+    # Window lengths for ranking periods (both API spellings)
+    PERIODS = {
+        'day': timedelta(days=1), 'ngay': timedelta(days=1),
+        'week': timedelta(days=7), 'tuan': timedelta(days=7),
+        'month': timedelta(days=30), 'thang': timedelta(days=30),
+    }
+
+    @staticmethod
+    def add_views(comic_views, at=None):
+        """Add {comic_id: n} to the current hourly buckets. Caller commits."""
+        if not comic_views:
+            return
+        at = at or datetime.utcnow()
+        hour = at.replace(minute=0, second=0, microsecond=0)
+        ViewBucketService._add('hour', {(comic_id, hour): n for comic_id, n in comic_views.items()})
+
+    @staticmethod
+    def _add(granularity, counts):
+        """Increment {(comic_id, bucket_start): n} for one granularity"""
+        if not counts:
+            return
+        comic_ids = {comic_id for comic_id, _ in counts}
+        starts = {start for _, start in counts}
+        existing = set(
+            db.session.query(ComicViewBucket.comic_id, ComicViewBucket.bucket_start)
+            .filter(ComicViewBucket.granularity == granularity,
+                    ComicViewBucket.comic_id.in_(comic_ids),
+                    ComicViewBucket.bucket_start.in_(starts))
+            .all()
+        )
+        updates = [key for key in counts if key in existing]
+        inserts = [key for key in counts if key not in existing]
+
+        ViewBucketService._increment(granularity, {key: counts[key] for key in updates})
+        if not inserts:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(ComicViewBucket.__table__.insert(), [
+                    {'comic_id': comic_id, 'granularity': granularity, 'bucket_start': start,
+                     'views': counts[(comic_id, start)]}
+                    for comic_id, start in inserts
+                ])
+        except IntegrityError:
+            # Another worker created some of these buckets in the meantime
+            ViewBucketService._increment(granularity, {key: counts[key] for key in inserts})
+
+    @staticmethod
+    def _increment(granularity, counts):
+        if not counts:
+            return
+        db.session.execute(
+            ComicViewBucket.__table__.update()
+            .where(ComicViewBucket.comic_id == bindparam('b_comic_id'),
+                   ComicViewBucket.granularity == granularity,
+                   ComicViewBucket.bucket_start == bindparam('b_start'))
+            .values(views=ComicViewBucket.views + bindparam('b_n')),
+            [{'b_comic_id': c, 'b_start': start, 'b_n': n} for (c, start), n in counts.items()]
+        )
+
+    @staticmethod
+    def window_start(period, now=None):
+        """Start of the ranking window for a period name, or None if unknown/all-time
+        (edges are bucket-aligned, see period_views_subquery)"""
+        length = ViewBucketService.PERIODS.get(period)
+        if length is None:
+            return None
+        return (now or datetime.utcnow()) - length
+
+    @staticmethod
+    def period_views_subquery(since):
+        """SELECT comic_id, SUM(views) AS period_views over buckets starting at or after `since`.
+
+        Windows are approximate at the edges because buckets are never split.
+        The bucket that straddles `since` is left out whole: up to an hour for
+        the day window, and up to a day once compact() has rolled the hours
+        into daily buckets (week/month windows). The current, partly elapsed
+        hour is counted in full. Every comic is cut at the same boundaries,
+        so rankings compare like with like.
+        """
+        return db.session.query(
+            ComicViewBucket.comic_id.label('comic_id'),
+            func.sum(ComicViewBucket.views).label('period_views')
+        ).filter(ComicViewBucket.bucket_start >= since) \
+            .group_by(ComicViewBucket.comic_id) \
+            .subquery()
+
+    @staticmethod
+    def top_comics(query, since, limit):
+        """Rank a Comic query by views inside the window. Returns [(comic, period_views)]."""
+        period = ViewBucketService.period_views_subquery(since)
+        return query.join(period, period.c.comic_id == Comic.id) \
+            .add_columns(period.c.period_views) \
+            .order_by(period.c.period_views.desc(), Comic.id.desc()) \
+            .limit(limit).all()
+
+    @staticmethod
+    def compact(now=None):
+        """Roll old hourly buckets into days and old daily buckets into months.
+
+        Must run from a single place at a time: the maintenance scheduler runs
+        it every VIEW_COMPACT_INTERVAL under a lease, `flask views-compact` by
+        hand. Returns (hour_rows_compacted, day_rows_compacted).
+        """
+        now = now or datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        hour_cutoff = today - ViewBucketService.HOURLY_RETENTION
+        day_cutoff = (today - ViewBucketService.DAILY_RETENTION).replace(day=1)
+
+        hours = ViewBucketService._roll_up('hour', 'day', hour_cutoff,
+                                           lambda dt: dt.replace(hour=0))
+        days = ViewBucketService._roll_up('day', 'month', day_cutoff,
+                                          lambda dt: dt.replace(day=1, hour=0))
+        db.session.commit()
+        return hours, days
+
+    @staticmethod
+    def _roll_up(source, target, cutoff, truncate):
+        rows = db.session.query(ComicViewBucket.comic_id, ComicViewBucket.bucket_start, ComicViewBucket.views) \
+            .filter(ComicViewBucket.granularity == source, ComicViewBucket.bucket_start < cutoff) \
+            .all()
+        if not rows:
+            return 0
+        totals = {}
+        for comic_id, start, views in rows:
+            key = (comic_id, truncate(start.replace(minute=0, second=0, microsecond=0)))
+            totals[key] = totals.get(key, 0) + (views or 0)
+        ViewBucketService._add(target, totals)
+        ComicViewBucket.query.filter(ComicViewBucket.granularity == source,
+                                     ComicViewBucket.bucket_start < cutoff) \
+            .delete(synchronize_session=False)
+        return len(rows)
@@ -0,0 +1,156 @@
+import atexit
+import logging
+import os
+import threading
+from sqlalchemy import bindparam, func
+from app import db
+from app.models.comic import Comic, Chapter
+from app.services.view_buckets import ViewBucketService
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """Aggregate page-view increments.
+
+    VIEW_COUNT_MODE = 'immediate': every view runs UPDATE ... SET views = views + 1
+    in the request's session (committed by the caller).
+
+    VIEW_COUNT_MODE = 'buffered': views are summed in memory per worker and
+    written every VIEW_FLUSH_INTERVAL seconds, or as soon as
+    VIEW_FLUSH_THRESHOLD views are pending, as batched
+    UPDATE ... SET views = views + n statements. The buffer is drained on
+    worker exit (gunicorn.conf.py worker_exit hook and atexit).
+    """
+
+    def __init__(self):
+        self.mode = 'immediate'
+        self.flush_interval = 10
+        self.flush_threshold = 1000
+        self._app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._comic_views = {}  # comic_id -> n
+        self._chapter_views = {}  # (comic_id, chapter_number) -> n
+        self._pending = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self._app = app
+        self.mode = app.config.get('VIEW_COUNT_MODE', 'immediate')
+        self.flush_interval = app.config.get('VIEW_FLUSH_INTERVAL', self.flush_interval)
+        self.flush_threshold = app.config.get('VIEW_FLUSH_THRESHOLD', self.flush_threshold)
+        app.extensions['view_counter'] = self
+        atexit.register(self.drain)
+
+    @property
+    def buffered(self):
+        return self.mode == 'buffered'
+
+    def record_comic_view(self, comic_id):
+        if not self.buffered:
+            self._write({comic_id: 1}, {})
+            return
+        self._add(self._comic_views, comic_id)
+
+    def record_chapter_view(self, comic_id, chapter_number):
+        if not self.buffered:
+            self._write({}, {(comic_id, chapter_number): 1})
+            return
+        self._add(self._chapter_views, (comic_id, chapter_number))
+
+    def _add(self, buffer, key):
+        with self._lock:
+            buffer[key] = buffer.get(key, 0) + 1
+            self._pending += 1
+            full = self._pending >= self.flush_threshold
+        self._ensure_flusher()
+        if full:
+            self.flush()
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _take(self):
+        with self._lock:
+            comics, chapters = self._comic_views, self._chapter_views
+            self._comic_views, self._chapter_views = {}, {}
+            self._pending = 0
+        return comics, chapters
+
+    def flush(self):
+        """Write buffered views to the database. Returns number of views written."""
+        if self._app is None:
+            return 0
+        with self._flush_lock:
+            comics, chapters = self._take()
+            if not comics and not chapters:
+                return 0
+            try:
+                # Separate app context => separate session from any running request
+                with self._app.app_context():
+                    self._write(comics, chapters)
+                    db.session.commit()
+            except Exception:
+                logger.exception('View counter flush failed; keeping %d comic / %d chapter keys for retry',
+                                 len(comics), len(chapters))
+                with self._lock:
+                    for key, n in comics.items():
+                        self._comic_views[key] = self._comic_views.get(key, 0) + n
+                    for key, n in chapters.items():
+                        self._chapter_views[key] = self._chapter_views.get(key, 0) + n
+                    self._pending += sum(comics.values()) + sum(chapters.values())
+                return 0
+            return sum(comics.values()) + sum(chapters.values())
+
+    def drain(self):
+        """Stop the flusher and write whatever is still buffered"""
+        self._stop.set()
+        return self.flush()
+
+    @staticmethod
+    def _write(comics, chapters):
+        """Batched increments in the current session (executemany)"""
+        if comics:
+            db.session.execute(
+                Comic.__table__.update()
+                .where(Comic.id == bindparam('b_comic_id'))
+                # updated_at listed explicitly so its onupdate does not fire on a view
+                .values(views=func.coalesce(Comic.views, 0) + bindparam('b_n'), updated_at=Comic.updated_at),
+                [{'b_comic_id': k, 'b_n': n} for k, n in comics.items()]
+            )
+        # Hourly buckets feed the day/week/month rankings: comic page views and chapter reads
+        bucket_views = dict(comics)
+        for (comic_id, _), n in chapters.items():
+            bucket_views[comic_id] = bucket_views.get(comic_id, 0) + n
+        ViewBucketService.add_views(bucket_views)
+        if chapters:
+            db.session.execute(
+                Chapter.__table__.update()
+                .where(Chapter.comic_id == bindparam('b_comic_id'),
+                       Chapter.chapter_number == bindparam('b_chapter_number'))
+                .values(views=func.coalesce(Chapter.views, 0) + bindparam('b_n')),
+                [{'b_comic_id': c, 'b_chapter_number': num, 'b_n': n} for (c, num), n in chapters.items()]
+            )
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+
+view_counter = ViewCounter()
@@ -319,10 +319,11 @@ function updateRankingUI(rankingData) {
     else if (rank === 2) badgeClass = "bg-secondary fw-bold";
     else if (rank === 3) badgeClass = "bg-danger fw-bold";
 
+    const views = comic.period_views ?? comic.views ?? 0;
     const viewsFormatted =
-      comic.views < 1000000
-        ? comic.views.toLocaleString()
-        : `${(comic.views / 1000000).toFixed(1)}M`;
+      views < 1000000
+        ? views.toLocaleString()
+        : `${(views / 1000000).toFixed(1)}M`;
 
     const titleTruncated =
       comic.title.length > 20
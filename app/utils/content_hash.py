@@ -0,0 +1,19 @@
+"""
+Chapter content fingerprints for duplicate detection (chapters.content_hash)
+"""
+import hashlib
+
+
+def text_hash(text):
+    """sha256 of novel chapter text, ignoring surrounding whitespace"""
+    if text is None or not text.strip():
+        return None
+    return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+def image_set_hash(urls):
+    """sha256 of a comic chapter's page list (stripped URLs, in order)"""
+    urls = [u.strip() for u in urls or [] if u and u.strip()]
+    if not urls:
+        return None
+    return hashlib.sha256('\n'.join(urls).encode('utf-8')).hexdigest()
@@ -4,61 +4,287 @@ Image upload utilities for ImgBB
 import requests
 import base64
 import os
+import io
+import hashlib
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from app.utils.perceptual_hash import dhash_image
 
-def upload_to_imgbb(file):
+IMGBB_DEFAULT_URL = "https://api.imgbb.com/1/upload"
+
+# Result of one file in a batch; `info` has url/width/height/byte_size/content_hash
+UploadResult = namedtuple('UploadResult', 'index filename url info error attempts')
+
+
+class UploadError(Exception):
+    """Upload failed; `retryable` tells the batch uploader whether to try again"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitBreaker:
+    """Stop calling ImgBB after repeated failures.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    uploads fail fast; after `reset_timeout` seconds one probe request is
+    let through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+imgbb_breaker = CircuitBreaker()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared keep-alive session (connection pool sized for the batch uploader)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _upload_settings():
+    config = current_app.config
+    return {
+        'api_key': config.get('IMGBB_API_KEY'),
+        'url': config.get('IMGBB_UPLOAD_URL') or IMGBB_DEFAULT_URL,
+        'timeout': config.get('IMGBB_UPLOAD_TIMEOUT', 30),
+        'workers': config.get('IMGBB_UPLOAD_WORKERS', 4),
+        'retries': config.get('IMGBB_UPLOAD_RETRIES', 3),
+        'mode': config.get('IMGBB_UPLOAD_MODE', 'multipart'),
+    }
+
+
+class MultipartFileBody:
+    """
+    multipart/form-data body that streams the image from its file object
+    
+    requests sends any object with read()/__iter__ chunk by chunk and takes
+    Content-Length from len(), so the image is never base64-encoded or
+    copied into memory as a whole.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, fields, file_field, filename, stream, size, content_type='application/octet-stream'):
+        self.boundary = uuid.uuid4().hex
+        head = io.BytesIO()
+        for name, value in fields.items():
+            head.write(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode('utf-8'))
+            head.write(str(value).encode('utf-8') + b'\r\n')
+        safe_name = (filename or 'image').replace('"', '')
+        head.write(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                   f'filename="{safe_name}"\r\nContent-Type: {content_type}\r\n\r\n'.encode('utf-8'))
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        stream.seek(0)
+        self._parts = [io.BytesIO(head.getvalue()), stream, io.BytesIO(tail)]
+        self._length = len(head.getvalue()) + size + len(tail)
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(part.read() for part in self._parts)
+        chunks = []
+        while size > 0 and self._parts:
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0)
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _post_image(stream, filename, settings):
+    """POST one image to ImgBB. Returns the response's `data` dict or raises UploadError."""
+    try:
+        if settings['mode'] == 'base64':
+            # Legacy form: whole file as a base64 string (3 copies in memory)
+            stream.seek(0)
+            payload = {
+                "key": settings['api_key'],
+                "image": base64.b64encode(stream.read()).decode('utf-8'),
+                "name": filename  # Optional: preserve original filename
+            }
+            response = get_session().post(settings['url'], data=payload, timeout=settings['timeout'])
+        else:
+            body = MultipartFileBody({"key": settings['api_key'], "name": filename}, 'image', filename,
+                                     stream, _stream_size(stream))
+            response = get_session().post(settings['url'], data=body, timeout=settings['timeout'],
+                                          headers={'Content-Type': body.content_type})
+    except (requests.ConnectionError, requests.Timeout) as e:
+        raise UploadError(f"Network error: {e}")
+    if response.status_code == 200:
+        body = response.json()
+        if body.get('success'):
+            return body['data']
+        raise UploadError(f"ImgBB API error: {body.get('error', {}).get('message', 'Unknown error')}",
+                          retryable=False)
+    # 429 / 5xx are transient; other 4xx will not get better on retry
+    raise UploadError(f"HTTP error: {response.status_code}",
+                      retryable=response.status_code == 429 or response.status_code >= 500)
+
+
+def upload_to_imgbb(file, info=None):
     """
     Upload image to ImgBB cloud storage
     
     Args:
         file: FileStorage object from request.files
+        info: optional dict, filled with image_metadata() (incl. perceptual hash) on success
         
     Returns:
         str: Image URL if successful, None otherwise
     """
     try:
-        api_key = current_app.config.get('IMGBB_API_KEY')
+        settings = _upload_settings()
         
-        if not api_key:
+        if not settings['api_key']:
             print("Error: IMGBB_API_KEY not found in config")
             return None
         
-        # Read file and convert to base64
-        file.seek(0)  # Reset file pointer
-        image_data = base64.b64encode(file.read()).decode('utf-8')
-        
-        # ImgBB API endpoint
-        url = "https://api.imgbb.com/1/upload"
-        
-        # Payload
-        payload = {
-            "key": api_key,
-            "image": image_data,
-            "name": file.filename  # Optional: preserve original filename
-        }
-        
-        # Upload
-        response = requests.post(url, data=payload, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                # Return direct image URL
-                image_url = data['data']['url']
-                print(f"✅ Image uploaded successfully: {image_url}")
-                return image_url
-            else:
-                print(f"❌ ImgBB API error: {data.get('error', {}).get('message', 'Unknown error')}")
-                return None
-        else:
-            print(f"❌ HTTP error: {response.status_code} - {response.text}")
-            return None
+        image_url = _post_image(file.stream, file.filename, settings)['url']
+        print(f"✅ Image uploaded successfully: {image_url}")
+        if info is not None:
+            info.update(image_metadata(file), url=image_url)
+        return image_url
             
     except Exception as e:
         print(f"❌ Upload exception: {str(e)}")
         return None
 
 
+def _upload_one(index, file, settings, breaker):
+    """Upload one file with retry/backoff. Runs in a worker thread (no app context)."""
+    attempts = 0
+    error = None
+    while attempts <= settings['retries']:
+        if not breaker.allow():
+            error = 'ImgBB tạm thời không khả dụng (circuit open)'
+            break
+        attempts += 1
+        try:
+            result = _post_image(file.stream, file.filename, settings)
+            breaker.record_success()
+            info = dict(image_metadata(file), url=result['url'])
+            # Prefer the dimensions ImgBB reports when Pillow could not read the file
+            info['width'] = info['width'] or _int_or_none(result.get('width'))
+            info['height'] = info['height'] or _int_or_none(result.get('height'))
+            return UploadResult(index, file.filename, result['url'], info, None, attempts)
+        except UploadError as e:
+            error = str(e)
+            if not e.retryable:
+                # ImgBB answered; the service itself is healthy
+                breaker.record_success()
+                break
+            breaker.record_failure()
+            # Exponential backoff with jitter: ~0.5s, 1s, 2s, ...
+            if attempts <= settings['retries']:
+                time.sleep(0.5 * (2 ** (attempts - 1)) * (0.5 + random.random()))
+    return UploadResult(index, file.filename, None, None, error, attempts)
+
+
+def iter_upload_images(files, max_workers=None):
+    """
+    Upload several images concurrently, yielding each UploadResult as soon
+    as it finishes (for progress reporting). `result.index` is the position
+    in `files`.
+    """
+    settings = _upload_settings()
+    if not settings['api_key']:
+        for i, f in enumerate(files):
+            yield UploadResult(i, f.filename, None, None, 'IMGBB_API_KEY not configured', 0)
+        return
+    workers = max(1, min(max_workers or settings['workers'], len(files) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='imgbb-upload') as pool:
+        futures = [pool.submit(_upload_one, i, f, settings, imgbb_breaker) for i, f in enumerate(files)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def upload_images(files, max_workers=None):
+    """
+    Upload several images concurrently
+    
+    Args:
+        files: list of FileStorage objects, in page order
+        max_workers: thread pool size (default IMGBB_UPLOAD_WORKERS)
+        
+    Returns:
+        list[UploadResult]: one per file, in the same order as `files`
+    """
+    return sorted(iter_upload_images(files, max_workers), key=lambda r: r.index)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 def is_valid_image(file):
     """
     Check if file is a valid image
@@ -88,7 +314,99 @@ def get_file_size_mb(file):
     Returns:
         float: File size in MB
     """
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    file.seek(0)  # Reset pointer
-    return size / (1024 * 1024)  # Convert to MB
+    return _stream_size(file.stream) / (1024 * 1024)  # Convert to MB
+
+
+# Leading bytes of the accepted formats
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+ImageCheck = namedtuple('ImageCheck', 'ok size kind reason')
+
+
+def check_image_file(file, max_mb=10):
+    """
+    Validate an upload in one pass: extension, magic bytes and size
+    
+    Only the first bytes are read and the size comes from seeking to the
+    end, so the file is never loaded into memory.
+    
+    Args:
+        file: FileStorage object
+        max_mb: size limit
+        
+    Returns:
+        ImageCheck: ok, size (bytes), kind ('png', 'jpeg', ...), reason
+        ('extension', 'signature' or 'too_large' when not ok)
+    """
+    if not is_valid_image(file):
+        return ImageCheck(False, 0, None, 'extension')
+    stream = file.stream
+    stream.seek(0)
+    header = stream.read(12)
+    size = _stream_size(stream)
+    kind = None
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        kind = 'webp'
+    else:
+        for signature, name in _SIGNATURES:
+            if header.startswith(signature):
+                kind = name
+                break
+    if kind is None:
+        return ImageCheck(False, size, None, 'signature')
+    if size > max_mb * 1024 * 1024:
+        return ImageCheck(False, size, kind, 'too_large')
+    return ImageCheck(True, size, kind, None)
+
+
+def _stream_size(stream):
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)  # Reset pointer
+    return size
+
+
+def image_metadata(file):
+    """
+    Size, dimensions and sha256 of an uploaded image (for chapter_images)
+    
+    Args:
+        file: FileStorage object
+        
+    Returns:
+        dict: byte_size, content_hash, width, height, phash (dHash; None if unreadable)
+    """
+    return _stream_metadata(file.stream)
+
+
+def _stream_metadata(stream):
+    """Hash in chunks; Pillow decodes a reduced-size copy for the perceptual hash"""
+    digest = hashlib.sha256()
+    size = 0
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(MultipartFileBody.CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    width = height = phash = None
+    try:
+        from PIL import Image
+        stream.seek(0)
+        with Image.open(stream) as img:
+            width, height = img.size
+            phash = dhash_image(img)
+    except Exception:
+        pass
+    stream.seek(0)
+    return {
+        'byte_size': size,
+        'content_hash': digest.hexdigest(),
+        'width': width,
+        'height': height,
+        'phash': phash
+    }
@@ -0,0 +1,134 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string cannot be decoded"""
+
+
+class KeysetPage:
+    """One page of keyset results.
+
+    Exposes the attributes templates already use on Flask-SQLAlchemy
+    pagination objects (items, has_next, pages) plus next_cursor.
+    `total` is None unless it was explicitly requested.
+    """
+
+    def __init__(self, items, per_page, next_cursor=None, cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+        self.total = total
+        self.has_next = next_cursor is not None
+        self.has_prev = cursor is not None
+        # No page numbers in cursor mode; 0 keeps `pages > 1` checks in templates false
+        self.pages = 0
+
+    def to_dict(self):
+        return {
+            'cursor': self.cursor,
+            'next_cursor': self.next_cursor,
+            'has_next': self.has_next,
+            'per_page': self.per_page,
+            'total': self.total
+        }
+
+
+def encode_cursor(sort_value, row_id, key=None):
+    """Encode (sort value, id) into an opaque URL-safe token.
+
+    `key` names the ordering the cursor belongs to (e.g. 'top_rated') when
+    one endpoint supports several; decode_cursor rejects it under another.
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    payload = [sort_value, row_id] if key is None else [sort_value, row_id, key]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, key=None):
+    """Decode a token produced by encode_cursor with the same `key`. Raises InvalidCursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        sort_value, row_id = payload[:2]
+        cursor_key = payload[2] if len(payload) > 2 else None
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value['dt'])
+        row_id = int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from e
+    if cursor_key != key:
+        raise InvalidCursor(f'Cursor belongs to another sort order: {cursor!r}')
+    return sort_value, row_id
+
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, per_page=20, with_total=False,
+                    cursor_key=None):
+    """Return a KeysetPage ordered by (sort_column DESC, id_column DESC).
+
+    Page N costs the same as page 1: the cursor turns into a WHERE clause on
+    an indexed (sort, id) pair instead of an OFFSET, and COUNT(*) only runs
+    when with_total is True.
+
+    Args:
+        query: base query with filters applied (existing ORDER BY is replaced)
+        sort_column: e.g. Comic.updated_at
+        id_column: unique tie-breaker, e.g. Comic.id
+        cursor: token from a previous page's next_cursor, or None
+        per_page: page size
+        with_total: also count all matching rows
+        cursor_key: ordering name stored in cursors, when one listing has several orderings
+    """
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, cursor_key)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < last_id)
+        ))
+
+    rows = query.order_by(None) \
+        .order_by(sort_column.desc(), id_column.desc()) \
+        .limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key), cursor_key)
+
+    return KeysetPage(rows, per_page, next_cursor=next_cursor, cursor=cursor, total=total)
+
+
+def offset_cursor_paginate(query, cursor=None, per_page=20, with_total=False, cursor_key=None):
+    """KeysetPage for a query whose ORDER BY cannot be a keyset (search relevance).
+
+    The query's own ordering is kept and the cursor carries the row offset,
+    so callers get the same cursor API as keyset_paginate while page N pays
+    an OFFSET. Meant for bounded result sets such as search hits.
+    """
+    total = query.order_by(None).count() if with_total else None
+
+    offset = 0
+    if cursor:
+        offset, _ = decode_cursor(cursor, cursor_key)
+        if not isinstance(offset, int) or offset < 0:
+            raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+    rows = query.offset(offset).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(offset + per_page, 0, cursor_key)
+
+    return KeysetPage(rows, per_page, next_cursor=next_cursor, cursor=cursor, total=total)
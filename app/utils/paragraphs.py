@@ -0,0 +1,37 @@
+"""
+Paragraph offset index for long novel chapters
+"""
+import json
+
+
+def index_paragraphs(text):
+    """Character offsets of the non-blank lines of `text`.
+
+    Returns a flat list [start0, end0, start1, end1, ...] so a range of
+    paragraphs can be sliced out without splitting the whole chapter.
+    """
+    offsets = []
+    if not text:
+        return offsets
+    pos = 0
+    for line in text.split('\n'):
+        end = pos + len(line)
+        if line.strip():
+            offsets.extend((pos, end))
+        pos = end + 1
+    return offsets
+
+
+def dump_offsets(offsets):
+    return json.dumps(offsets, separators=(',', ':'))
+
+
+def load_offsets(raw):
+    return json.loads(raw) if raw else []
+
+
+def slice_paragraphs(text, offsets, start=0, count=None):
+    """Paragraphs [start, start + count) of `text` using its offset index"""
+    total = len(offsets) // 2
+    stop = total if count is None else min(total, start + count)
+    return [text[offsets[2 * i]:offsets[2 * i + 1]] for i in range(max(start, 0), stop)]
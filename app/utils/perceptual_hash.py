@@ -0,0 +1,60 @@
+"""
+Perceptual image hashes (dHash) and the band split used to index them
+"""
+HASH_BITS = 64
+CHUNKS = 4  # multi-index: 4 x 16-bit bands
+CHUNK_BITS = HASH_BITS // CHUNKS
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+# Blank, white or black pages hash to (nearly) all-0 or all-1 bits and would match each other
+MIN_SET_BITS = 8
+
+
+def dhash_image(img):
+    """64-bit difference hash of a PIL image.
+
+    The image is shrunk to 9x8 grayscale and each bit says whether a pixel
+    is brighter than its right neighbour, so re-encoding, resizing and mild
+    colour changes keep the hash within a few bits.
+    """
+    from PIL import Image
+    if img.format == 'JPEG':
+        # Decode at reduced scale; the hash only needs 9x8 pixels
+        img.draft('L', (64, 64))
+    small = img.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def is_distinctive(value):
+    """False for near-constant hashes (flat images) that say nothing about the picture"""
+    return MIN_SET_BITS <= bin(value).count('1') <= HASH_BITS - MIN_SET_BITS
+
+
+def to_signed(value):
+    """Unsigned 64-bit hash -> value that fits a signed BIGINT column"""
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def chunks(value):
+    """The CHUNKS bands of a hash, most significant first.
+
+    Two hashes within distance < CHUNKS share at least one band exactly
+    (pigeonhole), so equality lookups on indexed bands find every such
+    neighbour without scanning.
+    """
+    return [(value >> (CHUNK_BITS * (CHUNKS - 1 - i))) & _CHUNK_MASK for i in range(CHUNKS)]
+
@@ -0,0 +1,179 @@
+"""
+In-process full-page response cache for anonymous GET requests
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+
+CacheEntry = namedtuple('CacheEntry', 'body status headers tags expires_at size')
+
+# Rough per-entry bookkeeping overhead added to the body size
+_ENTRY_OVERHEAD = 512
+
+
+class ResponseCache:
+    """LRU cache of rendered responses with dependency tags.
+
+    Each gunicorn worker has its own cache. Invalidation only reaches the
+    worker that handled the write, so entries also expire after a TTL.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=120, enabled=True):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> CacheEntry, least recently used first
+        self._keys_by_tag = {}  # tag -> set of keys
+        self._lock = threading.RLock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        app.extensions['response_cache'] = self
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, body, status, headers, tags):
+        size = len(body) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            entry = CacheEntry(body, status, headers, frozenset(tags), time.monotonic() + self.ttl, size)
+            self._entries[key] = entry
+            self.size += size
+            for tag in entry.tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'size_bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+page_cache = ResponseCache()
+
+
+def invalidate_pages(*tags):
+    """Invalidate cached pages, e.g. invalidate_pages('comic:5', 'catalog', 'homepage')"""
+    page_cache.invalidate(*tags)
+
+
+def comic_tags(comic_id):
+    """Tags to invalidate when a comic or its chapters change"""
+    return ('comic:%s' % comic_id, 'catalog', 'homepage')
+
+
+def _cache_key():
+    args = sorted(request.args.items(multi=True))
+    return request.path + ('?' + urlencode(args) if args else '')
+
+
+def _is_cacheable_request():
+    if not page_cache.enabled or request.method != 'GET':
+        return False
+    if current_user.is_authenticated:
+        return False
+    # Pending flash messages are rendered into the page
+    return '_flashes' not in session
+
+
+def cached_page(*tags, on_hit=None):
+    """Cache a view's response for logged-out visitors.
+
+    Args:
+        tags: dependency tags; '{name}' placeholders are filled from view kwargs,
+              e.g. 'comic:{comic_id}'
+        on_hit: optional callable(**view_kwargs) run on cache hits, for side
+                effects the view would normally perform (view counters)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not _is_cacheable_request():
+                return f(*args, **kwargs)
+
+            key = _cache_key()
+            entry = page_cache.get(key)
+            if entry is not None:
+                if on_hit is not None:
+                    on_hit(**kwargs)
+                response = current_app.response_class(entry.body, status=entry.status, headers=entry.headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if (response.status_code == 200 and not response.is_streamed
+                    and not session.modified and 'Set-Cookie' not in response.headers):
+                headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'content-length']
+                page_cache.set(key, response.get_data(), response.status_code, headers,
+                               [tag.format(**kwargs) for tag in tags])
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated_function
+    return decorator
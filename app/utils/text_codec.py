@@ -0,0 +1,35 @@
+"""
+Compressed-at-rest encoding for chapter text
+"""
+import gzip
+
+PLAIN = 'plain'
+GZIP = 'gzip'
+CODECS = (PLAIN, GZIP)
+
+
+def encode_text(text, codec):
+    """Return (plain_text, compressed_bytes, codec_marker) for storage.
+
+    gzip output is a complete gzip member (mtime=0, deterministic), so the
+    stored bytes can be sent as-is with `Content-Encoding: gzip`.
+    """
+    if text is None:
+        return None, None, None
+    if codec == GZIP:
+        return None, gzip.compress(text.encode('utf-8'), compresslevel=9, mtime=0), GZIP
+    return text, None, None
+
+
+def decode_text(plain, compressed, codec):
+    """Inverse of encode_text"""
+    if codec == GZIP:
+        return gzip.decompress(compressed).decode('utf-8') if compressed is not None else None
+    return plain
+
+
+def stored_size(plain, compressed):
+    """Bytes occupied by the stored representation"""
+    if compressed is not None:
+        return len(compressed)
+    return len(plain.encode('utf-8')) if plain else 0
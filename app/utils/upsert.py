@@ -0,0 +1,82 @@
+"""
+Atomic insert-if-absent, upsert and counter updates that work on PostgreSQL, SQLite and MySQL
+"""
+from sqlalchemy import and_, update
+from app import db
+
+
+def _insert(model):
+    """Dialect-specific INSERT construct (supports ON CONFLICT / ON DUPLICATE KEY)"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'upsert is not supported on {dialect}')
+    return dialect, insert(model)
+
+
+def _key_filter(model, keys):
+    return and_(*(getattr(model, column) == value for column, value in keys.items()))
+
+
+def insert_ignore(model, keys, values=None):
+    """INSERT a row unless one with the same unique `keys` exists, in one statement.
+
+    `keys` must match a unique constraint of the table. Concurrent callers
+    never raise IntegrityError: exactly one of them inserts.
+
+    Returns:
+        True if this call inserted the row
+    """
+    dialect, stmt = _insert(model)
+    stmt = stmt.values(**keys, **(values or {}))
+    if dialect in ('mysql', 'mariadb'):
+        # ON DUPLICATE KEY UPDATE id=id reports 1 row with PyMySQL's FOUND_ROWS flag; IGNORE reports 0
+        stmt = stmt.prefix_with('IGNORE')
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(keys))
+    return db.session.execute(stmt).rowcount == 1
+
+
+def upsert(model, keys, values=None, update_values=None):
+    """INSERT a row, or UPDATE `update_values` on the existing row with the same unique `keys`.
+
+    Runs as INSERT ... ON CONFLICT DO NOTHING followed, only when the row
+    already existed, by an UPDATE on the unique key, so callers learn which
+    case happened (the affected-row count of ON CONFLICT DO UPDATE / ON
+    DUPLICATE KEY UPDATE does not tell them portably).
+
+    Returns:
+        True if inserted, False if an existing row was updated
+    """
+    if insert_ignore(model, keys, values):
+        return True
+    if update_values:
+        db.session.execute(update(model).where(_key_filter(model, keys)).values(**update_values)
+                           .execution_options(synchronize_session=False))
+    return False
+
+
+def delete_where(model, **keys):
+    """DELETE rows matching `keys` without loading them; returns the number deleted"""
+    return db.session.execute(db.delete(model).where(_key_filter(model, keys))
+                              .execution_options(synchronize_session=False)).rowcount
+
+
+def increment(model, row_id, **deltas):
+    """UPDATE model SET col = col + delta ... WHERE id = row_id, evaluated by the database.
+
+    Zero deltas are skipped. Counter changes do not touch `updated_at`.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    values = {column: getattr(model, column) + delta for column, delta in deltas.items()}
+    if hasattr(model, 'updated_at'):
+        values['updated_at'] = model.updated_at
+    db.session.execute(update(model).where(model.id == row_id).values(**values)
+                       .execution_options(synchronize_session=False))
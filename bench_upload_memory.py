@@ -0,0 +1,93 @@
+"""
+Peak memory of chapter image uploads: base64 form post vs streaming multipart
+
+Starts fake_imgbb.py and each upload mode in separate processes, so the
+ru_maxrss of a mode's process only covers that mode (not the fake server's
+copies of the received images).
+
+    python bench_upload_memory.py --size-mb 10 --files 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+
+def _peak_mb():
+    # Linux reports ru_maxrss in KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(mode, upload_url, paths, workers):
+    from flask import Flask
+    from werkzeug.datastructures import FileStorage
+    from app.utils.image_upload import upload_images
+
+    app = Flask(__name__)
+    app.config.update(IMGBB_API_KEY='bench', IMGBB_UPLOAD_URL=upload_url,
+                      IMGBB_UPLOAD_MODE=mode, IMGBB_UPLOAD_WORKERS=workers)
+    baseline = _peak_mb()
+    with app.app_context():
+        files = [FileStorage(stream=open(path, 'rb'), filename=os.path.basename(path)) for path in paths]
+        try:
+            results = upload_images(files)
+        finally:
+            for f in files:
+                f.close()
+    print(json.dumps({
+        'mode': mode,
+        'ok': sum(1 for r in results if r.url),
+        'baseline_mb': round(baseline, 1),
+        'peak_mb': round(_peak_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=10)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, upload_url, *paths = args.child
+        run_child(mode, upload_url, paths, args.workers)
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen([sys.executable, '-u', os.path.join(here, 'fake_imgbb.py'), '--port', '0'],
+                              stdout=subprocess.PIPE, text=True)
+    upload_url = server.stdout.readline().split()[-1]
+    directory = tempfile.mkdtemp(prefix='upload_bench_')
+    paths = []
+    try:
+        for i in range(args.files):
+            path = os.path.join(directory, f'page_{i:02d}.png')
+            with open(path, 'wb') as f:
+                f.write(b'\x89PNG\r\n\x1a\n')
+                f.write(os.urandom(int(args.size_mb * 1024 * 1024)))
+            paths.append(path)
+
+        print(f'{args.files} files x {args.size_mb} MB, {args.workers} workers')
+        for mode in ('base64', 'multipart'):
+            out = subprocess.run(
+                [sys.executable, __file__, '--workers', str(args.workers), '--child', mode, upload_url, *paths],
+                check=True, capture_output=True, text=True
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"{r['mode']:>9}: {r['ok']}/{args.files} uploaded, peak RSS {r['peak_mb']} MB "
+                  f"(+{r['peak_mb'] - r['baseline_mb']:.1f} MB over baseline {r['baseline_mb']} MB)")
+    finally:
+        server.terminate()
+        server.wait()
+        for path in paths:
+            os.remove(path)
+        os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Local fake of the ImgBB upload API, for testing uploads offline
+
+    python fake_imgbb.py --port 8765 --latency 0.2 --fail-rate 0.1
+    IMGBB_UPLOAD_URL=http://127.0.0.1:8765/1/upload IMGBB_API_KEY=test flask run
+
+Accepts POST /1/upload with the same fields as ImgBB (`key`, `image` as
+base64 in a form body, or `image` as a multipart file) and answers with an
+ImgBB-shaped JSON body. Uploaded images are kept in memory and served from
+GET /i/<id>/<name>. Can also be started in-process: FakeImgBB().start().
+"""
+import argparse
+import base64
+import binascii
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeImgBB:
+    """Threaded fake server; `fail_rate` of uploads answer 500, `latency` seconds per upload"""
+
+    def __init__(self, host='127.0.0.1', port=8765, latency=0.0, fail_rate=0.0, api_key=None):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.api_key = api_key
+        self.images = {}  # id -> (name, bytes)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def upload_url(self):
+        return self.base_url + '/1/upload'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def _store(self, name, data):
+        image_id = uuid.uuid4().hex[:8]
+        with self._lock:
+            self.images[image_id] = (name, data)
+        return image_id
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+            def log_message(self, format, *args):
+                pass
+
+            def _json(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _fields(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                ctype = self.headers.get('Content-Type', '')
+                body = self.rfile.read(length)
+                if ctype.startswith('multipart/form-data'):
+                    parts = _multipart(ctype, body)
+                    key = parts.get('key', (None, b''))[1].decode('utf-8') or None
+                    filename, raw = parts.get('image', (None, None))
+                    data = raw if filename else _b64(raw)
+                    name = parts['name'][1].decode('utf-8') if 'name' in parts else filename
+                    return key, data, name
+                fields = parse_qs(body.decode('utf-8'))
+                first = lambda k: fields.get(k, [None])[0]
+                return first('key'), _b64(first('image')), first('name')
+
+            def do_POST(self):
+                with fake._lock:
+                    fake.requests += 1
+                if self.path.split('?')[0] != '/1/upload':
+                    return self._json(404, {'success': False, 'status': 404, 'error': {'message': 'Not found'}})
+                key, data, name = self._fields()
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.fail_rate and random.random() < fake.fail_rate:
+                    with fake._lock:
+                        fake.failures += 1
+                    return self._json(500, {'success': False, 'status': 500,
+                                            'error': {'message': 'Injected failure'}})
+                if not key or (fake.api_key and key != fake.api_key):
+                    return self._json(400, {'success': False, 'status': 400,
+                                            'error': {'message': 'Invalid API v1 key.'}})
+                if not data:
+                    return self._json(400, {'success': False, 'status': 400,
+                                            'error': {'message': 'Empty upload source.'}})
+                name = name or 'image'
+                image_id = fake._store(name, data)
+                url = f'{fake.base_url}/i/{image_id}/{name}'
+                width, height = _dimensions(data)
+                self._json(200, {'success': True, 'status': 200, 'data': {
+                    'id': image_id, 'title': name, 'url': url, 'display_url': url,
+                    'width': width, 'height': height, 'size': len(data), 'time': int(time.time()),
+                }})
+
+            def do_GET(self):
+                parts = self.path.split('/')
+                if len(parts) >= 3 and parts[1] == 'i' and parts[2] in fake.images:
+                    _, data = fake.images[parts[2]]
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/octet-stream')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                self._json(404, {'success': False, 'status': 404, 'error': {'message': 'Not found'}})
+
+        return Handler
+
+
+def _multipart(content_type, body):
+    """{field: (filename or None, bytes)} from a multipart/form-data body"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b'')
+    return fields
+
+
+def _b64(value):
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'ignore')
+    try:
+        return base64.b64decode(value, validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _dimensions(data):
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as img:
+            return img.size
+    except Exception:
+        return 0, 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake ImgBB upload server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every upload')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of uploads answering 500')
+    parser.add_argument('--api-key', default=None, help='only accept this key')
+    args = parser.parse_args()
+    server = FakeImgBB(args.host, args.port, args.latency, args.fail_rate, args.api_key)
+    print(f'Fake ImgBB listening on {server.upload_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,7 @@
+# Gunicorn settings (loaded automatically from the working directory)
+
+
+def worker_exit(server, worker):
+    """Write buffered view counts before the worker goes away"""
+    from app.services.view_counter import view_counter
+    view_counter.drain()
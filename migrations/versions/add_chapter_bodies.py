@@ -0,0 +1,41 @@
+"""Move chapter content/image_urls into chapter_bodies
+
+Revision ID: add_chapter_bodies
+Revises: add_chapter_index_version
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_bodies'
+down_revision = 'add_chapter_index_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chapter_bodies',
+        sa.Column('chapter_id', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('image_urls', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('chapter_id')
+    )
+    op.execute("INSERT INTO chapter_bodies (chapter_id, content, image_urls) "
+               "SELECT id, content, image_urls FROM chapters")
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.drop_column('image_urls')
+        batch_op.drop_column('content')
+
+
+def downgrade():
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('image_urls', sa.Text(), nullable=True))
+    op.execute("UPDATE chapters SET "
+               "content = (SELECT content FROM chapter_bodies WHERE chapter_bodies.chapter_id = chapters.id), "
+               "image_urls = (SELECT image_urls FROM chapter_bodies WHERE chapter_bodies.chapter_id = chapters.id)")
+    op.drop_table('chapter_bodies')
@@ -0,0 +1,30 @@
+"""Add compressed storage columns to chapter_bodies
+
+Revision ID: add_chapter_body_codec
+Revises: add_chapter_bodies
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_body_codec'
+down_revision = 'add_chapter_bodies'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_codec', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('content_compressed', sa.LargeBinary().with_variant(mysql.MEDIUMBLOB(), 'mysql'), nullable=True))
+
+
+def downgrade():
+    # Run `flask chapters-compress --codec plain` first, or compressed text is lost
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.drop_column('content_compressed')
+        batch_op.drop_column('content_codec')
@@ -0,0 +1,31 @@
+"""Add indexed content_hash to chapters
+
+Revision ID: add_chapter_content_hash
+Revises: add_upload_jobs
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_content_hash'
+down_revision = 'add_upload_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are hashed by `flask chapters-hash-backfill`
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index('ix_chapters_comic_id_content_hash', ['comic_id', 'content_hash'], unique=False)
+        batch_op.create_index('ix_chapters_content_hash', ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.drop_index('ix_chapters_content_hash')
+        batch_op.drop_index('ix_chapters_comic_id_content_hash')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,105 @@
+"""Add chapter_images manifest with shared image host prefixes
+
+Revision ID: add_chapter_images
+Revises: add_chapter_paragraph_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_images'
+down_revision = 'add_chapter_paragraph_index'
+branch_labels = None
+depends_on = None
+
+
+def _split(url):
+    # Same rule as ImageHost.split: prefix is scheme://host/
+    scheme_end = url.find('://')
+    slash = url.find('/', scheme_end + 3) if scheme_end != -1 else -1
+    if slash == -1 or slash + 1 > 255:
+        return None, url
+    return url[:slash + 1], url[slash + 1:]
+
+
+def upgrade():
+    op.create_table('image_hosts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prefix', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prefix')
+    )
+    op.create_table('chapter_images',
+        sa.Column('chapter_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('host_id', sa.Integer(), nullable=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('byte_size', sa.Integer(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['host_id'], ['image_hosts.id']),
+        sa.PrimaryKeyConstraint('chapter_id', 'position')
+    )
+    op.create_index('ix_chapter_images_content_hash', 'chapter_images', ['content_hash'], unique=False)
+
+    # Backfill from the JSON column
+    conn = op.get_bind()
+    hosts_table = sa.table('image_hosts', sa.column('id', sa.Integer), sa.column('prefix', sa.String))
+    images_table = sa.table('chapter_images', sa.column('chapter_id', sa.Integer), sa.column('position', sa.Integer),
+                            sa.column('host_id', sa.Integer), sa.column('path', sa.Text))
+    host_ids = {}
+    rows = []
+    result = conn.execute(sa.text("SELECT chapter_id, image_urls FROM chapter_bodies WHERE image_urls IS NOT NULL"))
+    for chapter_id, raw in result:
+        try:
+            urls = json.loads(raw) or []
+        except ValueError:
+            continue
+        for position, url in enumerate(u.strip() for u in urls if u and u.strip()):
+            prefix, path = _split(url)
+            if prefix is not None and prefix not in host_ids:
+                conn.execute(hosts_table.insert().values(prefix=prefix))
+                host_ids[prefix] = conn.execute(
+                    sa.select(hosts_table.c.id).where(hosts_table.c.prefix == prefix)).scalar()
+            rows.append({'chapter_id': chapter_id, 'position': position,
+                         'host_id': host_ids.get(prefix), 'path': path})
+            if len(rows) >= 1000:
+                conn.execute(images_table.insert(), rows)
+                rows = []
+    if rows:
+        conn.execute(images_table.insert(), rows)
+
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.drop_column('image_urls')
+
+
+def downgrade():
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_urls', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    result = conn.execute(sa.text(
+        "SELECT ci.chapter_id, h.prefix, ci.path FROM chapter_images ci "
+        "LEFT JOIN image_hosts h ON h.id = ci.host_id ORDER BY ci.chapter_id, ci.position"))
+    lists = {}
+    for chapter_id, prefix, path in result:
+        lists.setdefault(chapter_id, []).append((prefix or '') + path)
+    bodies = sa.table('chapter_bodies', sa.column('chapter_id', sa.Integer), sa.column('image_urls', sa.Text))
+    existing = {row[0] for row in conn.execute(sa.text("SELECT chapter_id FROM chapter_bodies"))}
+    for chapter_id, urls in lists.items():
+        if chapter_id in existing:
+            conn.execute(bodies.update().where(bodies.c.chapter_id == chapter_id)
+                         .values(image_urls=json.dumps(urls)))
+        else:
+            conn.execute(bodies.insert().values(chapter_id=chapter_id, image_urls=json.dumps(urls)))
+
+    op.drop_index('ix_chapter_images_content_hash', table_name='chapter_images')
+    op.drop_table('chapter_images')
+    op.drop_table('image_hosts')
@@ -0,0 +1,28 @@
+"""Add chapter index version to comics and (comic_id, chapter_number) index
+
+Revision ID: add_chapter_index_version
+Revises: add_ranking_snapshots
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_index_version'
+down_revision = 'add_ranking_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chapter_index_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_chapters_comic_id_chapter_number', 'chapters', ['comic_id', 'chapter_number'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_chapters_comic_id_chapter_number', table_name='chapters')
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_column('chapter_index_version')
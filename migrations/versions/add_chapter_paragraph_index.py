@@ -0,0 +1,30 @@
+"""Add paragraph offset index to chapter_bodies
+
+Revision ID: add_chapter_paragraph_index
+Revises: add_chapter_body_codec
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_chapter_paragraph_index'
+down_revision = 'add_chapter_body_codec'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are indexed by `flask chapters-index-paragraphs` (readers fall back to on-the-fly indexing)
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('paragraph_offsets', sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'), nullable=True))
+        batch_op.add_column(sa.Column('paragraph_count', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chapter_bodies', schema=None) as batch_op:
+        batch_op.drop_column('paragraph_count')
+        batch_op.drop_column('paragraph_offsets')
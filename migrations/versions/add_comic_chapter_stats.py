@@ -0,0 +1,36 @@
+"""Add denormalized chapter stats to comics
+
+Revision ID: add_comic_chapter_stats
+Revises: add_keyset_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_comic_chapter_stats'
+down_revision = 'add_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chapter_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('latest_chapter_number', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('last_chapter_at', sa.DateTime(), nullable=True))
+
+    # Backfill (same as `flask chapter-stats-backfill`)
+    op.execute("UPDATE comics SET "
+               "chapter_count = (SELECT COUNT(*) FROM chapters WHERE chapters.comic_id = comics.id), "
+               "latest_chapter_number = (SELECT MAX(chapter_number) FROM chapters WHERE chapters.comic_id = comics.id), "
+               "last_chapter_at = (SELECT MAX(created_at) FROM chapters WHERE chapters.comic_id = comics.id)")
+
+
+def downgrade():
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_column('last_chapter_at')
+        batch_op.drop_column('latest_chapter_number')
+        batch_op.drop_column('chapter_count')
@@ -0,0 +1,33 @@
+"""Add time-bucketed view counters for windowed rankings
+
+Revision ID: add_comic_view_buckets
+Revises: add_comic_chapter_stats
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_comic_view_buckets'
+down_revision = 'add_comic_chapter_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('comic_view_buckets',
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=5), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('comic_id', 'granularity', 'bucket_start')
+    )
+    op.create_index('ix_comic_view_buckets_start_comic', 'comic_view_buckets', ['bucket_start', 'comic_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comic_view_buckets_start_comic', table_name='comic_view_buckets')
+    op.drop_table('comic_view_buckets')
@@ -0,0 +1,27 @@
+"""Add indexes for threaded comment loading
+
+Revision ID: add_comment_thread_indexes
+Revises: add_image_fingerprints
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_comment_thread_indexes'
+down_revision = 'add_image_fingerprints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_comments_comic_parent_created_at_id', 'comments',
+                    ['comic_id', 'parent_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_comments_parent_created_at_id', 'comments',
+                    ['parent_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comments_parent_created_at_id', table_name='comments')
+    op.drop_index('ix_comments_comic_parent_created_at_id', table_name='comments')
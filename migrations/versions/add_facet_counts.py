@@ -0,0 +1,47 @@
+"""Add facet_counts table for cached genre/status/content_type counts
+
+Revision ID: add_facet_counts
+Revises: add_normalized_tags
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_facet_counts'
+down_revision = 'add_normalized_tags'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('facet_counts',
+        sa.Column('facet', sa.String(length=20), nullable=False),
+        sa.Column('value', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('facet', 'value')
+    )
+
+    # Backfill from the current catalog, normalized like FacetService (stripped, max 100 chars,
+    # values differing only by surrounding spaces merged)
+    bind = op.get_bind()
+    columns = {
+        'genre': 'genre',
+        'status': 'status',
+        'content_type': "COALESCE(content_type, 'comic')",
+    }
+    merged = {}
+    for facet, column in columns.items():
+        for value, count in bind.execute(sa.text(f'SELECT {column}, COUNT(*) FROM comics GROUP BY {column}')):
+            value = (value or '').strip()[:100]
+            if value:
+                merged[(facet, value)] = merged.get((facet, value), 0) + count
+    if merged:
+        facet_counts = sa.table('facet_counts', sa.column('facet'), sa.column('value'), sa.column('count'))
+        op.bulk_insert(facet_counts, [{'facet': f, 'value': v, 'count': c} for (f, v), c in merged.items()])
+
+
+def downgrade():
+    op.drop_table('facet_counts')
@@ -0,0 +1,30 @@
+"""Add follower feed watermark and chapter publication index
+
+Revision ID: add_follow_feed
+Revises: add_rating_aggregates
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_follow_feed'
+down_revision = 'add_rating_aggregates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feed_seen_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.create_index('ix_chapters_comic_id_created_at', ['comic_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chapters', schema=None) as batch_op:
+        batch_op.drop_index('ix_chapters_comic_id_created_at')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('feed_seen_at')
@@ -0,0 +1,57 @@
+"""Add perceptual image fingerprints for near-duplicate pages and covers
+
+Revision ID: add_image_fingerprints
+Revises: add_chapter_content_hash
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_image_fingerprints'
+down_revision = 'add_chapter_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('chapter_id', sa.Integer(), nullable=True),
+        sa.Column('position', sa.Integer(), nullable=True),
+        sa.Column('url', sa.Text(), nullable=True),
+        sa.Column('phash', sa.BigInteger(), nullable=False),
+        sa.Column('band_0', sa.Integer(), nullable=False),
+        sa.Column('band_1', sa.Integer(), nullable=False),
+        sa.Column('band_2', sa.Integer(), nullable=False),
+        sa.Column('band_3', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_image_fingerprints_comic_id', 'image_fingerprints', ['comic_id'], unique=False)
+    op.create_index('ix_image_fingerprints_chapter_id', 'image_fingerprints', ['chapter_id'], unique=False)
+    for i in range(4):
+        op.create_index(f'ix_image_fingerprints_band_{i}', 'image_fingerprints', [f'band_{i}'], unique=False)
+
+    with op.batch_alter_table('upload_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('warning', sa.Text(), nullable=True))
+    with op.batch_alter_table('upload_job_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phash', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('upload_job_files', schema=None) as batch_op:
+        batch_op.drop_column('phash')
+    with op.batch_alter_table('upload_jobs', schema=None) as batch_op:
+        batch_op.drop_column('warning')
+
+    for i in range(4):
+        op.drop_index(f'ix_image_fingerprints_band_{i}', table_name='image_fingerprints')
+    op.drop_index('ix_image_fingerprints_chapter_id', table_name='image_fingerprints')
+    op.drop_index('ix_image_fingerprints_comic_id', table_name='image_fingerprints')
+    op.drop_table('image_fingerprints')
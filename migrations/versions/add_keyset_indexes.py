@@ -0,0 +1,31 @@
+"""Add composite indexes for keyset (cursor) pagination
+
+Revision ID: add_keyset_indexes
+Revises: add_facet_counts
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_indexes'
+down_revision = 'add_facet_counts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Catalog listings: ORDER BY updated_at DESC, id DESC
+    op.create_index('ix_comics_updated_at_id', 'comics', ['updated_at', 'id'])
+    # Uploader dashboard: WHERE uploader_id = ? ORDER BY created_at DESC, id DESC
+    op.create_index('ix_comics_uploader_created_at_id', 'comics', ['uploader_id', 'created_at', 'id'])
+    # Activity feed: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    op.create_index('ix_user_activities_user_created_at_id', 'user_activities', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_user_activities_user_created_at_id', table_name='user_activities')
+    op.drop_index('ix_comics_uploader_created_at_id', table_name='comics')
+    op.drop_index('ix_comics_updated_at_id', table_name='comics')
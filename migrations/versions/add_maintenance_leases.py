@@ -0,0 +1,28 @@
+"""Add maintenance_leases for periodic background jobs
+
+Revision ID: add_maintenance_leases
+Revises: add_follow_feed
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_maintenance_leases'
+down_revision = 'add_follow_feed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('maintenance_leases',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('maintenance_leases')
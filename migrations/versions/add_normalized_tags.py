@@ -0,0 +1,92 @@
+"""Add normalized tags and comic_tags association, backfilled from comics.tags
+
+Revision ID: add_normalized_tags
+Revises: add_search_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_normalized_tags'
+down_revision = 'add_search_index'
+branch_labels = None
+depends_on = None
+
+
+def _slug(name):
+    # Same folding as app.services.tags.tag_slug (copied so the migration stays self-contained)
+    text = name.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn').lower()
+    return '-'.join(re.findall(r'\w+', text))[:100]
+
+
+def upgrade():
+    op.create_table('tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('slug', sa.String(length=100), nullable=False),
+        sa.Column('usage_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('slug')
+    )
+    op.create_table('comic_tags',
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('comic_id', 'tag_id')
+    )
+    op.create_index('ix_comic_tags_tag_id_comic_id', 'comic_tags', ['tag_id', 'comic_id'])
+
+    # Backfill from the comma-separated column
+    bind = op.get_bind()
+    tags_table = sa.table('tags',
+        sa.column('id', sa.Integer), sa.column('name', sa.String),
+        sa.column('slug', sa.String), sa.column('usage_count', sa.Integer),
+        sa.column('created_at', sa.DateTime))
+    comic_tags_table = sa.table('comic_tags', sa.column('comic_id', sa.Integer), sa.column('tag_id', sa.Integer))
+
+    names = {}
+    links = []
+    rows = bind.execute(sa.text("SELECT id, tags FROM comics WHERE tags IS NOT NULL AND tags <> ''"))
+    for comic_id, raw in rows:
+        seen = set()
+        for part in raw.split(','):
+            name = part.strip()[:100]
+            slug = _slug(name)
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            names.setdefault(slug, name)
+            links.append((comic_id, slug))
+
+    if not names:
+        return
+
+    usage = {}
+    for _, slug in links:
+        usage[slug] = usage.get(slug, 0) + 1
+    now = datetime.utcnow()
+    op.bulk_insert(tags_table, [
+        {'name': name, 'slug': slug, 'usage_count': usage[slug], 'created_at': now}
+        for slug, name in names.items()
+    ])
+    ids = dict((slug, tag_id) for tag_id, slug in bind.execute(sa.text('SELECT id, slug FROM tags')))
+    op.bulk_insert(comic_tags_table, [
+        {'comic_id': comic_id, 'tag_id': ids[slug]} for comic_id, slug in links
+    ])
+
+
+def downgrade():
+    op.drop_index('ix_comic_tags_tag_id_comic_id', table_name='comic_tags')
+    op.drop_table('comic_tags')
+    op.drop_table('tags')
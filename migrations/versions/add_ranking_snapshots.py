@@ -0,0 +1,35 @@
+"""Add precomputed ranking snapshots
+
+Revision ID: add_ranking_snapshots
+Revises: add_comic_view_buckets
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_ranking_snapshots'
+down_revision = 'add_comic_view_buckets'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ranking_snapshots',
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('period', sa.String(length=10), nullable=False),
+        sa.Column('content_type', sa.String(length=10), nullable=False),
+        sa.Column('genre', sa.String(length=100), nullable=False, server_default=''),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('snapshot_date', 'period', 'content_type', 'genre', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('ranking_snapshots')
@@ -0,0 +1,55 @@
+"""Add exact rating sum and Bayesian rating score to comics
+
+Revision ID: add_rating_aggregates
+Revises: add_read_history_unique
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+from flask import current_app
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_rating_aggregates'
+down_revision = 'add_read_history_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_score', sa.Float(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_comics_rating_score_id', ['rating_score', 'id'], unique=False)
+    with op.batch_alter_table('user_rating', schema=None) as batch_op:
+        batch_op.create_index('ix_user_rating_comic_id', ['comic_id'], unique=False)
+
+    # Exact sums and counts from the votes, so new votes apply deltas to correct values
+    op.execute(
+        'UPDATE comics SET'
+        ' rating_sum = COALESCE((SELECT SUM(r.rating) FROM user_rating r WHERE r.comic_id = comics.id), 0),'
+        ' rating_count = (SELECT COUNT(*) FROM user_rating r WHERE r.comic_id = comics.id)'
+    )
+    op.execute(
+        'UPDATE comics SET rating = CASE WHEN rating_count > 0'
+        ' THEN rating_sum * 1.0 / rating_count ELSE 0 END'
+    )
+    # Bayesian score with the same prior as RatingService (RATING_PRIOR_* config)
+    prior_votes = int(current_app.config.get('RATING_PRIOR_VOTES', 10))
+    prior_mean = float(current_app.config.get('RATING_PRIOR_MEAN', 3.0))
+    op.execute(
+        sa.text('UPDATE comics SET rating_score = CASE WHEN rating_count > 0'
+                ' THEN (:prior_votes * :prior_mean + rating_sum * 1.0) / (:prior_votes + rating_count)'
+                ' ELSE 0 END')
+        .bindparams(prior_votes=prior_votes, prior_mean=prior_mean)
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user_rating', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_rating_comic_id')
+    with op.batch_alter_table('comics', schema=None) as batch_op:
+        batch_op.drop_index('ix_comics_rating_score_id')
+        batch_op.drop_column('rating_score')
+        batch_op.drop_column('rating_sum')
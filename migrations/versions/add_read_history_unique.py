@@ -0,0 +1,32 @@
+"""One read history row per user and chapter
+
+Revision ID: add_read_history_unique
+Revises: add_comment_thread_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_read_history_unique'
+down_revision = 'add_comment_thread_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Duplicates only come from concurrent first reads; keep the newest row of each.
+    # The derived table lets MySQL delete from the table it selects from.
+    op.execute(
+        'DELETE FROM user_read_history WHERE id NOT IN (SELECT keep_id FROM ('
+        ' SELECT MAX(id) AS keep_id FROM user_read_history GROUP BY user_id, chapter_id'
+        ') AS keep)'
+    )
+    with op.batch_alter_table('user_read_history', schema=None) as batch_op:
+        batch_op.create_unique_constraint('unique_user_chapter_read', ['user_id', 'chapter_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('user_read_history', schema=None) as batch_op:
+        batch_op.drop_constraint('unique_user_chapter_read', type_='unique')
@@ -0,0 +1,115 @@
+"""Add accent-folded search documents and inverted index
+
+Revision ID: add_search_index
+Revises: add_ban_system
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import re
+import unicodedata
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_search_index'
+down_revision = 'add_ban_system'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('comic_search_documents',
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('author', sa.String(length=100), nullable=True),
+        sa.Column('genre', sa.String(length=100), nullable=True),
+        sa.Column('tags', sa.String(length=500), nullable=True),
+        sa.Column('document', sa.Text(), nullable=False, server_default=''),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('comic_id')
+    )
+    op.create_table('search_terms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=64), nullable=False),
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('field', sa.String(length=10), nullable=False),
+        sa.Column('weight', sa.Integer(), nullable=False, server_default='1'),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_search_terms_term_field', 'search_terms', ['term', 'field'])
+    op.create_index('ix_search_terms_comic_id', 'search_terms', ['comic_id'])
+
+    # PostgreSQL: native full-text + trigram indexes on the folded columns
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute("CREATE INDEX ix_comic_search_documents_fts ON comic_search_documents "
+                   "USING gin (to_tsvector('simple', document))")
+        op.execute('CREATE INDEX ix_comic_search_documents_title_trgm ON comic_search_documents '
+                   'USING gin (title gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_comic_search_documents_author_trgm ON comic_search_documents '
+                   'USING gin (author gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_comic_search_documents_genre_trgm ON comic_search_documents '
+                   'USING gin (genre gin_trgm_ops)')
+
+    _backfill(op.get_bind())
+
+
+# Copy of the folding in app/services/search.py as of this revision, so the
+# backfill does not change if the application code does later
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+FIELD_LIMITS = {'title': 200, 'author': 100, 'genre': 100, 'tags': 500}
+
+
+def _fold(text):
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return ' '.join(_TOKEN_RE.findall(text.lower()))
+
+
+def _backfill(bind, batch_size=500):
+    """Index existing comics, so search does not come back empty until `flask search-reindex` runs"""
+    documents = sa.table('comic_search_documents', *(sa.column(c) for c in ('comic_id', 'document', *FIELD_LIMITS)))
+    terms = sa.table('search_terms', *(sa.column(c) for c in ('term', 'comic_id', 'field', 'weight')))
+    native = bind.dialect.name == 'postgresql'
+    last_id = 0
+    while True:
+        comics = bind.execute(sa.text(
+            'SELECT id, title, author, genre, tags FROM comics WHERE id > :last_id ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': batch_size}).all()
+        if not comics:
+            break
+        document_rows, term_rows = [], []
+        for comic_id, title, author, genre, tags in comics:
+            fields = {'title': _fold(title), 'author': _fold(author), 'genre': _fold(genre),
+                      'tags': _fold((tags or '').replace(',', ' '))}
+            row = {field: value[:FIELD_LIMITS[field]] for field, value in fields.items()}
+            row.update(comic_id=comic_id, document=' '.join(v for v in fields.values() if v))
+            document_rows.append(row)
+            if not native:
+                for field, value in fields.items():
+                    for term, weight in Counter(t[:64] for t in value.split()).items():
+                        term_rows.append({'term': term, 'comic_id': comic_id, 'field': field, 'weight': weight})
+        op.bulk_insert(documents, document_rows)
+        if term_rows:
+            op.bulk_insert(terms, term_rows)
+        last_id = comics[-1][0]
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_comic_search_documents_genre_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_comic_search_documents_author_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_comic_search_documents_title_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_comic_search_documents_fts')
+    op.drop_index('ix_search_terms_comic_id', table_name='search_terms')
+    op.drop_index('ix_search_terms_term_field', table_name='search_terms')
+    op.drop_table('search_terms')
+    op.drop_table('comic_search_documents')
@@ -0,0 +1,61 @@
+"""Add background chapter upload jobs
+
+Revision ID: add_upload_jobs
+Revises: add_chapter_images
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_upload_jobs'
+down_revision = 'add_chapter_images'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('comic_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('chapter_number', sa.Float(), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('chapter_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['comic_id'], ['comics.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['chapter_id'], ['chapters.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_upload_jobs_status_updated_at', 'upload_jobs', ['status', 'updated_at'], unique=False)
+    op.create_table('upload_job_files',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('staged_path', sa.String(length=500), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('url', sa.Text(), nullable=True),
+        sa.Column('width', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('byte_size', sa.Integer(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['job_id'], ['upload_jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_upload_job_files_job_id', 'upload_job_files', ['job_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_upload_job_files_job_id', table_name='upload_job_files')
+    op.drop_table('upload_job_files')
+    op.drop_index('ix_upload_jobs_status_updated_at', table_name='upload_jobs')
+    op.drop_table('upload_jobs')